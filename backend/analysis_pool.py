@@ -0,0 +1,211 @@
+"""
+Bounded process pool for CPU-bound image analysis.
+
+Color extraction and room analysis hold the GIL for long stretches,
+which stalls every other request thread in the worker. AnalysisPool runs them
+in separate processes instead. Pixel arrays are handed over through shared
+memory rather than pickled, the number of queued tasks is capped, and every
+task has a deadline. When the pool is full or broken the task runs inline on
+the calling thread instead. A task that misses its deadline is abandoned with
+AnalysisTimeout rather than run a second time inline: a process task cannot
+be stopped once it runs, so it keeps its queue slot (and shared memory) until
+it actually finishes, and the slot limit bounds the work in flight.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Imported once by the forkserver so every pool process starts with the
+# scientific stack already loaded (and shared copy-on-write between them).
+PRELOAD_MODULES = ['numpy', 'image_analysis']
+
+
+def _init_pool_process():
+    """Keep each pool process single-threaded; the pool provides the parallelism."""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _run_with_shared_arrays(func, array_specs, kwargs):
+    """Pool-side entry point: map shared memory blocks back to arrays and call func."""
+    blocks = []
+    arrays = []
+    try:
+        for name, shape, dtype in array_specs:
+            # Pool processes share the submitting process's resource tracker,
+            # which already knows the block; the submitter unlinks it.
+            block = SharedMemory(name=name)
+            blocks.append(block)
+            arrays.append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+        return func(*arrays, **kwargs)
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+class AnalysisTimeout(Exception):
+    """A pool task missed its deadline; it was abandoned, not run again inline."""
+
+
+class AnalysisTask:
+    """Handle for a submitted analysis.
+
+    result() runs the work inline if the pool could not take it or broke
+    under it, and raises AnalysisTimeout if the pool was too slow.
+    """
+
+    def __init__(self, pool, func, arrays, kwargs, future=None, blocks=()):
+        self.pool = pool
+        self.func = func
+        self.arrays = arrays
+        self.kwargs = kwargs
+        self.future = future
+        self.blocks = list(blocks)
+        # Every task with a pool future holds a queue slot, whether or not it has arrays
+        self.holds_slot = future is not None
+        self.deadline = time.monotonic() + pool.task_timeout
+        if future is not None:
+            # The slot and shared memory are held until the pool is really done with the task
+            future.add_done_callback(self.release)
+
+    def result(self, timeout=None):
+        """Wait for the pool result (or run inline if there is no pool task to wait for).
+
+        timeout (seconds) can only shorten the wait below the pool's
+        task_timeout. Raises AnalysisTimeout when the wait runs out; the pool
+        task is cancelled if it has not started, and otherwise left to finish.
+        """
+        if self.future is None:
+            return self.func(*self.arrays, **self.kwargs)
+        remaining = max(0.0, self.deadline - time.monotonic())
+        if timeout is not None:
+            remaining = min(remaining, max(0.0, timeout))
+        try:
+            return self.future.result(timeout=remaining)
+        except FutureTimeoutError:
+            self.future.cancel()
+            self.pool.record('timeouts')
+            raise AnalysisTimeout(f"{self.func.__name__} did not finish within {remaining:.2f}s") from None
+        except BrokenProcessPool as e:
+            self.pool.mark_broken()
+            logger.error(f"Analysis pool broken while running {self.func.__name__}: {e}, running inline")
+        except CancelledError:
+            # Dropped from the queue of a pool that broke under another task; it never ran
+            logger.error(f"Analysis task {self.func.__name__} cancelled with its pool, running inline")
+        self.pool.record('inline_fallbacks')
+        return self.func(*self.arrays, **self.kwargs)
+
+    def release(self, future=None):
+        """Free the shared memory blocks and the queue slot held by this task (once its future is done)."""
+        with self.pool.lock:
+            blocks, self.blocks = self.blocks, []
+            holds_slot, self.holds_slot = self.holds_slot, False
+        for block in blocks:
+            block.close()
+            block.unlink()
+        if holds_slot:
+            self.pool.slots.release()
+
+
+class AnalysisPool:
+    """Process pool with queue-depth limit, per-task timeout and inline fallback."""
+
+    def __init__(self, max_workers=2, max_queue=8, task_timeout=20):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.task_timeout = task_timeout
+        self.executor = None
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max(1, max_queue))
+        self.counters = {'submitted': 0, 'inline_fallbacks': 0, 'queue_full': 0, 'timeouts': 0}
+
+    @property
+    def enabled(self):
+        return self.max_workers > 0
+
+    def record(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def get_executor(self):
+        """Start the process pool on first use (never in the gunicorn master)."""
+        with self.lock:
+            if self.executor is None:
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(PRELOAD_MODULES)
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_pool_process,
+                )
+                logger.info(f"Started analysis pool with {self.max_workers} processes")
+            return self.executor
+
+    def mark_broken(self):
+        """Drop a broken executor so the next submit starts a fresh one."""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, func, *arrays, **kwargs):
+        """Run func(*arrays, **kwargs) in the pool; returns an AnalysisTask.
+
+        func must be a module-level function importable by the pool processes
+        and arrays must be NumPy arrays. Falls back to inline execution when
+        the pool is disabled or already has max_queue tasks outstanding.
+        """
+        if not self.enabled:
+            return AnalysisTask(self, func, arrays, kwargs)
+        if not self.slots.acquire(blocking=False):
+            self.record('queue_full')
+            self.record('inline_fallbacks')
+            logger.warning(f"Analysis pool queue full ({self.max_queue} tasks), running {func.__name__} inline")
+            return AnalysisTask(self, func, arrays, kwargs)
+
+        blocks = []
+        try:
+            specs = []
+            for array in arrays:
+                array = np.ascontiguousarray(array)
+                block = SharedMemory(create=True, size=max(1, array.nbytes))
+                blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                specs.append((block.name, array.shape, array.dtype.str))
+            future = self.get_executor().submit(_run_with_shared_arrays, func, specs, kwargs)
+        except Exception as e:
+            for block in blocks:
+                block.close()
+                block.unlink()
+            self.slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self.mark_broken()
+            logger.error(f"Could not submit {func.__name__} to analysis pool: {e}, running inline")
+            self.record('inline_fallbacks')
+            return AnalysisTask(self, func, arrays, kwargs)
+
+        self.record('submitted')
+        return AnalysisTask(self, func, arrays, kwargs, future=future, blocks=blocks)
+
+    def reset_after_fork(self):
+        """Forget the parent's executor and locks in a freshly forked process."""
+        self.executor = None
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max(1, self.max_queue))
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, workers=self.max_workers, max_queue=self.max_queue,
+                        running=self.executor is not None)
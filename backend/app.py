@@ -18,7 +18,6 @@ import boto3
 from flask import Flask, request, jsonify, send_from_directory, render_template_string
 from PIL import Image, ImageDraw, ImageFont
 import pillow_heif
-from sklearn.cluster import KMeans
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import base64
@@ -32,6 +31,10 @@ from io import BytesIO
 from werkzeug.utils import secure_filename
 from botocore.exceptions import ClientError, NoCredentialsError
 from config import config
+from palette import extract_palette
+
+# Let PIL open HEIC/HEIF photos (iPhone uploads)
+pillow_heif.register_heif_opener()
 
 logging.basicConfig(
     level=logging.INFO,
@@ -185,27 +188,7 @@ def extract_dominant_colors(image_stream, n_colors=5):
                 new_width = int(max_dim * aspect)
             img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
         img.thumbnail((100, 100))
-        pixels = np.array(img).reshape(-1, 3)
-        kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init='auto').fit(pixels)
-        
-        colors = kmeans.cluster_centers_.astype(int)
-        labels = kmeans.labels_
-        
-        if labels is not None:
-            label_counts = np.bincount(labels)
-            total_pixels = len(pixels)
-            percentages = label_counts / total_pixels
-            
-            dominant_colors = []
-            for i in range(len(colors)):
-                dominant_colors.append({
-                    'color': f'#{colors[i][0]:02x}{colors[i][1]:02x}{colors[i][2]:02x}',
-                    'percentage': float(percentages[i])
-                })
-                
-            dominant_colors.sort(key=lambda x: x['percentage'], reverse=True)
-            return dominant_colors
-        return []
+        return extract_palette(np.array(img), n_colors, config.get_analysis_config()['palette_color_space'])
     except Exception as e:
         app.logger.error(f"Error extracting colors: {e}")
         return []
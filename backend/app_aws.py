@@ -17,33 +17,63 @@ import io
 import uuid
 import logging
 import psutil
-import gc
 import signal
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime
 import numpy as np
 import boto3
-from flask import Flask, request, jsonify, send_from_directory, render_template_string
-from PIL import Image, ImageDraw, ImageFont
+from flask import Flask, Response, request, g, jsonify, send_from_directory, render_template_string, url_for
+from PIL import Image
 import pillow_heif
-from sklearn.cluster import KMeans
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from limits.storage import MemoryStorage
 import base64
-import requests
 import time
-from functools import lru_cache
+from functools import lru_cache, partial
 from flask_cors import CORS
 import hashlib
+import itertools
 import re
 from io import BytesIO
 from werkzeug.utils import secure_filename
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError, NoCredentialsError
 from config import config
+from palette import lab_lut
+from analysis_pool import AnalysisPool, AnalysisTimeout
+from artwork_cache import ArtworkCache
+from assets import AssetResolver
+from mockup_encoding import (
+    DEFAULT_PROFILE as DEFAULT_MOCKUP_PROFILE, MAX_WIDTH as MOCKUP_MAX_WIDTH, MIME_TYPES, MIN_WIDTH as MOCKUP_MIN_WIDTH,
+    PIL_FORMATS, PROFILES as MOCKUP_PROFILES,
+    iter_encoded, negotiate_format, output_size as mockup_output_size, prepare_image, render_key
+)
+from mockup_layout import GALLERY_LAYOUTS, GALLERY_MAX_PIECES, gallery_layout, place_artwork
+from mockup_effects import (
+    FRAME_STYLES, NO_FRAME, cache_stats as mockup_effects_stats, cast_shadow, clear_caches as clear_mockup_effects,
+    configure_cache as configure_mockup_effects_cache, draw_frame, reset_after_fork as reset_mockup_effects_after_fork
+)
+from render_cache import DiskRenderStore, RenderCache, S3RenderStore, quantize_position
+from room_sessions import RoomSessionExpired, RoomSessionStore, ScaledRoomCache
+from mockup_prefetch import MockupPrefetcher
+from moderation import (
+    encode_moderation_payload, perceptual_hash, ModerationUnavailable, PerceptualModerationCache,
+    REKOGNITION_MAX_IMAGE_BYTES
+)
+from decode_budget import DecodeBudget, DecodeBudgetExceeded, inspect_image
+from uploads import UploadRequest, UploadTooLarge, UPLOAD_CHUNK_SIZE, spool_stream
+from image_analysis import (
+    AnalysisContext, COLOR_ANALYSIS_MAX_DIM, decode_image_reduced, load_color_thumbnail, load_room_array, dominant_colors_from_pixels, analyze_room_array,
+    analyze_room_array_anytime
+)
 import random
 import threading
 from functools import wraps
-import colorsys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Let PIL open HEIC/HEIF photos (iPhone uploads)
+pillow_heif.register_heif_opener()
 
 logging.basicConfig(
     level=logging.INFO,
@@ -153,6 +183,15 @@ def validate_startup():
 aws_config = config.get_aws_config()
 recommendation_config = config.get_recommendation_config()
 cache_config = config.get_cache_config()
+server_config = config.get_server_config()
+analysis_config = config.get_analysis_config()
+moderation_config = config.get_moderation_config()
+upload_config = config.get_upload_config()
+decode_config = config.get_decode_config()
+artwork_cache_config = config.get_artwork_cache_config()
+mockup_config = config.get_mockup_config()
+room_session_config = config.get_room_session_config()
+mockup_prefetch_config = config.get_mockup_prefetch_config()
 
 # Run startup validation after config is loaded
 try:
@@ -165,8 +204,29 @@ except Exception as e:
 # The static_url_path='' makes the static files available from the root URL.
 # Configure app to serve frontend files
 app = Flask(__name__, static_folder='static', static_url_path='')
+# Multipart file parts are spooled (size-limited and hashed) by UploadRequest
+UploadRequest.upload_max_bytes = upload_config['max_bytes']
+UploadRequest.upload_spool_bytes = upload_config['spool_bytes']
+app.request_class = UploadRequest
 CORS(app)
 
+def create_aws_clients(region):
+    """Create the DynamoDB, S3 and Rekognition clients from a fresh boto3 session.
+    
+    boto3 sessions and their connection pools must not be shared across
+    processes, so forked workers call this again instead of reusing the
+    clients created in the gunicorn master.
+    """
+    session = boto3.session.Session(region_name=region)
+    # Clients are shared by all gthread worker threads, so size their
+    # connection pools for that instead of botocore's default of 10.
+    client_config = BotoConfig(max_pool_connections=server_config['aws_max_pool_connections'])
+    return {
+        'dynamodb': session.resource('dynamodb', config=client_config),
+        's3': session.client('s3', config=client_config),
+        'rekognition': session.client('rekognition', config=client_config)
+    }
+
 # Initialize AWS clients after environment variables are loaded
 def get_aws_clients():
     """Initialize AWS clients with proper region configuration."""
@@ -180,16 +240,10 @@ def get_aws_clients():
         logger.info(f"AWS credentials validated for account: {identity['Account']}")
         
         # Initialize clients
-        dynamodb_client = boto3.resource('dynamodb', region_name=region)
-        s3_client = boto3.client('s3', region_name=region)
-        rekognition_client = boto3.client('rekognition', region_name=region)
+        clients = create_aws_clients(region)
         
         logger.info("AWS clients initialized successfully")
-        return {
-            'dynamodb': dynamodb_client,
-            's3': s3_client,
-            'rekognition': rekognition_client
-        }
+        return clients
     except NoCredentialsError:
         logger.error("AWS credentials not found. Check IAM role configuration.")
         raise
@@ -224,41 +278,201 @@ except Exception as e:
     logger.error(f"Failed to access DynamoDB table {aws_config['catalog_table_name']}: {e}")
     raise
 
+# boto3 clients are thread-safe but resources (like the Table above) are not,
+# so each worker thread gets its own Table built from its own session.
+thread_state = threading.local()
+
+def get_catalog_table():
+    """Return a DynamoDB Table resource owned by the calling thread."""
+    table = getattr(thread_state, 'catalog_table', None)
+    if table is None:
+        session = boto3.session.Session(region_name=aws_config['region'])
+        table = session.resource('dynamodb').Table(aws_config['catalog_table_name'])  # type: ignore
+        thread_state.catalog_table = table
+    return table
+
 # Rate limiting
 limiter = Limiter(
     get_remote_address,
     app=app,
     default_limits=["200 per day", "50 per hour"],
     storage_uri="memory://",
-    enabled=True,
+    enabled=server_config['ratelimit_enabled'],
 )
 
 # Simple in-memory cache
 class SimpleCache:
+    # Every cache ever created, so forked workers can reset them all
+    instances = []
+    
     def __init__(self, ttl_seconds=300):  # 5 minutes default TTL
         self.cache = {}
         self.ttl = ttl_seconds
+        self.lock = threading.Lock()
+        SimpleCache.instances.append(self)
     
     def get(self, key):
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if time.time() - timestamp < self.ttl:
-                return data
-            else:
-                del self.cache[key]  # Expired
-        return None
+        with self.lock:
+            if key in self.cache:
+                data, timestamp = self.cache[key]
+                if time.time() - timestamp < self.ttl:
+                    return data
+                else:
+                    del self.cache[key]  # Expired
+            return None
     
     def set(self, key, value):
-        self.cache[key] = (value, time.time())
+        with self.lock:
+            self.cache[key] = (value, time.time())
     
     def clear(self):
-        self.cache.clear()
+        with self.lock:
+            self.cache.clear()
+    
+    def reset_after_fork(self):
+        """Give a forked worker its own lock.
+        
+        A lock copied by fork may have been held by another thread of the
+        parent and would then never be released. Cached entries are kept so
+        data preloaded by the master stays shared copy-on-write.
+        """
+        self.lock = threading.Lock()
 
 # Initialize caches
 catalog_cache = SimpleCache(ttl_seconds=300)  # 5 minutes cache
 presigned_url_cache = SimpleCache(ttl_seconds=3600)  # 1 hour cache for S3 URLs
 moderation_cache = SimpleCache(ttl_seconds=600)  # 10 minutes cache for moderation results
 
+# Persistent near-duplicate moderation verdicts (loaded before fork when preloading).
+# Not emptied by /api/clear-cache: verdicts stay valid however often caches are reset.
+moderation_verdicts = PerceptualModerationCache(
+    db_path=moderation_config['hash_db'],
+    max_distance=moderation_config['hash_max_distance'],
+    approve_max_distance=moderation_config['hash_approve_max_distance'],
+    max_entries=moderation_config['hash_max_entries'],
+    max_age_days=moderation_config['hash_max_age_days']
+)
+
+# Process pool for CPU-bound upload analysis (started lazily in each worker)
+analysis_pool = AnalysisPool(
+    max_workers=analysis_config['pool_workers'],
+    max_queue=analysis_config['pool_max_queue'],
+    task_timeout=analysis_config['task_timeout']
+)
+
+if analysis_config['palette_color_space'] == 'lab':
+    # Build the RGB -> Lab table before gunicorn forks so workers share it
+    lab_lut()
+
+# Header-only pixel/frame budget applied before any untrusted image is decoded
+decode_budget = DecodeBudget(
+    max_pixels=decode_config['max_pixels'],
+    max_full_decode_pixels=decode_config['max_full_decode_pixels'],
+    max_frames=decode_config['max_frames']
+)
+
+# Background threads for moderation calls that overlap with local analysis
+moderation_executor = ThreadPoolExecutor(
+    max_workers=server_config['aws_max_pool_connections'],
+    thread_name_prefix='moderation'
+)
+
+# Threads compositing and encoding the mockups of /api/mockup/batch requests
+mockup_executor = ThreadPoolExecutor(
+    max_workers=mockup_config['batch_workers'],
+    thread_name_prefix='mockup'
+)
+
+# Serializes catalog reloads so concurrent threads missing the cache trigger one scan, not one each
+catalog_load_lock = threading.Lock()
+
+# --- Preload / Fork Support ---
+
+def warm_shared_state():
+    """Load data every worker needs before gunicorn forks them.
+    
+    Called in the master when running with --preload so the catalog is loaded
+    once and shared copy-on-write instead of being fetched by every worker.
+    """
+    logger.info("=== WARMING SHARED STATE BEFORE FORK ===")
+    catalog = load_catalog_from_dynamodb()
+    logger.info(f"Preloaded catalog with {len(catalog)} items")
+    log_memory_usage("after warming shared state")
+
+def reset_limiter_storage():
+    """Clear the rate limiter's in-memory counters in a forked worker."""
+    # The parent's counters (and any per-key lock a parent thread held at fork)
+    # mean nothing in the child; MemoryStorage restarts its expiry timer on the
+    # next hit. Shared storages (Redis, Memcached) are left alone.
+    if not limiter.enabled or not isinstance(limiter.storage, MemoryStorage):
+        return
+    limiter.reset()
+
+def reinit_aws_clients():
+    """Create the AWS clients (and the catalog table handle) for this process."""
+    global dynamodb, s3, rekognition, catalog_table
+    clients = create_aws_clients(aws_config['region'])
+    dynamodb = clients['dynamodb']
+    s3 = clients['s3']
+    rekognition = clients['rekognition']
+    catalog_table = dynamodb.Table(aws_config['catalog_table_name'])  # type: ignore
+
+def reinit_executors():
+    """Replace the thread pools, whose threads do not survive fork."""
+    global moderation_executor, mockup_executor
+    moderation_executor = ThreadPoolExecutor(
+        max_workers=server_config['aws_max_pool_connections'],
+        thread_name_prefix='moderation'
+    )
+    mockup_executor = ThreadPoolExecutor(
+        max_workers=mockup_config['batch_workers'],
+        thread_name_prefix='mockup'
+    )
+
+def reset_simple_caches():
+    for cache in SimpleCache.instances:
+        cache.reset_after_fork()
+
+def reinit_after_fork():
+    """Re-create per-process state in a freshly forked worker.
+    
+    Every step is guarded on its own, so one failing reset (say, creating
+    the AWS clients) is logged without leaving the others undone.
+    """
+    global thread_state, catalog_load_lock
+    thread_state = threading.local()
+    catalog_load_lock = threading.Lock()
+    # Objects are looked up when their step runs (the resolver and render cache get the new S3 client)
+    steps = [
+        ('AWS clients', reinit_aws_clients),
+        ('executors', reinit_executors),
+        ('simple caches', reset_simple_caches),
+        ('analysis pool', lambda: analysis_pool.reset_after_fork()),
+        ('moderation verdicts', lambda: moderation_verdicts.reset_after_fork()),
+        ('decode budget', lambda: decode_budget.reset_after_fork()),
+        ('artwork cache', lambda: artwork_cache.reset_after_fork()),
+        ('asset resolver', lambda: asset_resolver.reset_after_fork(s3)),
+        ('render cache', lambda: render_cache.reset_after_fork(s3)),
+        ('room sessions', lambda: room_sessions.reset_after_fork()),
+        ('scaled rooms', lambda: scaled_rooms.reset_after_fork()),
+        ('mockup prefetcher', lambda: mockup_prefetcher.reset_after_fork()),
+        ('mockup effects', reset_mockup_effects_after_fork),
+        ('rate limiter', reset_limiter_storage),
+    ]
+    failed = []
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            failed.append(name)
+            logger.error(f"Failed to re-initialize {name} after fork: {e}")
+    if failed:
+        logger.error(f"Worker {os.getpid()} started with stale state for: {', '.join(failed)}")
+    else:
+        logger.info(f"Re-initialized AWS clients and caches in worker {os.getpid()}")
+
+os.register_at_fork(after_in_child=reinit_after_fork)
+
 # --- Core Logic: Color Analysis, Moderation, Storage ---
 
 def safe_float(value):
@@ -361,40 +575,8 @@ def calculate_quality_score(item):
 def extract_dominant_colors(image_stream, n_colors=5):
     """Extracts dominant colors from an image stream with their percentages."""
     try:
-        img = Image.open(image_stream).convert('RGB')
-        # Aggressively resize very large images (like HEIC from iPhones)
-        max_dim = 1200  # Don't process images larger than 1200x1200 for color extraction
-        if img.width > max_dim or img.height > max_dim:
-            aspect = img.width / img.height
-            if img.width > img.height:
-                new_width = max_dim
-                new_height = int(max_dim / aspect)
-            else:
-                new_height = max_dim
-                new_width = int(max_dim * aspect)
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        img.thumbnail((100, 100))
-        pixels = np.array(img).reshape(-1, 3)
-        kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init='auto').fit(pixels)
-        
-        colors = kmeans.cluster_centers_.astype(int)
-        labels = kmeans.labels_
-        
-        if labels is not None:
-            label_counts = np.bincount(labels)
-            total_pixels = len(pixels)
-            percentages = label_counts / total_pixels
-            
-            dominant_colors = []
-            for i in range(len(colors)):
-                dominant_colors.append({
-                    'color': f'#{colors[i][0]:02x}{colors[i][1]:02x}{colors[i][2]:02x}',
-                    'percentage': float(percentages[i])
-                })
-                
-            dominant_colors.sort(key=lambda x: x['percentage'], reverse=True)
-            return dominant_colors
-        return []
+        return dominant_colors_from_pixels(load_color_thumbnail(image_stream), n_colors,
+                                           analysis_config['palette_color_space'])
     except Exception as e:
         app.logger.error(f"Error extracting colors: {e}")
         return []
@@ -402,235 +584,83 @@ def extract_dominant_colors(image_stream, n_colors=5):
 def analyze_room_characteristics(image_stream):
     """Analyze room characteristics to suggest appropriate art styles and subjects."""
     try:
-        # Reset stream position
-        image_stream.seek(0)
-        img = Image.open(image_stream).convert('RGB')
-        
-        # Resize for analysis
-        max_dim = 800
-        if img.width > max_dim or img.height > max_dim:
-            aspect = img.width / img.height
-            if img.width > img.height:
-                new_width = max_dim
-                new_height = int(max_dim / aspect)
-            else:
-                new_height = max_dim
-                new_width = int(max_dim * aspect)
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        # Convert to numpy array for analysis
-        img_array = np.array(img)
-        
-        # Analyze various characteristics
-        room_analysis = {
-            'brightness': analyze_brightness(img_array),
-            'color_palette': analyze_color_palette(img_array),
-            'contrast': analyze_contrast(img_array),
-            'texture_complexity': analyze_texture_complexity(img_array),
-            'architectural_style': detect_architectural_style(img_array),
-            'room_type': detect_room_type(img_array)
-        }
+        result = analyze_room_array(load_room_array(image_stream))
         
-        # Determine appropriate art characteristics
-        art_recommendations = determine_art_characteristics(room_analysis)
+        app.logger.info(f"Room analysis complete: {result['room_analysis']}")
+        app.logger.info(f"Art recommendations: {result['recommended_art_characteristics']}")
         
-        app.logger.info(f"Room analysis complete: {room_analysis}")
-        app.logger.info(f"Art recommendations: {art_recommendations}")
-        
-        return {
-            'room_analysis': room_analysis,
-            'recommended_art_characteristics': art_recommendations
-        }
+        return result
         
     except Exception as e:
         app.logger.error(f"Error analyzing room characteristics: {e}")
         return None
 
-def analyze_brightness(img_array):
-    """Analyze overall brightness of the room."""
-    # Convert to grayscale and calculate mean brightness
-    gray = np.mean(img_array, axis=2)
-    brightness = np.mean(gray) / 255.0
-    
-    if brightness > 0.7:
-        return 'bright'
-    elif brightness > 0.4:
-        return 'medium'
-    else:
-        return 'dark'
-
-def analyze_color_palette(img_array):
-    """Analyze the room's color palette characteristics."""
-    # Calculate color statistics
-    img_flat = img_array.reshape(-1, 3)
-    
-    # Calculate saturation
-    hsv = np.array([colorsys.rgb_to_hsv(r/255, g/255, b/255) for r, g, b in img_flat])
-    avg_saturation = np.mean(hsv[:, 1])
-    
-    # Calculate color temperature (warm vs cool)
-    red_channel = np.mean(img_array[:, :, 0])
-    blue_channel = np.mean(img_array[:, :, 2])
-    color_temp = 'warm' if red_channel > blue_channel else 'cool'
-    
-    if avg_saturation > 0.3:
-        saturation_level = 'vibrant'
-    elif avg_saturation > 0.15:
-        saturation_level = 'moderate'
-    else:
-        saturation_level = 'muted'
+def analyze_uploaded_image(context):
+    """Extract colors and room characteristics, offloading the CPU work to the analysis pool.
     
-    return {
-        'saturation': saturation_level,
-        'temperature': color_temp
-    }
-
-def analyze_contrast(img_array):
-    """Analyze contrast levels in the room."""
-    gray = np.mean(img_array, axis=2)
-    contrast = np.std(gray) / 255.0
-    
-    if contrast > 0.15:
-        return 'high'
-    elif contrast > 0.08:
-        return 'medium'
-    else:
-        return 'low'
-
-def analyze_texture_complexity(img_array):
-    """Analyze texture complexity using edge detection."""
+    The downscaled arrays come from the upload's AnalysisContext; the pool
+    only receives those small pixel buffers. Returns (user_colors,
+    room_characteristics) with the same failure values as
+    extract_dominant_colors and analyze_room_characteristics.
+    """
+    if context is None:
+        return [], None
     try:
-        from scipy import ndimage
-        
-        gray = np.mean(img_array, axis=2)
-        
-        # Simple edge detection
-        sobel_x = ndimage.sobel(gray, axis=1)
-        sobel_y = ndimage.sobel(gray, axis=0)
-        edge_magnitude = np.sqrt(sobel_x**2 + sobel_y**2)
-        
-        texture_score = np.mean(edge_magnitude)
-        
-        if texture_score > 30:
-            return 'complex'
-        elif texture_score > 15:
-            return 'moderate'
-        else:
-            return 'simple'
-            
-    except ImportError:
-        # Fallback without scipy
-        return 'moderate'
-    except Exception:
-        return 'moderate'
-
-def detect_architectural_style(img_array):
-    """Detect architectural style based on visual cues."""
-    # This is a simplified heuristic-based approach
-    # In a production system, you might use a trained ML model
-    
-    gray = np.mean(img_array, axis=2)
-    
-    # Analyze line patterns (horizontal/vertical dominance)
-    horizontal_edges = np.sum(np.abs(np.diff(gray, axis=0)))
-    vertical_edges = np.sum(np.abs(np.diff(gray, axis=1)))
-    
-    edge_ratio = horizontal_edges / (vertical_edges + 1)
-    
-    # Simple heuristics based on color and structure
-    avg_brightness = np.mean(gray) / 255.0
-    
-    if avg_brightness > 0.7 and edge_ratio > 1.2:
-        return 'modern'
-    elif avg_brightness < 0.4:
-        return 'traditional'
-    elif edge_ratio < 0.8:
-        return 'rustic'
-    else:
-        return 'contemporary'
-
-def detect_room_type(img_array):
-    """Detect room type based on visual characteristics."""
-    # Simplified heuristic approach
-    # In production, this could use object detection to identify furniture
+        color_pixels = context.color_pixels
+        room_array = context.room_array
+    except Exception as e:
+        app.logger.error(f"Error decoding uploaded image: {e}")
+        return [], None
     
-    height, width = img_array.shape[:2]
-    aspect_ratio = width / height
+    # Submit both before waiting on either so they run on separate cores
+    colors_task = analysis_pool.submit(dominant_colors_from_pixels, color_pixels,
+                                       color_space=analysis_config['palette_color_space'])
+    budget = analysis_config['latency_budget']
+    deadline = None
+    if budget > 0:
+        # The pool process aims to finish 90% into the budget, leaving the rest
+        # for handing the result back; time.monotonic() is system-wide, so the
+        # deadline means the same thing in the pool process. If the pool still
+        # misses the budget the room analysis is abandoned (AnalysisTimeout)
+        # rather than started again inline.
+        deadline = time.monotonic() + budget
+        room_task = analysis_pool.submit(analyze_room_array_anytime, room_array, deadline=deadline - 0.1 * budget)
+    else:
+        room_task = analysis_pool.submit(analyze_room_array, room_array)
     
-    # Analyze color distribution for clues
-    avg_color = np.mean(img_array, axis=(0, 1))
+    try:
+        # The upload cannot be answered without colors, so they get the pool's
+        # task_timeout rather than the latency budget
+        user_colors = colors_task.result()
+    except AnalysisTimeout as e:
+        # A backed-up pool: extract them here from the small thumbnail instead of failing the upload
+        app.logger.warning(f"Color extraction abandoned: {e}, extracting inline")
+        try:
+            user_colors = dominant_colors_from_pixels(color_pixels, color_space=analysis_config['palette_color_space'])
+        except Exception as e:
+            app.logger.error(f"Error extracting colors: {e}")
+            user_colors = []
+    except Exception as e:
+        app.logger.error(f"Error extracting colors: {e}")
+        user_colors = []
     
-    # Simple heuristics
-    if aspect_ratio > 1.5:
-        return 'living_room'  # Often wider spaces
-    elif avg_color[0] > avg_color[1] and avg_color[0] > avg_color[2]:
-        return 'bedroom'  # Often warmer tones
-    else:
-        return 'general'
-
-def determine_art_characteristics(room_analysis):
-    """Determine appropriate art characteristics based on room analysis."""
-    recommendations = {
-        'preferred_styles': [],
-        'preferred_subjects': [],
-        'size_recommendation': 'medium',
-        'color_guidance': '',
-        'reasoning': []
-    }
+    try:
+        room_timeout = None if deadline is None else deadline - time.monotonic()
+        room_characteristics = room_task.result(timeout=room_timeout)
+        app.logger.info(f"Room analysis complete: {room_characteristics['room_analysis']}")
+        if 'analysis_timing' in room_characteristics:
+            timing = room_characteristics['analysis_timing']
+            app.logger.info(f"Room analysis reached {timing['resolution']}px in {timing['total_ms']}ms "
+                            f"({len(timing['stages'])} stages, complete={timing['complete']})")
+        app.logger.info(f"Art recommendations: {room_characteristics['recommended_art_characteristics']}")
+    except AnalysisTimeout as e:
+        app.logger.warning(f"Room analysis abandoned: {e}")
+        room_characteristics = None
+    except Exception as e:
+        app.logger.error(f"Error analyzing room characteristics: {e}")
+        room_characteristics = None
     
-    brightness = room_analysis['brightness']
-    color_palette = room_analysis['color_palette']
-    contrast = room_analysis['contrast']
-    texture = room_analysis['texture_complexity']
-    arch_style = room_analysis['architectural_style']
-    room_type = room_analysis['room_type']
-    
-    # Style recommendations based on architectural style
-    if arch_style == 'modern':
-        recommendations['preferred_styles'].extend(['Contemporary', 'Abstract', 'Minimalist'])
-        recommendations['preferred_subjects'].extend(['Abstract', 'Geometric', 'Cityscape'])
-        recommendations['reasoning'].append("Modern architecture pairs well with contemporary and abstract art")
-    elif arch_style == 'traditional':
-        recommendations['preferred_styles'].extend(['Classical', 'Realistic', 'Impressionist'])
-        recommendations['preferred_subjects'].extend(['Landscape', 'Portrait', 'Still Life'])
-        recommendations['reasoning'].append("Traditional spaces complement classical and realistic art styles")
-    elif arch_style == 'rustic':
-        recommendations['preferred_styles'].extend(['Folk', 'Landscape', 'Nature'])
-        recommendations['preferred_subjects'].extend(['Landscape', 'Nature', 'Animal'])
-        recommendations['reasoning'].append("Rustic environments work well with nature-inspired art")
-    else:  # contemporary
-        recommendations['preferred_styles'].extend(['Contemporary', 'Mixed Media'])
-        recommendations['preferred_subjects'].extend(['Abstract', 'Landscape', 'Portrait'])
-        recommendations['reasoning'].append("Contemporary spaces allow for diverse art styles")
-    
-    # Adjust based on brightness
-    if brightness == 'dark':
-        recommendations['color_guidance'] = 'Consider brighter, more vibrant pieces to add energy'
-        recommendations['reasoning'].append("Darker rooms benefit from brighter artwork")
-    elif brightness == 'bright':
-        recommendations['color_guidance'] = 'Subtle or bold pieces both work well'
-        recommendations['reasoning'].append("Bright rooms provide flexibility in color choices")
-    
-    # Adjust based on color palette
-    if color_palette['saturation'] == 'muted':
-        recommendations['reasoning'].append("Muted room colors allow for more vibrant art")
-    elif color_palette['saturation'] == 'vibrant':
-        recommendations['reasoning'].append("Vibrant room colors pair well with complementary or neutral art")
-    
-    # Room type specific recommendations
-    if room_type == 'bedroom':
-        recommendations['preferred_subjects'].extend(['Landscape', 'Abstract', 'Nature'])
-        recommendations['reasoning'].append("Bedrooms benefit from calming subjects")
-    elif room_type == 'living_room':
-        recommendations['preferred_subjects'].extend(['Landscape', 'Abstract', 'Portrait'])
-        recommendations['size_recommendation'] = 'large'
-        recommendations['reasoning'].append("Living rooms can accommodate larger statement pieces")
-    
-    # Remove duplicates
-    recommendations['preferred_styles'] = list(set(recommendations['preferred_styles']))
-    recommendations['preferred_subjects'] = list(set(recommendations['preferred_subjects']))
-    
-    return recommendations
+    return user_colors, room_characteristics
 
 def get_contextual_recommendations(user_colors, room_characteristics, max_recs=recommendation_config['max_recommendations']):
     """Get recommendations that consider both colors and room context."""
@@ -827,8 +857,18 @@ def load_catalog_from_dynamodb():
         app.logger.info("Returning cached catalog data")
         return cached_data
     
+    with catalog_load_lock:
+        # Another thread may have reloaded the catalog while we waited
+        cached_data = catalog_cache.get('art_catalog')
+        if cached_data:
+            return cached_data
+        return fetch_catalog_from_dynamodb()
+
+def fetch_catalog_from_dynamodb():
+    """Scan the catalog table and refresh the catalog cache."""
     # Cache miss - fetch from DynamoDB
     app.logger.info("Cache miss - fetching catalog from DynamoDB")
+    catalog_table = get_catalog_table()
     try:
         # Use a more efficient scan with projection
         response = catalog_table.scan(
@@ -1047,18 +1087,60 @@ def get_recommendations_by_filter(filters):
         app.logger.error(f"Error in filter recommendations: {e}")
         return []
 
-def moderate_image_content(image_bytes):
-    """Moderate image content using AWS Rekognition."""
+def build_moderation_payload(img, image_file):
+    """Return the bytes to send to Rekognition for an upload.
+    
+    Uses a downscaled JPEG re-encoded from the already decoded image; falls
+    back to the original bytes (read from image_file) only if the image could
+    not be decoded.
+    """
+    if img is None:
+        image_file.seek(0)
+        return image_file.read()
+    try:
+        payload = encode_moderation_payload(
+            img,
+            max_dim=moderation_config['max_dim'],
+            quality=moderation_config['jpeg_quality']
+        )
+        if payload is not None:
+            app.logger.info(f"Moderation payload: {len(payload)} bytes (original {image_file.seek(0, io.SEEK_END)} bytes)")
+            return payload
+    except Exception as e:
+        app.logger.error(f"Error preparing moderation payload: {e}")
+    image_file.seek(0)
+    return image_file.read()
+
+def moderate_image_content(image_bytes, moderation_bytes=None, image_hash=None, cache_key=None):
+    """Moderate image content using AWS Rekognition.
+    
+    Verdicts are cached by exact bytes and, when image_hash (a perceptual
+    hash of the decoded image) is given, for near-duplicates too.
+    moderation_bytes, if given, is the (smaller) payload actually sent to
+    Rekognition; cache_key, if given, is the MD5 of the original upload, in
+    which case image_bytes may be None. Raises ModerationUnavailable when
+    the payload is over Rekognition's size limit, which is not a verdict.
+    """
     try:
         # Check cache first
-        cache_key = hashlib.md5(image_bytes).hexdigest()
+        if cache_key is None:
+            cache_key = hashlib.md5(image_bytes).hexdigest()
         cached_result = moderation_cache.get(cache_key)
         if cached_result:
             return cached_result
+        if image_hash is not None:
+            cached_result = moderation_verdicts.get(image_hash)
+            if cached_result:
+                return cached_result
+        
+        payload = moderation_bytes if moderation_bytes is not None else image_bytes
+        if len(payload) > REKOGNITION_MAX_IMAGE_BYTES:
+            raise ModerationUnavailable(f"{len(payload)} byte payload is over the "
+                                        f"{REKOGNITION_MAX_IMAGE_BYTES} byte moderation limit")
         
         # Use AWS Rekognition for content moderation
         response = rekognition.detect_moderation_labels(
-            Image={'Bytes': image_bytes}
+            Image={'Bytes': payload}
         )
         
         moderation_labels = response.get('ModerationLabels', [])
@@ -1071,15 +1153,19 @@ def moderate_image_content(image_bytes):
         
         # Cache the result
         moderation_cache.set(cache_key, result)
+        if image_hash is not None:
+            moderation_verdicts.set(image_hash, result)
         
         return result
         
+    except ModerationUnavailable:
+        raise
     except Exception as e:
         app.logger.error(f"Error in content moderation: {e}")
         return (False, f"Moderation error: {str(e)}")
 
 def store_quarantined_image(image_bytes, filename, reason):
-    """Store image in quarantine bucket with metadata."""
+    """Store image (bytes or a readable file) in quarantine bucket with metadata."""
     try:
         s3.put_object(
             Bucket=aws_config['quarantine_bucket'],
@@ -1252,6 +1338,344 @@ def preferences_options():
         app.logger.error(f"Error getting preference options: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+# Catalog-bucket URLs are read with the shared S3 client, other URLs over a keep-alive session
+asset_resolver = AssetResolver(
+    s3,
+    aws_config['catalog_bucket_name'],
+    check_size=decode_budget.check_size,
+    max_pool_connections=server_config['aws_max_pool_connections']
+)
+
+def fetch_image_bytes(url, max_bytes):
+    """Download an image, refusing (DecodeBudgetExceeded) anything over max_bytes."""
+    return asset_resolver.fetch(url, max_bytes).stream
+
+def fetch_catalog_artwork(filename, etag=None):
+    """Read a catalog artwork from S3 for the artwork cache; returns (stream or None if unchanged, etag)."""
+    asset = asset_resolver.get_object(filename, upload_config['max_bytes'], etag)
+    return asset.stream, asset.etag
+
+# Catalog artworks for mockups: pre-scaled bitmaps in memory, original bytes on disk
+artwork_cache = ArtworkCache(
+    fetch=fetch_catalog_artwork,
+    decode=decode_budget.open,
+    memory_bytes=artwork_cache_config['memory_bytes'],
+    disk_dir=artwork_cache_config['disk_dir'] or None,
+    disk_bytes=artwork_cache_config['disk_bytes'],
+    max_dim=artwork_cache_config['max_dim'],
+    revalidate_seconds=artwork_cache_config['revalidate_seconds']
+)
+
+# Encoded mockups by content key: per-worker memory tier over an optional S3 or disk tier
+if mockup_config['render_cache_bucket']:
+    render_store = S3RenderStore(s3, mockup_config['render_cache_bucket'], mockup_config['render_cache_prefix'],
+                                 mockup_config['render_cache_max_age_seconds'])
+elif mockup_config['render_cache_dir']:
+    render_store = DiskRenderStore(mockup_config['render_cache_dir'], mockup_config['render_cache_disk_bytes'])
+else:
+    render_store = None
+render_cache = RenderCache(memory_bytes=mockup_config['render_cache_memory_bytes'], store=render_store)
+
+# Shadow profiles and frame sprites of preview-sized pieces
+configure_mockup_effects_cache(mockup_config['effects_cache_bytes'])
+
+# Asynchronous mockup renders of this worker by job id (futures on the mockup executor). A
+# finished job's image lives in render_cache, so these hold no image bytes
+mockup_jobs = SimpleCache(ttl_seconds=600)
+
+# Decoded room photos from /upload-image, referenced by mockup requests through room_token
+room_sessions = RoomSessionStore(
+    ttl_seconds=room_session_config['ttl_seconds'],
+    memory_bytes=room_session_config['memory_bytes'],
+    max_dim=room_session_config['max_dim'],
+    disk_dir=room_session_config['disk_dir'] or None,
+    disk_bytes=room_session_config['disk_bytes']
+)
+# Rooms already scaled to the preview sizes clients ask for
+scaled_rooms = ScaledRoomCache(max_bytes=room_session_config['preview_cache_bytes'])
+
+# Speculative preview mockups of the top recommendations, rendered after the upload response
+mockup_prefetcher = MockupPrefetcher(
+    max_load=mockup_prefetch_config['max_load'],
+    max_active_requests=mockup_prefetch_config['max_active_requests'],
+    max_pending=mockup_prefetch_config['max_pending']
+)
+
+@app.before_request
+def count_request_started():
+    mockup_prefetcher.request_started()
+    g.counted_request = True
+
+@app.teardown_request
+def count_request_finished(exc):
+    # Only requests that were counted: an earlier before_request (the rate limiter's 429) skips ours
+    if g.pop('counted_request', False):
+        mockup_prefetcher.request_finished()
+
+def load_artwork_image(url=None, filename=None):
+    """Load a mockup artwork, through the artwork cache for catalog filenames and catalog-bucket URLs."""
+    filename = filename or asset_resolver.catalog_key(url)
+    if filename is None:
+        return load_mockup_image(url)
+    return artwork_cache.get(filename)
+
+def open_mockup_stream(url):
+    """Return the bytes of a mockup source (data URL or HTTP URL) as a stream, after checking the byte budget."""
+    max_bytes = upload_config['max_bytes']
+    if url.startswith('data:'):
+        # Handle data URL
+        header, encoded = url.split(",", 1)
+        decode_budget.check_size(len(encoded) * 3 // 4, max_bytes)
+        return BytesIO(base64.b64decode(encoded))
+    # Handle HTTP URL
+    return fetch_image_bytes(url, max_bytes)
+
+def load_mockup_image(url):
+    """Open a mockup source (data URL or HTTP URL) after checking its byte and pixel budgets."""
+    return decode_budget.open(open_mockup_stream(url))
+
+def load_mockup_room(room_url, room_session, room_ref, profile, width=None):
+    """Load the room photo for a mockup tier; returns (room_img, reference_size, output_size).
+    
+    reference_size is the room's full resolution (placement is computed
+    there) and output_size the size to render at, from the profile's
+    max_dim and the client's target width. When that is smaller than the
+    photo, the photo is decoded at reduced scale (JPEG draft mode, integer
+    reduction), so an on-screen preview never decodes 12MP, and the room
+    scaled to output_size is kept in scaled_rooms under room_ref for the
+    next preview at that size. A session room is rendered from its bitmap
+    when that is large enough for the output, and otherwise (downloads)
+    from the uploaded original.
+    """
+    stream = None
+    if room_session is not None and not session_needs_original(room_session, profile, width):
+        room_img = room_session.image
+        reference_size = room_img.size
+        size = mockup_output_size(reference_size, profile, width)
+        if size == reference_size:
+            return room_img, reference_size, size
+    else:
+        if room_session is not None:
+            stream = room_session.open_original()
+            room_ref = f"{room_ref}-original"
+        else:
+            stream = open_mockup_stream(room_url)
+        header = inspect_image(stream)
+        reference_size = (header.width, header.height)
+        size = mockup_output_size(reference_size, profile, width)
+        if size == reference_size:
+            room_img = decode_budget.open(stream)
+            return room_img, reference_size, room_img.size
+    
+    scaled = scaled_rooms.get(room_ref, size)
+    if scaled is not None:
+        return scaled[0], scaled[1], size
+    if stream is not None:
+        decode_budget.check_stream(stream)
+        room_img, _ = decode_image_reduced(stream, max(size))
+    room_img = room_img.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    scaled_rooms.put(room_ref, room_img, reference_size)
+    return room_img, reference_size, size
+
+def session_needs_original(room_session, profile, width=None):
+    """Whether a mockup of a session room at this tier needs more pixels than the stored bitmap has."""
+    if room_session.original is None:
+        return False
+    bitmap_size = room_session.image.size
+    return profile.max_dim is None or mockup_output_size(bitmap_size, profile, width) == bitmap_size
+
+def render_mockup(artwork_img, room_img, artwork_position, output_size=None, reference_size=None, frame=None):
+    """Composite the artwork onto the room photo at artwork_position (percentages of the room size).
+    
+    The artwork is placed in pixels of the room at reference_size (its full
+    resolution; room_img's size by default) and the mockup is rendered at
+    output_size (room_img's size by default), so a preview rendered from a
+    downscaled room matches the full-resolution mockup. frame is an optional
+    FrameStyle (see mockup_effects).
+    """
+    # Preserve original color modes to maintain vibrancy
+    original_artwork_mode = artwork_img.mode
+    original_room_mode = room_img.mode
+    
+    app.logger.info(f"Original artwork mode: {original_artwork_mode}, room mode: {original_room_mode}")
+    
+    # Get dimensions
+    room_width, room_height = room_img.size
+    artwork_width, artwork_height = artwork_img.size
+    output_size = tuple(output_size or room_img.size)
+    
+    app.logger.info(f"Room dimensions: {room_width}x{room_height}, rendering at {output_size[0]}x{output_size[1]}")
+    app.logger.info(f"Artwork dimensions: {artwork_width}x{artwork_height}")
+    app.logger.info(f"Artwork position: {artwork_position}")
+    
+    # Size (at most 30% of the room) and position the artwork at full resolution, then scale to the output
+    placement = place_artwork(reference_size or room_img.size, artwork_img.size, artwork_position)
+    paste_x, paste_y, new_artwork_width, new_artwork_height = placement.scaled(output_size)
+    
+    app.logger.info(f"Final artwork size: {new_artwork_width}x{new_artwork_height}")
+    app.logger.info(f"Final paste position: ({paste_x}, {paste_y})")
+    
+    return composite_artworks(room_img, [(artwork_img, placement)], output_size, frame)
+
+def composite_artworks(room_img, pieces, output_size=None, frame=None):
+    """Paste artworks onto the room photo, rendered at output_size (room_img's size by default).
+    
+    pieces are (artwork_img, Placement) pairs. The room is copied (or
+    scaled) once for all of them and each artwork is resized once, straight
+    to its box at the output size. With a frame style, every piece's shadow
+    is cast first (so no shadow falls across a neighbour) and the frame and
+    mat then take the outer edge of its box, the artwork the window inside.
+    """
+    if room_img.mode not in ['RGB', 'RGBA']:
+        room_img = room_img.convert('RGB')
+    output_size = tuple(output_size or room_img.size)
+    
+    # Create result image with same mode as room image for better color preservation
+    if output_size != room_img.size:
+        result_img = room_img.resize(output_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    else:
+        result_img = room_img.copy()
+    
+    boxes = [placement.scaled(output_size) for _, placement in pieces]
+    if frame is not None:
+        for box in boxes:
+            cast_shadow(result_img, box, frame)
+    
+    for (artwork_img, _), box in zip(pieces, boxes):
+        if artwork_img.mode not in ['RGB', 'RGBA']:
+            artwork_img = artwork_img.convert('RGB')
+        paste_x, paste_y, width, height = draw_frame(result_img, box, frame) if frame is not None else box
+        
+        # Resize artwork with high quality resampling to preserve colors (reducing_gap only
+        # kicks in for the large reductions of preview sizes)
+        artwork_img = artwork_img.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        
+        # Paste artwork onto room background
+        if artwork_img.mode == 'RGBA':
+            # If artwork has transparency, use alpha compositing
+            result_img.paste(artwork_img, (paste_x, paste_y), artwork_img)
+        else:
+            # Otherwise, paste directly
+            result_img.paste(artwork_img, (paste_x, paste_y))
+    
+    return result_img
+
+def parse_mockup_request(data):
+    """Validate a mockup request body; returns (artwork_url, artwork_filename, room_url, room_session, artwork_position) or None.
+    
+    The room is given as room_url or as the room_token returned by
+    /upload-image; room_session is the stored room when the token is valid.
+    An unknown or expired token without a room_url to fall back on raises
+    RoomSessionExpired. The position is snapped to the MOCKUP_POSITION_GRID
+    so nearby positions share a cached render.
+    """
+    artwork_url = data.get('artwork_url')
+    artwork_filename = data.get('artwork_filename')
+    room_url = data.get('room_url')
+    room_token = data.get('room_token')
+    if not (artwork_url or artwork_filename) or not (room_url or room_token):
+        return None
+    room_session = resolve_room_session(room_url, room_token)
+    artwork_position = quantize_position(data.get('artwork_position') or {}, mockup_config['position_grid'])
+    return artwork_url, artwork_filename, room_url, room_session, artwork_position
+
+def resolve_room_session(room_url, room_token):
+    """Look up a room token; raises RoomSessionExpired if it is gone and there is no room_url to use instead."""
+    room_session = room_sessions.get(room_token) if room_token else None
+    if room_token and room_session is None and not room_url:
+        raise RoomSessionExpired(room_token)
+    return room_session
+
+def mockup_source_digest(url):
+    """Identify a mockup source by content: the digest of a data URL's payload, or the catalog key of a catalog URL."""
+    if url.startswith('data:'):
+        return hashlib.sha256(url.split(',', 1)[-1].encode()).hexdigest()
+    # Presigned query strings change hourly, the object they point to does not
+    return asset_resolver.catalog_key(url) or hashlib.sha256(url.encode()).hexdigest()
+
+def mockup_artwork_ref(artwork_url, artwork_filename):
+    """Content reference of a mockup artwork: its catalog filename and ETag, or a digest."""
+    filename = artwork_filename or asset_resolver.catalog_key(artwork_url)
+    if filename is None:
+        return mockup_source_digest(artwork_url)
+    # Replacing a catalog object changes its ETag, so renders of the old version are never served for it
+    return f"{filename}@{artwork_cache.version(filename)}"
+
+def try_mockup_artwork_ref(item):
+    """mockup_artwork_ref of a batch item, or the exception that prevented it."""
+    try:
+        return mockup_artwork_ref(item['url'], item['filename'])
+    except Exception as e:
+        return e
+
+def mockup_room_ref(room_url, room_session):
+    """Content reference of a mockup room photo."""
+    if room_session is not None:
+        # A session room is the upload downscaled to ROOM_SESSION_MAX_DIM
+        return f"session-{room_session.digest}-{room_session.image.width}x{room_session.image.height}"
+    return mockup_source_digest(room_url)
+
+def mockup_render_key(artwork_ref, room_ref, artwork_position, profile_name, max_dim, output_format, width=None,
+                      frame=None):
+    """Content key of a rendering (render cache key and ETag)."""
+    # Unframed keys stay as they were before frames existed, so earlier renders are still found
+    framing = (frame.name,) if frame is not None else ()
+    return render_key(room_ref, artwork_ref, artwork_position['x'], artwork_position['y'],
+                      profile_name, max_dim, width, output_format, *framing)
+
+def parse_mockup_width(data):
+    """The client's target width in pixels from a mockup request body; returns (width or None, error message or None)."""
+    width = data.get('width')
+    if width is None:
+        return None, None
+    if isinstance(width, bool) or not isinstance(width, int) or not MOCKUP_MIN_WIDTH <= width <= MOCKUP_MAX_WIDTH:
+        return None, f"width must be a whole number of pixels from {MOCKUP_MIN_WIDTH} to {MOCKUP_MAX_WIDTH}"
+    return width, None
+
+def parse_mockup_frame(data):
+    """The frame style from a mockup request body; returns (FrameStyle or None for a plain paste, error message or None)."""
+    name = data.get('frame') or NO_FRAME
+    if name == NO_FRAME:
+        return None, None
+    if name not in FRAME_STYLES:
+        return None, f"Unknown frame; use one of {[NO_FRAME] + sorted(FRAME_STYLES)}"
+    return FRAME_STYLES[name], None
+
+def load_mockup_sources(artwork_url, artwork_filename, room_url, room_session=None):
+    """Load the artwork (through the artwork cache when it is a catalog image) and the room photo."""
+    if artwork_filename:
+        app.logger.info(f"Generating mockup - catalog artwork {artwork_filename}")
+    else:
+        app.logger.info(f"Generating mockup - Artwork URL type: {'data_url' if artwork_url.startswith('data:') else 'http_url'}")
+    
+    # Load images with better color preservation (within the decode budget)
+    artwork_img = load_artwork_image(artwork_url, artwork_filename)
+    if room_session is None:
+        room_img = load_mockup_image(room_url)
+    elif room_session.original is not None:
+        room_img = decode_budget.open(room_session.open_original())  # Full size, like a download
+    else:
+        room_img = room_session.image
+    return artwork_img, room_img
+
+def mockup_error_details(e):
+    """HTTP status and JSON body describing a failed mockup."""
+    if isinstance(e, DecodeBudgetExceeded):
+        app.logger.warning(f"Mockup source image rejected: {e}")
+        return 413, {'success': False, 'error': f'Image too large: {e}'}
+    if isinstance(e, ClientError) and e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+        return 404, {'success': False, 'error': 'Artwork not found'}
+    if isinstance(e, RoomSessionExpired):
+        return 410, {'success': False, 'error': 'Room session expired, please send the room photo again',
+                     'error_code': 'room_session_expired'}
+    app.logger.error(f"Error generating mockup: {str(e)}")
+    return 500, {'success': False, 'error': str(e)}
+
+def mockup_error_response(e):
+    """JSON error response for a failed mockup request."""
+    status, body = mockup_error_details(e)
+    return jsonify(body), status
+
 @app.route('/api/generate-mockup', methods=['POST'])
 @limiter.limit("10 per minute")
 def generate_mockup():
@@ -1261,138 +1685,490 @@ def generate_mockup():
         if not data:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
         
-        artwork_url = data.get('artwork_url')
-        room_url = data.get('room_url')
-        artwork_position = data.get('artwork_position', {})
-        
-        if not artwork_url or not room_url:
+        parsed = parse_mockup_request(data)
+        if parsed is None:
             return jsonify({'success': False, 'error': 'Missing artwork_url or room_url'}), 400
-        
-        app.logger.info(f"Generating mockup - Artwork URL type: {'data_url' if artwork_url.startswith('data:') else 'http_url'}")
-        
-        # Load images with better color preservation
-        if artwork_url.startswith('data:'):
-            # Handle data URL
-            header, encoded = artwork_url.split(",", 1)
-            artwork_data = base64.b64decode(encoded)
-            artwork_img = Image.open(BytesIO(artwork_data))
-        else:
-            # Handle HTTP URL
-            artwork_response = requests.get(artwork_url, timeout=30)
-            artwork_response.raise_for_status()
-            artwork_img = Image.open(BytesIO(artwork_response.content))
-        
-        if room_url.startswith('data:'):
-            # Handle data URL
-            header, encoded = room_url.split(",", 1)
-            room_data = base64.b64decode(encoded)
-            room_img = Image.open(BytesIO(room_data))
+        artwork_url, artwork_filename, room_url, room_session, artwork_position = parsed
+        frame, error = parse_mockup_frame(data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        key = mockup_render_key(mockup_artwork_ref(artwork_url, artwork_filename), mockup_room_ref(room_url, room_session),
+                                artwork_position, 'data-url', None, 'jpeg', frame=frame)
+        cached = render_cache.get(key, 'jpeg')
+        if cached is not None:
+            app.logger.info(f"Mockup served from render cache ({len(cached.data)} bytes)")
+            jpeg_bytes = cached.data
         else:
-            # Handle HTTP URL
-            room_response = requests.get(room_url, timeout=30)
-            room_response.raise_for_status()
-            room_img = Image.open(BytesIO(room_response.content))
-        
-        # Preserve original color modes to maintain vibrancy
-        original_artwork_mode = artwork_img.mode
-        original_room_mode = room_img.mode
-        
-        app.logger.info(f"Original artwork mode: {original_artwork_mode}, room mode: {original_room_mode}")
-        
-        # Only convert to RGB if absolutely necessary, and preserve color information
-        if artwork_img.mode not in ['RGB', 'RGBA']:
-            artwork_img = artwork_img.convert('RGB')
-        if room_img.mode not in ['RGB', 'RGBA']:
-            room_img = room_img.convert('RGB')
-        
-        # Get dimensions
-        room_width, room_height = room_img.size
-        artwork_width, artwork_height = artwork_img.size
-        
-        app.logger.info(f"Room dimensions: {room_width}x{room_height}")
-        app.logger.info(f"Artwork dimensions: {artwork_width}x{artwork_height}")
-        app.logger.info(f"Artwork position: {artwork_position}")
+            artwork_img, room_img = load_mockup_sources(artwork_url, artwork_filename, room_url, room_session)
+            result_img = render_mockup(artwork_img, room_img, artwork_position, frame=frame)
+            
+            # Convert to bytes with maximum quality JPEG for best color preservation
+            output_buffer = BytesIO()
+            result_img.save(output_buffer, format='JPEG', quality=100, optimize=False, progressive=False, subsampling=0)
+            jpeg_bytes = output_buffer.getvalue()
+            render_cache.put(key, 'jpeg', jpeg_bytes)
+            
+            app.logger.info(f"Mockup saved as JPEG with quality 100, size: {len(jpeg_bytes)} bytes")
         
-        # Calculate artwork size (limit to 30% of room size)
-        artwork_ratio = artwork_width / artwork_height
-        if artwork_ratio > 1:  # Landscape
-            new_artwork_width = min(int(room_width * 0.3), artwork_width)
-            new_artwork_height = int(new_artwork_width / artwork_ratio)
-        else:  # Portrait
-            new_artwork_height = min(int(room_height * 0.3), artwork_height)
-            new_artwork_width = int(new_artwork_height * artwork_ratio)
+        # Convert to base64
+        image_data = base64.b64encode(jpeg_bytes).decode('utf-8')
+        data_url = f"data:image/jpeg;base64,{image_data}"
         
-        # Resize artwork with high quality resampling to preserve colors
-        artwork_img = artwork_img.resize((new_artwork_width, new_artwork_height), Image.Resampling.LANCZOS)
+        app.logger.info(f"Mockup generated successfully as JPEG data URL (length: {len(data_url)} chars)")
         
-        app.logger.info(f"Final artwork size: {new_artwork_width}x{new_artwork_height}")
+        return jsonify({
+            'success': True,
+            'data_url': data_url
+        })
         
-        # Calculate position
-        x_percent = artwork_position.get('x', 50) / 100.0
-        y_percent = artwork_position.get('y', 50) / 100.0
+    except Exception as e:
+        return mockup_error_response(e)
+
+@app.route('/api/mockup', methods=['POST'])
+@limiter.limit("10 per minute")
+def mockup_image():
+    """Render a mockup and return the image bytes, in a format negotiated from the Accept header.
+    
+    Takes the same JSON body as /api/generate-mockup (including the optional
+    'frame' style) plus optional 'profile' ('preview' or 'download'),
+    'format' ('avif', 'webp' or 'jpeg', to override negotiation) and 'width'
+    (the on-screen width in pixels the mockup is displayed at). Previews are composited straight at their
+    output size from a reduced-scale decode of the room; placement is
+    computed at full resolution, so they match the download exactly. The
+    response is streamed while it is encoded and carries an ETag derived
+    from the inputs, so a repeat request with If-None-Match is answered 304
+    without rendering. The same key finds earlier renders (from any client)
+    in the render cache.
+    
+    With 'async': true a mockup that is not cached yet is rendered in the
+    background instead: the response is 202 with a job_id and a status_url
+    to poll (see mockup_job).
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'success': False, 'error': 'No data provided'}), 400
         
-        # Calculate paste position (center the artwork at the calculated position)
-        paste_x = int((room_width * x_percent) - (new_artwork_width / 2))
-        paste_y = int((room_height * y_percent) - (new_artwork_height / 2))
+        parsed = parse_mockup_request(data)
+        if parsed is None:
+            return jsonify({'success': False, 'error': 'Missing artwork_url or room_url'}), 400
+        artwork_url, artwork_filename, room_url, room_session, artwork_position = parsed
+        
+        profile = MOCKUP_PROFILES.get(data.get('profile') or DEFAULT_MOCKUP_PROFILE)
+        if profile is None:
+            return jsonify({'success': False, 'error': f"Unknown profile; use one of {sorted(MOCKUP_PROFILES)}"}), 400
+        width, error = parse_mockup_width(data)
+        if not error:
+            frame, error = parse_mockup_frame(data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        output_format = negotiate_format(request.accept_mimetypes, profile, data.get('format'))
+        
+        room_ref = mockup_room_ref(room_url, room_session)
+        etag = mockup_render_key(mockup_artwork_ref(artwork_url, artwork_filename), room_ref,
+                                 artwork_position, profile.name, profile.max_dim, output_format, width, frame)
+        cache_headers = mockup_cache_headers(etag)
+        if etag in request.if_none_match:
+            return Response(status=304, headers=cache_headers)
+        
+        cached = render_cache.get(etag, output_format)
+        if cached is not None:
+            app.logger.info(f"Serving {profile.name} mockup as {output_format} from render cache")
+            return Response(cached.data, mimetype=cached.mimetype, headers=cache_headers)
+        
+        if data.get('async'):
+            job_id = f"{etag}-{output_format}"
+            previous = mockup_jobs.get(job_id)
+            # A finished job whose image is no longer in the render cache (or that failed) is run again
+            if previous is None or previous.done():
+                future = mockup_executor.submit(run_mockup_job, artwork_url, artwork_filename, room_url, room_session,
+                                                room_ref, artwork_position, profile, output_format, etag, width, frame)
+                mockup_jobs.set(job_id, future)
+                app.logger.info(f"Queued {profile.name} mockup job {job_id}")
+            status_url = url_for('mockup_job', job_id=job_id)
+            return jsonify({'success': True, 'status': 'pending', 'job_id': job_id, 'status_url': status_url}), 202, {
+                'Location': status_url,
+                'Retry-After': '1'
+            }
         
-        app.logger.info(f"Final paste position: ({paste_x}, {paste_y})")
+        room_img, reference_size, size = load_mockup_room(room_url, room_session, room_ref, profile, width)
+        artwork_img = load_artwork_image(artwork_url, artwork_filename)
+        result_img = prepare_image(render_mockup(artwork_img, room_img, artwork_position, size, reference_size, frame), profile)
+        return stream_mockup(result_img, etag, output_format, profile, cache_headers)
         
-        # Create result image with same mode as room image for better color preservation
-        result_img = room_img.copy()
+    except Exception as e:
+        return mockup_error_response(e)
+
+def mockup_cache_headers(etag):
+    """Caching headers of a binary mockup response."""
+    return {
+        'ETag': f'"{etag}"',
+        'Cache-Control': f"private, max-age={mockup_config['cache_max_age']}",
+        'Vary': 'Accept'
+    }
+
+def stream_mockup(result_img, key, output_format, profile, headers):
+    """Stream a prepared mockup while it is encoded, storing it in the render cache under key once complete.
+    
+    The chunks are also collected for the cache, so memory peaks at about
+    twice the encoded size per request while they are joined.
+    """
+    # Pull the first chunk before responding so encoder errors still get a JSON error
+    chunks = render_cache.iter_and_store(key, output_format,
+                                         iter_encoded(result_img, output_format, profile.params[output_format]))
+    first_chunk = next(chunks, b'')
+    app.logger.info(f"Streaming {profile.name} mockup as {output_format} ({result_img.width}x{result_img.height})")
+    return Response(itertools.chain([first_chunk], chunks), mimetype=MIME_TYPES[output_format], headers=headers)
+
+def encode_mockup(image, output_format, profile):
+    """Encode a prepared mockup with the profile's settings for output_format."""
+    buffer = BytesIO()
+    image.save(buffer, format=PIL_FORMATS[output_format], **profile.params[output_format])
+    return buffer.getvalue()
+
+def render_mockup_bytes(artwork_url, artwork_filename, room, artwork_position, profile, output_format, key, frame=None):
+    """Render, encode and cache one mockup; room is the (room_img, reference_size, output_size) of load_mockup_room."""
+    room_img, reference_size, size = room
+    artwork_img = load_artwork_image(artwork_url, artwork_filename)
+    result_img = prepare_image(render_mockup(artwork_img, room_img, artwork_position, size, reference_size, frame), profile)
+    data = encode_mockup(result_img, output_format, profile)
+    render_cache.put(key, output_format, data)
+    return data
+
+def run_mockup_job(artwork_url, artwork_filename, room_url, room_session, room_ref, artwork_position, profile,
+                   output_format, key, width, frame):
+    """Background render of an async /api/mockup request (runs on the mockup executor).
+    
+    The image is only put in the render cache, where mockup_job finds it.
+    The room is resolved for the profile like any other request, so a
+    download from a room_token is rendered from the uploaded original.
+    """
+    room = load_mockup_room(room_url, room_session, room_ref, profile, width)
+    render_mockup_bytes(artwork_url, artwork_filename, room, artwork_position, profile, output_format, key, frame)
+
+@app.route('/api/mockup/jobs/<job_id>')
+@limiter.limit("120 per minute")
+def mockup_job(job_id):
+    """Poll an async mockup: 202 while it renders, then the image (or the error that stopped it).
+    
+    Jobs are tracked by the worker that queued them; their images are read
+    from the render cache, so other workers can answer too once the render
+    is in a shared render cache store.
+    """
+    match = re.fullmatch(r'([0-9a-f]{32})-(avif|webp|jpeg)', job_id)
+    if match is None:
+        return jsonify({'success': False, 'error': 'Unknown mockup job'}), 404
+    key, output_format = match.groups()
+    headers = {
+        'ETag': f'"{key}"',
+        'Cache-Control': f"private, max-age={mockup_config['cache_max_age']}"
+    }
+    
+    future = mockup_jobs.get(job_id)
+    if future is not None:
+        if not future.done():
+            return jsonify({'success': True, 'status': 'pending', 'job_id': job_id}), 202, {'Retry-After': '1'}
+        if future.exception() is not None:
+            return mockup_error_response(future.exception())
+    
+    cached = render_cache.get(key, output_format)
+    if cached is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired mockup job'}), 404
+    return Response(cached.data, mimetype=cached.mimetype, headers=headers)
+
+def prefetch_mockup(job, artwork_filename, room_session, profile, output_format, width):
+    """Render one speculative mockup into the render cache, giving way to foreground work between stages.
+    
+    Uses the default (centered) placement and the same key /api/mockup
+    computes for that artwork on the session's room at output_format and width.
+    """
+    artwork_position = quantize_position({}, mockup_config['position_grid'])
+    room_ref = mockup_room_ref(None, room_session)
+    key = mockup_render_key(mockup_artwork_ref(None, artwork_filename), room_ref, artwork_position, profile.name,
+                            profile.max_dim, output_format, width)
+    if render_cache.contains(key, output_format):
+        return
+    job.check()
+    artwork_img = load_artwork_image(filename=artwork_filename)
+    job.check()
+    room_img, reference_size, size = load_mockup_room(None, room_session, room_ref, profile, width)
+    result_img = prepare_image(render_mockup(artwork_img, room_img, artwork_position, size, reference_size), profile)
+    job.check()
+    render_cache.put(key, output_format, encode_mockup(result_img, output_format, profile))
+
+def mockup_prefetch_target(hints):
+    """(output format, width) of the preview mockups the uploading client will ask for, or None if unknown.
+    
+    The upload declares them the way /api/mockup takes them: the format is
+    negotiated from the upload's Accept header, or named by 'mockup_format',
+    and 'mockup_width' is the on-screen width of the previews. hints are
+    the upload's JSON body or form fields and query string.
+    """
+    profile = MOCKUP_PROFILES[DEFAULT_MOCKUP_PROFILE]
+    output_format = negotiate_format(request.accept_mimetypes, profile, hints.get('mockup_format'))
+    width = hints.get('mockup_width')
+    if isinstance(width, str) and width.isdigit():
+        width = int(width)  # Form fields and query strings are text
+    width, error = parse_mockup_width({'width': width})
+    if error:
+        app.logger.info(f"Not prefetching mockups: mockup_{error}")
+        return None
+    return output_format, width
+
+def schedule_mockup_prefetch(room_token, artwork_filenames, output_format, width):
+    """Queue speculative preview mockups of the given catalog artworks on an uploaded room."""
+    room_session = room_sessions.get(room_token)
+    if room_session is None:
+        return
+    profile = MOCKUP_PROFILES[DEFAULT_MOCKUP_PROFILE]
+    for filename in artwork_filenames:
+        mockup_prefetcher.schedule(prefetch_mockup, filename, room_session, profile, output_format, width)
+
+def iter_batch_results(cached, futures):
+    """Yield (index, encoded bytes or exception): cache hits first, then renders as they finish.
+    
+    Renders not yet started are cancelled if the client goes away.
+    """
+    try:
+        for index, data in cached:
+            yield index, data
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+    finally:
+        for future in futures:
+            future.cancel()
+
+def batch_result_fields(index, item, key, output_format, result):
+    """Per-item metadata of a batch result (the JSON object or part headers besides the image)."""
+    fields = {'index': index, 'artwork': item['ref']}
+    if isinstance(result, Exception):
+        status, body = mockup_error_details(result)
+        return dict(fields, success=False, status=status, error=body['error'])
+    return dict(fields, success=True, format=output_format, etag=key)
+
+@app.route('/api/mockup/batch', methods=['POST'])
+@limiter.limit("10 per minute")
+def mockup_batch():
+    """Render one room against many artworks, streaming each mockup back as soon as it is ready.
+    
+    Body: 'room_url' or 'room_token', 'artworks' (a list of objects with
+    'artwork_filename' or 'artwork_url' and optional 'artwork_position'),
+    and optional 'profile', 'format', 'width' and 'frame' as for /api/mockup.
+    The room is decoded once, artworks come from the artwork cache and the
+    mockups are composited on a thread pool. Results arrive in completion order, tagged
+    with their index in 'artworks': as NDJSON lines holding a data URL by
+    default, or as binary multipart/mixed parts when the Accept header asks
+    for multipart/mixed. A failed artwork is reported in its own result.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'success': False, 'error': 'No data provided'}), 400
         
-        # Paste artwork onto room background
-        if artwork_img.mode == 'RGBA':
-            # If artwork has transparency, use alpha compositing
-            result_img.paste(artwork_img, (paste_x, paste_y), artwork_img)
-        else:
-            # Otherwise, paste directly
-            result_img.paste(artwork_img, (paste_x, paste_y))
+        room_url = data.get('room_url')
+        room_token = data.get('room_token')
+        artworks = data.get('artworks')
+        if not (room_url or room_token) or not isinstance(artworks, list) or not artworks:
+            return jsonify({'success': False, 'error': 'Missing room_url or artworks'}), 400
+        if len(artworks) > mockup_config['batch_max_items']:
+            return jsonify({'success': False, 'error': f"At most {mockup_config['batch_max_items']} artworks per batch"}), 400
+        
+        items = []
+        for artwork in artworks:
+            if not isinstance(artwork, dict) or not (artwork.get('artwork_filename') or artwork.get('artwork_url')):
+                return jsonify({'success': False, 'error': 'Every artwork needs artwork_filename or artwork_url'}), 400
+            items.append({
+                'url': artwork.get('artwork_url'),
+                'filename': artwork.get('artwork_filename'),
+                'ref': artwork.get('artwork_filename') or mockup_source_digest(artwork.get('artwork_url')),
+                'position': quantize_position(artwork.get('artwork_position') or {}, mockup_config['position_grid'])
+            })
         
-        # Convert to bytes with maximum quality JPEG for best color preservation
-        output_buffer = BytesIO()
-        result_img.save(output_buffer, format='JPEG', quality=100, optimize=False, progressive=False, subsampling=0)
-        output_buffer.seek(0)
+        profile = MOCKUP_PROFILES.get(data.get('profile') or DEFAULT_MOCKUP_PROFILE)
+        if profile is None:
+            return jsonify({'success': False, 'error': f"Unknown profile; use one of {sorted(MOCKUP_PROFILES)}"}), 400
+        width, error = parse_mockup_width(data)
+        if not error:
+            frame, error = parse_mockup_frame(data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        output_format = negotiate_format(request.accept_mimetypes, profile, data.get('format'))
+        multipart = request.accept_mimetypes['multipart/mixed'] > request.accept_mimetypes['application/x-ndjson']
+        
+        room_session = resolve_room_session(room_url, room_token)
+        room_ref = mockup_room_ref(room_url, room_session)
+        # Looking up catalog ETags may revalidate or download artworks, so do it on the pool
+        artwork_refs = list(mockup_executor.map(try_mockup_artwork_ref, items))
+        keys = [None if isinstance(ref, Exception) else
+                mockup_render_key(ref, room_ref, item['position'], profile.name, profile.max_dim, output_format,
+                                  width, frame)
+                for ref, item in zip(artwork_refs, items)]
+        cached = []
+        missing = []
+        for index, key in enumerate(keys):
+            if key is None:
+                cached.append((index, artwork_refs[index]))  # Reported as a failed item
+                continue
+            hit = render_cache.get(key, output_format)
+            if hit is not None:
+                cached.append((index, hit.data))
+            else:
+                missing.append(index)
+        
+        # Decode the room once, and only if something has to be rendered
+        futures = {}
+        if missing:
+            room = load_mockup_room(room_url, room_session, room_ref, profile, width)
+            room[0].load()  # Shared read-only by the render threads
+            for index in missing:
+                item = items[index]
+                future = mockup_executor.submit(render_mockup_bytes, item['url'], item['filename'], room,
+                                                item['position'], profile, output_format, keys[index], frame)
+                futures[future] = index
+        app.logger.info(f"Batch mockup: {len(items)} artworks, {len(cached)} cached, {len(missing)} to render as {output_format}")
+        results = iter_batch_results(cached, futures)
+        
+        if multipart:
+            boundary = uuid.uuid4().hex
+            
+            def generate():
+                for index, result in results:
+                    fields = batch_result_fields(index, items[index], keys[index], output_format, result)
+                    if fields['success']:
+                        content_type, body = MIME_TYPES[output_format], result
+                        fields.pop('success')
+                    else:
+                        content_type, body = 'application/json', json.dumps(fields).encode()
+                    headers = ''.join(f"X-Mockup-{name.capitalize()}: {value}\r\n" for name, value in fields.items())
+                    yield f"--{boundary}\r\nContent-Type: {content_type}\r\n{headers}\r\n".encode() + body + b"\r\n"
+                yield f"--{boundary}--\r\n".encode()
+            
+            return Response(generate(), mimetype=f'multipart/mixed; boundary={boundary}')
         
-        app.logger.info(f"Mockup saved as JPEG with quality 100, size: {len(output_buffer.getvalue())} bytes")
+        def generate():
+            for index, result in results:
+                fields = batch_result_fields(index, items[index], keys[index], output_format, result)
+                if fields['success']:
+                    fields['data_url'] = f"data:{MIME_TYPES[output_format]};base64,{base64.b64encode(result).decode('utf-8')}"
+                yield json.dumps(fields) + '\n'
         
-        # Convert to base64
-        image_data = base64.b64encode(output_buffer.getvalue()).decode('utf-8')
-        data_url = f"data:image/jpeg;base64,{image_data}"
+        return Response(generate(), mimetype='application/x-ndjson')
         
-        app.logger.info(f"Mockup generated successfully as JPEG data URL (length: {len(data_url)} chars)")
+    except Exception as e:
+        return mockup_error_response(e)
+
+@app.route('/api/mockup/gallery', methods=['POST'])
+@limiter.limit("10 per minute")
+def mockup_gallery():
+    """Render several artworks hung together as a gallery wall, returned like /api/mockup.
+    
+    Body: 'room_url' or 'room_token', 'artworks' (catalog filenames, or
+    objects with 'artwork_filename' or 'artwork_url'), optional 'layout'
+    ('grid', 'salon' or 'row'; default 'grid'), 'position' (x/y percentages
+    of the arrangement's center) and 'profile', 'format', 'width' and
+    'frame' as for /api/mockup. The arrangement is computed in one pass (gallery_layout)
+    and every piece is composited onto a single copy of the room, so the
+    room is decoded and the result encoded once however many pieces there
+    are; catalog artworks come pre-scaled from the artwork cache.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'success': False, 'error': 'No data provided'}), 400
         
-        return jsonify({
-            'success': True,
-            'data_url': data_url
-        })
+        room_url = data.get('room_url')
+        room_token = data.get('room_token')
+        artworks = data.get('artworks')
+        if not (room_url or room_token) or not isinstance(artworks, list) or not artworks:
+            return jsonify({'success': False, 'error': 'Missing room_url or artworks'}), 400
+        if len(artworks) > GALLERY_MAX_PIECES:
+            return jsonify({'success': False, 'error': f"At most {GALLERY_MAX_PIECES} artworks per gallery wall"}), 400
+        layout = data.get('layout') or 'grid'
+        if layout not in GALLERY_LAYOUTS:
+            return jsonify({'success': False, 'error': f"Unknown layout; use one of {list(GALLERY_LAYOUTS)}"}), 400
+        
+        sources = []
+        for artwork in artworks:
+            if isinstance(artwork, str):
+                artwork = {'artwork_filename': artwork}
+            if not isinstance(artwork, dict) or not (artwork.get('artwork_filename') or artwork.get('artwork_url')):
+                return jsonify({'success': False, 'error': 'Every artwork needs artwork_filename or artwork_url'}), 400
+            sources.append((artwork.get('artwork_url'), artwork.get('artwork_filename')))
+        
+        profile = MOCKUP_PROFILES.get(data.get('profile') or DEFAULT_MOCKUP_PROFILE)
+        if profile is None:
+            return jsonify({'success': False, 'error': f"Unknown profile; use one of {sorted(MOCKUP_PROFILES)}"}), 400
+        width, error = parse_mockup_width(data)
+        if not error:
+            frame, error = parse_mockup_frame(data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        output_format = negotiate_format(request.accept_mimetypes, profile, data.get('format'))
+        position = quantize_position(data.get('position') or {}, mockup_config['position_grid'])
+        
+        room_session = resolve_room_session(room_url, room_token)
+        room_ref = mockup_room_ref(room_url, room_session)
+        artwork_refs = [mockup_artwork_ref(url, filename) for url, filename in sources]
+        etag = render_key(room_ref, 'gallery', layout, position['x'], position['y'], *artwork_refs,
+                          profile.name, profile.max_dim, width, output_format, frame.name if frame else NO_FRAME)
+        cache_headers = mockup_cache_headers(etag)
+        if etag in request.if_none_match:
+            return Response(status=304, headers=cache_headers)
+        
+        cached = render_cache.get(etag, output_format)
+        if cached is not None:
+            app.logger.info(f"Serving {profile.name} gallery mockup as {output_format} from render cache")
+            return Response(cached.data, mimetype=cached.mimetype, headers=cache_headers)
+        
+        # Artworks not in the artwork cache yet are fetched concurrently while the room is decoded
+        artwork_futures = [mockup_executor.submit(load_artwork_image, url, filename) for url, filename in sources]
+        room_img, reference_size, size = load_mockup_room(room_url, room_session, room_ref, profile, width)
+        artwork_imgs = [future.result() for future in artwork_futures]
+        
+        placements = gallery_layout(reference_size, [img.size for img in artwork_imgs], layout, position)
+        app.logger.info(f"Gallery mockup: {len(artwork_imgs)} artworks in a {layout} layout at {size[0]}x{size[1]}")
+        result_img = prepare_image(composite_artworks(room_img, list(zip(artwork_imgs, placements)), size, frame), profile)
+        return stream_mockup(result_img, etag, output_format, profile, cache_headers)
         
     except Exception as e:
-        app.logger.error(f"Error generating mockup: {str(e)}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return mockup_error_response(e)
 
 @app.route('/api/convert-image-to-data-url')
 def convert_image_to_data_url():
-    """Convert an S3 image URL to a data URL to avoid CORS issues."""
+    """Convert an S3 image URL (or catalog filename) to a data URL to avoid CORS issues."""
     image_url = request.args.get('url')
-    if not image_url:
+    filename = request.args.get('filename')
+    if not image_url and not filename:
         return jsonify({'error': 'No URL provided'}), 400
     
     try:
-        # Fetch the image from S3
-        response = requests.get(image_url, timeout=30)
-        response.raise_for_status()
+        # Fetch the image (catalog objects straight from S3)
+        max_bytes = upload_config['max_bytes']
+        if filename:
+            asset = asset_resolver.get_object(filename, max_bytes)
+        else:
+            asset = asset_resolver.fetch(image_url, max_bytes)
         
         # Get the content type
-        content_type = response.headers.get('content-type', 'image/jpeg')
+        content_type = asset.content_type if asset.content_type.startswith('image/') else 'image/jpeg'
         
         # Convert to base64
-        image_data = base64.b64encode(response.content).decode('utf-8')
+        image_data = base64.b64encode(asset.stream.getvalue()).decode('utf-8')
         
         # Create data URL
         data_url = f"data:{content_type};base64,{image_data}"
         
         return jsonify({'data_url': data_url})
         
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return jsonify({'error': 'Image not found'}), 404
+        app.logger.error(f"Error converting image to data URL: {str(e)}")
+        return jsonify({'error': 'Failed to convert image'}), 500
     except Exception as e:
         app.logger.error(f"Error converting image to data URL: {str(e)}")
         return jsonify({'error': 'Failed to convert image'}), 500
@@ -1461,6 +2237,22 @@ def health_check():
             'max_recommendations': recommendation_config['max_recommendations']
         }
         
+        # Perceptual moderation verdicts (entries, near-duplicate hits, pruned)
+        health_status['moderation_verdicts'] = moderation_verdicts.stats()
+        
+        # Analysis pool counters (inline fallbacks, timeouts, queue-full rejections)
+        health_status['analysis_pool'] = analysis_pool.stats()
+        
+        # Decode budget counters (inspected, rejected and downscaled images)
+        health_status['decode_budget'] = decode_budget.stats()
+        health_status['artwork_cache'] = artwork_cache.stats()
+        health_status['assets'] = asset_resolver.stats()
+        health_status['render_cache'] = render_cache.stats()
+        health_status['room_sessions'] = room_sessions.stats()
+        health_status['scaled_rooms'] = scaled_rooms.stats()
+        health_status['mockup_effects'] = mockup_effects_stats()
+        health_status['mockup_prefetch'] = mockup_prefetcher.stats()
+        
         logger.info(f"Health check completed: {health_status['status']}")
         return jsonify(health_status), 200
         
@@ -1479,6 +2271,10 @@ def clear_cache():
         catalog_cache.clear()
         presigned_url_cache.clear()
         moderation_cache.clear()
+        artwork_cache.clear()
+        render_cache.clear()
+        scaled_rooms.clear()
+        clear_mockup_effects()
         app.logger.info("All caches cleared")
         return jsonify({'success': True, 'message': 'All caches cleared'})
     except Exception as e:
@@ -1492,7 +2288,8 @@ def cache_stats():
         return jsonify({
             'catalog_cache_size': len(catalog_cache.cache),
             'presigned_url_cache_size': len(presigned_url_cache.cache),
-            'moderation_cache_size': len(moderation_cache.cache)
+            'moderation_cache_size': len(moderation_cache.cache),
+            'moderation_verdict_cache_size': len(moderation_verdicts)
         })
     except Exception as e:
         app.logger.error(f"Error getting cache stats: {e}")
@@ -1512,6 +2309,169 @@ def reset_workflow():
         app.logger.error(f"Error resetting workflow: {e}")
         return jsonify({'error': 'Failed to reset workflow'}), 500
 
+def analyze_and_recommend(context):
+    """Analyze a decoded room photo and build its formatted recommendations.
+    
+    Returns (user_colors, room_characteristics, formatted_recommendations);
+    user_colors is empty when the image could not be analyzed.
+    """
+    # Extract dominant colors and room characteristics (in the analysis pool)
+    user_colors, room_characteristics = analyze_uploaded_image(context)
+    if not user_colors:
+        return user_colors, room_characteristics, []
+    
+    app.logger.info(f"Successfully analyzed image colors: {len(user_colors)} colors found")
+    
+    if room_characteristics:
+        app.logger.info("Using contextual recommendations based on room analysis")
+        # Get contextual recommendations that consider both colors and room style
+        scored_recommendations = get_contextual_recommendations(user_colors, room_characteristics)
+    else:
+        app.logger.info("Room analysis failed, falling back to color-only recommendations")
+        # Fallback to color-only recommendations
+        scored_recommendations = get_smart_recommendations(user_colors)
+    
+    # Extract the artwork items from the scored recommendations
+    recommendations = [rec['artwork'] for rec in scored_recommendations]
+    
+    # Format the recommendations like app.py does
+    formatted_recommendations = []
+    for rec in recommendations:
+        # Pre-generate S3 URL to avoid frontend delays
+        filename = rec.get('filename', '')
+        image_url = None
+        if filename:
+            # Check cache first
+            cache_key = f"s3_url_{filename}"
+            cached_url = presigned_url_cache.get(cache_key)
+            if cached_url:
+                image_url = cached_url
+            else:
+                # Generate new presigned URL
+                try:
+                    image_url = s3.generate_presigned_url(
+                        'get_object',
+                        Params={
+                            'Bucket': aws_config['catalog_bucket_name'],
+                            'Key': filename
+                        },
+                        ExpiresIn=3600  # URL expires in 1 hour
+                    )
+                    # Cache the URL
+                    presigned_url_cache.set(cache_key, image_url)
+                except Exception as e:
+                    app.logger.error(f"Error generating S3 URL for {filename}: {e}")
+                    image_url = None
+        
+        formatted_rec = {
+            'id': rec.get('id', ''),
+            'title': rec.get('title', ''),
+            'artist': rec.get('artist', ''),
+            'description': rec.get('description', ''),
+            'price': rec.get('price', ''),
+            'product_url': rec.get('product_url', ''),
+            'filename': filename,
+            'image_url': image_url,  # Pre-generated S3 URL
+            'attributes': rec.get('attributes', {})
+        }
+        formatted_recommendations.append(formatted_rec)
+    
+    return user_colors, room_characteristics, formatted_recommendations
+
+def process_room_upload(image_file, cache_key, prefetch_hints, filename="uploaded_image.jpg"):
+    """Moderate, analyze and score an uploaded room photo; returns the Flask response.
+    
+    image_file is a seekable binary file holding the upload and cache_key
+    its MD5 (the exact-match moderation cache key). prefetch_hints holds the
+    request's mockup_format and mockup_width (see mockup_prefetch_target).
+    Shared by the JSON and binary upload routes.
+    """
+    # Check the header against the decode budget, then decode once, at
+    # reduced scale; the same image feeds the moderation payload and every
+    # analyzer
+    try:
+        decode_budget.check_stream(image_file)
+        context = AnalysisContext.from_stream(
+            image_file,
+            base_dim=max(moderation_config['max_dim'], COLOR_ANALYSIS_MAX_DIM)
+        )
+    except DecodeBudgetExceeded as e:
+        return jsonify({'error': f'Image too large: {e}'}), 413
+    except Exception as e:
+        # Not an image Pillow can read: nothing to moderate or analyze
+        app.logger.error(f"Failed to decode uploaded image: {e}")
+        return jsonify({'error': 'Invalid image file'}), 400
+    
+    # Moderation is a Rekognition round trip, so run it in the background
+    # while the image is analyzed and scored locally. Nothing is returned
+    # to the client until moderation has approved the image.
+    moderation_payload = build_moderation_payload(context.image, image_file)
+    image_hash = None
+    try:
+        image_hash = perceptual_hash(context.color_pixels)
+    except Exception as e:
+        app.logger.error(f"Error hashing uploaded image: {e}")
+    moderation_future = moderation_executor.submit(
+        moderate_image_content, None, moderation_payload, image_hash, cache_key
+    )
+    
+    try:
+        user_colors, room_characteristics, formatted_recommendations = analyze_and_recommend(context)
+    except Exception as e:
+        app.logger.error(f"Error analyzing uploaded image: {e}")
+        user_colors, room_characteristics, formatted_recommendations = [], None, []
+    
+    # Moderate the image content; a rejection discards the analysis results
+    try:
+        is_approved, reason = moderation_future.result()
+    except ModerationUnavailable as e:
+        # Nothing was judged, so nothing is quarantined
+        app.logger.warning(f"Upload could not be moderated: {e}")
+        return jsonify({'error': 'Image too large for content moderation, please upload a smaller photo',
+                        'error_code': 'moderation_unavailable'}), 413
+    if not is_approved:
+        image_file.seek(0)
+        store_quarantined_image(image_file, filename, reason)
+        app.logger.error(f"Moderation failed: {reason}")
+        return jsonify({'error': f"Moderation failed: {reason}"}), 400
+    
+    if not user_colors:
+        app.logger.error("Could not analyze image colors")
+        return jsonify({'error': 'Could not analyze image colors.'}), 500
+    
+    # Include room analysis in response for debugging/transparency
+    response_data = {
+        'recommendations': formatted_recommendations,
+        'room_analysis': room_characteristics if room_characteristics else None
+    }
+    
+    # Keep the decoded photo (and the uploaded bytes, for downloads) so mockup
+    # requests can send room_token instead of the image
+    try:
+        image_file.seek(0)
+        response_data['room_token'] = room_sessions.create(context.image, cache_key, image_file.read())
+        response_data['room_token_expires_in'] = room_session_config['ttl_seconds']
+    except Exception as e:
+        app.logger.error(f"Could not store room session: {e}")
+    
+    app.logger.info(f"Generated {len(formatted_recommendations)} contextual recommendations for uploaded image")
+    app.logger.info("=== RECOMMENDATION REQUEST COMPLETE ===")
+    app.logger.info(f"Returning {len(formatted_recommendations)} recommendations")
+    if formatted_recommendations:
+        app.logger.info(f"First recommendation: {formatted_recommendations[0].get('title', 'Unknown')}")
+    
+    response = jsonify(response_data)
+    
+    # Once the response is sent, render the mockups the user is most likely to open first
+    prefetch_filenames = [rec['filename'] for rec in formatted_recommendations if rec.get('filename')]
+    prefetch_filenames = prefetch_filenames[:mockup_prefetch_config['count']]
+    prefetch_target = mockup_prefetch_target(prefetch_hints) if prefetch_filenames else None
+    if response_data.get('room_token') and prefetch_target:
+        response.call_on_close(partial(schedule_mockup_prefetch, response_data['room_token'], prefetch_filenames,
+                                       *prefetch_target))
+    
+    return response
+
 @app.route('/upload-image', methods=['POST'])
 @limiter.limit("10 per minute")
 def upload_image():
@@ -1531,108 +2491,61 @@ def upload_image():
             # Extract the base64 data after the comma
             image_data = image_data.split(',', 1)[1]
         
-        # Decode base64 to bytes
+        # Decode base64 to bytes (base64 is 4 characters per 3 bytes)
         try:
+            decode_budget.check_size(len(image_data) * 3 // 4, upload_config['max_bytes'])
             image_bytes = base64.b64decode(image_data)
+        except DecodeBudgetExceeded as e:
+            return jsonify({'error': f'Image too large: {e}'}), 413
         except Exception as e:
             app.logger.error(f"Failed to decode base64 image: {e}")
             return jsonify({'error': 'Invalid image format'}), 400
         
-        # Use a generic filename for processing
-        filename = "uploaded_image.jpg"
-        
-        # Moderate the image content
-        is_approved, reason = moderate_image_content(image_bytes)
-        if not is_approved:
-            store_quarantined_image(image_bytes, filename, reason)
-            app.logger.error(f"Moderation failed: {reason}")
-            return jsonify({'error': f"Moderation failed: {reason}"}), 400
-        
-        # Create image stream for analysis
-        image_stream = io.BytesIO(image_bytes)
+        return process_room_upload(io.BytesIO(image_bytes), hashlib.md5(image_bytes).hexdigest(), data)
         
-        # Extract dominant colors from the image
-        user_colors = extract_dominant_colors(image_stream)
-        if not user_colors:
-            app.logger.error("Could not analyze image colors")
-            return jsonify({'error': 'Could not analyze image colors.'}), 500
-        
-        app.logger.info(f"Successfully analyzed image colors: {len(user_colors)} colors found")
-        
-        # Analyze room characteristics for contextual recommendations
-        room_characteristics = analyze_room_characteristics(image_stream)
-        
-        if room_characteristics:
-            app.logger.info("Using contextual recommendations based on room analysis")
-            # Get contextual recommendations that consider both colors and room style
-            scored_recommendations = get_contextual_recommendations(user_colors, room_characteristics)
+    except Exception as e:
+        app.logger.error(f"Error processing uploaded image: {e}")
+        return jsonify({'error': 'Failed to process image'}), 500
+
+@app.route('/api/upload-image', methods=['POST'])
+@limiter.limit("10 per minute")
+def upload_image_binary():
+    """Binary variant of /upload-image: the photo is a multipart 'roomImage' part or the raw request body.
+    
+    The body is streamed into a size-limited spool (on disk past
+    UPLOAD_SPOOL_BYTES) and hashed on the way in, so it is never held as a
+    base64 string. The room session then keeps one copy in memory for downloads.
+    """
+    spool = None
+    try:
+        # Reject on the declared length before reading anything (one chunk of
+        # slack covers multipart boundaries and part headers)
+        if request.content_length is not None and request.content_length > upload_config['max_bytes'] + UPLOAD_CHUNK_SIZE:
+            raise UploadTooLarge()
+        
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('roomImage')
+            if upload is None:
+                return jsonify({'error': 'No image data provided'}), 400
+            spool = upload.stream
         else:
-            app.logger.info("Room analysis failed, falling back to color-only recommendations")
-            # Fallback to color-only recommendations
-            scored_recommendations = get_smart_recommendations(user_colors)
-        
-        # Extract the artwork items from the scored recommendations
-        recommendations = [rec['artwork'] for rec in scored_recommendations]
-        
-        # Format the recommendations like app.py does
-        formatted_recommendations = []
-        for rec in recommendations:
-            # Pre-generate S3 URL to avoid frontend delays
-            filename = rec.get('filename', '')
-            image_url = None
-            if filename:
-                # Check cache first
-                cache_key = f"s3_url_{filename}"
-                cached_url = presigned_url_cache.get(cache_key)
-                if cached_url:
-                    image_url = cached_url
-                else:
-                    # Generate new presigned URL
-                    try:
-                        image_url = s3.generate_presigned_url(
-                            'get_object',
-                            Params={
-                                'Bucket': aws_config['catalog_bucket_name'],
-                                'Key': filename
-                            },
-                            ExpiresIn=3600  # URL expires in 1 hour
-                        )
-                        # Cache the URL
-                        presigned_url_cache.set(cache_key, image_url)
-                    except Exception as e:
-                        app.logger.error(f"Error generating S3 URL for {filename}: {e}")
-                        image_url = None
-            
-            formatted_rec = {
-                'id': rec.get('id', ''),
-                'title': rec.get('title', ''),
-                'artist': rec.get('artist', ''),
-                'description': rec.get('description', ''),
-                'price': rec.get('price', ''),
-                'product_url': rec.get('product_url', ''),
-                'filename': filename,
-                'image_url': image_url,  # Pre-generated S3 URL
-                'attributes': rec.get('attributes', {})
-            }
-            formatted_recommendations.append(formatted_rec)
+            spool = spool_stream(request.stream, upload_config['max_bytes'], upload_config['spool_bytes'])
         
-        # Include room analysis in response for debugging/transparency
-        response_data = {
-            'recommendations': formatted_recommendations,
-            'room_analysis': room_characteristics if room_characteristics else None
-        }
-        
-        app.logger.info(f"Generated {len(formatted_recommendations)} contextual recommendations for uploaded image")
-        app.logger.info("=== RECOMMENDATION REQUEST COMPLETE ===")
-        app.logger.info(f"Returning {len(formatted_recommendations)} recommendations")
-        if formatted_recommendations:
-            app.logger.info(f"First recommendation: {formatted_recommendations[0].get('title', 'Unknown')}")
-        
-        return jsonify(response_data)
+        if spool.size == 0:
+            return jsonify({'error': 'No image data provided'}), 400
+        spool.seek(0)
+        app.logger.info(f"Binary upload received: {spool.size} bytes")
+        return process_room_upload(spool, spool.hexdigest(), request.values)
         
+    except UploadTooLarge as e:
+        app.logger.warning(f"Rejected oversized upload: {e.description}")
+        return jsonify({'error': e.description}), 413
     except Exception as e:
         app.logger.error(f"Error processing uploaded image: {e}")
         return jsonify({'error': 'Failed to process image'}), 500
+    finally:
+        if spool is not None:
+            spool.close()
 
 # FINAL STARTUP LOGGING - This will execute when gunicorn imports the module
 print("=== APP_AWS.PY MODULE LOADED SUCCESSFULLY ===", file=sys.stderr)
@@ -0,0 +1,282 @@
+"""
+Two-tier cache of catalog artwork images for mockup rendering.
+
+Mockups reuse the same few dozen artworks over and over, but each request
+used to download the full-resolution print through its presigned URL,
+decode it and resize it. ArtworkCache keeps:
+
+  - a memory tier of decoded bitmaps, already downscaled to max_dim, bounded
+    by their total size in bytes and evicted least recently used first;
+  - a disk tier of the original downloaded bytes, bounded by total file size
+    and shared by every worker on the host, so a restarted or newly forked
+    worker re-decodes from local disk instead of downloading again.
+
+Entries are keyed by catalog filename and S3 ETag rather than by URL, because
+presigned URL query strings change every hour. An entry is revalidated at
+most every revalidate_seconds with a conditional get (If-None-Match); "not
+modified" keeps it, anything else replaces it. version() exposes the ETag,
+so results derived from an artwork (cached renders) can be keyed by it.
+Loads are single-flight per filename: threads that miss on an artwork
+another thread is already loading wait for its result instead of
+downloading and decoding it again.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from io import BytesIO
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class ArtworkCache:
+    """Decoded, pre-scaled artwork bitmaps in memory over original bytes on disk.
+
+    fetch(filename, etag) downloads an artwork, conditionally when etag is
+    set, and returns (stream, etag); stream is None when it was not modified. decode(stream) opens the bytes as a PIL image (this is
+    where the decode budget is applied). Images returned by get() are shared
+    between requests and must not be modified in place.
+    """
+
+    def __init__(self, fetch, decode, memory_bytes=192 * 1024 * 1024, disk_dir=None,
+                 disk_bytes=1024 * 1024 * 1024, max_dim=1600, revalidate_seconds=300):
+        self.fetch = fetch
+        self.decode = decode
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.max_dim = max_dim
+        self.revalidate_seconds = revalidate_seconds
+        self.lock = threading.Lock()
+        # filename -> (etag, image, size in bytes, last validated)
+        self.memory = OrderedDict()
+        self.memory_used = 0
+        # filename -> Future of the (etag, image) being loaded by another thread
+        self.loading = {}
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'downloads': 0, 'revalidated': 0, 'shared_loads': 0,
+                         'memory_evictions': 0, 'disk_evictions': 0}
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def record(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def get(self, filename):
+        """Return the pre-scaled RGB/RGBA image for a catalog artwork, downloading it only if needed."""
+        return self.entry(filename)[1]
+
+    def version(self, filename):
+        """Return the ETag of the current version of a catalog artwork (None if the store sent none).
+
+        A freshly validated entry answers without decoding anything; otherwise
+        the artwork is revalidated or loaded as get() would.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(filename)
+        if entry is not None and now - entry[3] < self.revalidate_seconds:
+            return entry[0]
+        etag, path = self.disk_entry(filename)
+        if etag is not None:
+            try:
+                if now - os.path.getmtime(path) < self.revalidate_seconds:
+                    return etag
+            except FileNotFoundError:
+                pass
+        return self.entry(filename)[0]
+
+    def entry(self, filename):
+        """Return (etag, image) of the current version of a catalog artwork."""
+        with self.lock:
+            entry = self.memory.get(filename)
+            if entry is not None and time.time() - entry[3] < self.revalidate_seconds:
+                self.memory.move_to_end(filename)
+                self.counters['memory_hits'] += 1
+                return entry[0], entry[1]
+            future = self.loading.get(filename)
+            leader = future is None
+            if leader:
+                future = self.loading[filename] = Future()
+            else:
+                self.counters['shared_loads'] += 1
+        if not leader:
+            return future.result()
+        try:
+            result = self.load_entry(filename)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.loading[filename]
+
+    def load_entry(self, filename):
+        """Revalidate or load an artwork; entry() runs one of these per filename at a time."""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(filename)
+            if entry is not None:
+                self.memory.move_to_end(filename)
+        if entry is not None:
+            etag, image, size, validated = entry
+            if now - validated < self.revalidate_seconds:
+                self.record('memory_hits')
+                return etag, image
+            stream, new_etag = self.fetch(filename, etag)
+            if stream is None:
+                self.record('revalidated')
+                self.store_memory(filename, etag, image, size, now)
+                return etag, image
+            return new_etag, self.load(filename, stream, new_etag, now)
+
+        etag, path = self.disk_entry(filename)
+        if etag is not None:
+            try:
+                if now - os.path.getmtime(path) >= self.revalidate_seconds:
+                    stream, new_etag = self.fetch(filename, etag)
+                    if stream is not None:
+                        return new_etag, self.load(filename, stream, new_etag, now)
+                    self.record('revalidated')
+                    self.touch(path)
+                with open(path, 'rb') as f:
+                    stream = BytesIO(f.read())
+                self.record('disk_hits')
+                return etag, self.load(filename, stream, etag, now, write_disk=False)
+            except FileNotFoundError:
+                pass  # Evicted by another worker in the meantime
+        stream, etag = self.fetch(filename, None)
+        return etag, self.load(filename, stream, etag, now)
+
+    def load(self, filename, stream, etag, now, write_disk=True):
+        """Decode and pre-scale downloaded bytes, then store them in both tiers."""
+        if write_disk:
+            self.record('downloads')
+            if self.disk_dir and etag:
+                self.write_disk(filename, etag, stream.getvalue())
+        image = self.decode(stream)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB')
+        longest = max(image.width, image.height)
+        if longest > self.max_dim:
+            scale = self.max_dim / longest
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        else:
+            image.load()
+        if etag:
+            size = image.width * image.height * len(image.getbands())
+            self.store_memory(filename, etag, image, size, now)
+        return image
+
+    def store_memory(self, filename, etag, image, size, validated):
+        if size > self.memory_bytes:
+            return
+        with self.lock:
+            previous = self.memory.pop(filename, None)
+            if previous is not None:
+                self.memory_used -= previous[2]
+            self.memory[filename] = (etag, image, size, validated)
+            self.memory_used += size
+            while self.memory_used > self.memory_bytes:
+                _, (_, _, evicted_size, _) = self.memory.popitem(last=False)
+                self.memory_used -= evicted_size
+                self.counters['memory_evictions'] += 1
+
+    # --- Disk tier ---
+
+    def disk_prefix(self, filename):
+        return hashlib.sha256(filename.encode('utf-8')).hexdigest()[:32]
+
+    def disk_entry(self, filename):
+        """Return (etag, path) of the cached original bytes for filename, or (None, None)."""
+        if not self.disk_dir:
+            return None, None
+        prefix = self.disk_prefix(filename) + '-'
+        try:
+            names = [name for name in os.listdir(self.disk_dir) if name.startswith(prefix)]
+        except OSError:
+            return None, None
+        if not names:
+            return None, None
+        name = names[0]
+        return bytes.fromhex(name[len(prefix):]).decode('utf-8'), os.path.join(self.disk_dir, name)
+
+    def write_disk(self, filename, etag, data):
+        """Atomically write the original bytes (replacing older ETags) and trim the tier to disk_bytes."""
+        prefix = self.disk_prefix(filename)
+        path = os.path.join(self.disk_dir, f'{prefix}-{etag.encode("utf-8").hex()}')
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            for name in os.listdir(self.disk_dir):
+                if name.startswith(prefix + '-') and os.path.join(self.disk_dir, name) != path:
+                    self.remove(os.path.join(self.disk_dir, name))
+        except OSError as e:
+            logger.warning(f"Could not write {filename} to the artwork disk cache: {e}")
+            return
+        self.trim_disk()
+
+    def trim_disk(self):
+        """Remove the least recently validated files until the tier fits in disk_bytes.
+
+        A file's mtime is when it was written or last revalidated; hot
+        artworks are served from memory and do not touch their files.
+        """
+        files = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if name.startswith('.tmp-'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_bytes:
+                break
+            self.remove(path)
+            total -= size
+            self.record('disk_evictions')
+
+    def touch(self, path):
+        """Mark a disk entry as recently used and just validated."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Empty the memory tier (the disk tier is kept and revalidated as usual)."""
+        with self.lock:
+            self.memory.clear()
+            self.memory_used = 0
+
+    def reset_after_fork(self):
+        self.lock = threading.Lock()
+        self.loading = {}
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, memory_entries=len(self.memory), memory_used=self.memory_used,
+                        memory_bytes=self.memory_bytes, disk_bytes=self.disk_bytes)
@@ -0,0 +1,157 @@
+"""
+Fetching catalog and external images for the server's own use.
+
+Mockups and data-URL conversion used to download catalog images by calling
+requests.get on presigned URLs the server had just generated for itself,
+paying for DNS, TLS and signature checks on a new connection every time.
+AssetResolver recognises catalog-bucket URLs (and bare catalog filenames)
+and streams those objects straight from the shared, pooled boto3 S3 client
+with get_object. Anything else is fetched through one requests.Session whose
+keep-alive connection pool is sized like the AWS clients'. Both paths enforce
+a byte limit while streaming and support conditional requests by ETag.
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+import requests
+from botocore.exceptions import ClientError
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+ASSET_CHUNK_SIZE = 64 * 1024
+
+
+def catalog_key_from_url(url, bucket):
+    """Return the object key if url points into the given S3 bucket, else None.
+
+    Understands virtual-hosted (bucket.s3[.region].amazonaws.com/key) and
+    path-style (s3[.region].amazonaws.com/bucket/key) URLs, presigned or not.
+    """
+    if not url or not bucket:
+        return None
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    if parsed.scheme not in ('http', 'https') or not host.endswith('.amazonaws.com'):
+        return None
+    path = unquote(parsed.path)
+    if host.startswith(f'{bucket.lower()}.s3.') or host.startswith(f'{bucket.lower()}.s3-'):
+        key = path.lstrip('/')
+    elif host.startswith('s3.') or host.startswith('s3-'):
+        prefix = f'/{bucket}/'
+        key = path[len(prefix):] if path.startswith(prefix) else ''
+    else:
+        return None
+    return key or None
+
+
+@dataclass(frozen=True)
+class FetchedAsset:
+    """A downloaded asset; stream is None when a conditional request found it unchanged."""
+    stream: Optional[BytesIO]
+    etag: Optional[str]
+    content_type: str = 'application/octet-stream'
+
+    @property
+    def not_modified(self):
+        return self.stream is None
+
+
+class AssetResolver:
+    """Reads catalog objects through the S3 client and other URLs through a pooled HTTP session.
+
+    check_size(size, max_bytes) is called with the declared and the running
+    size of every download and should raise to abort it (the app passes
+    DecodeBudget.check_size).
+    """
+
+    def __init__(self, s3_client, bucket, check_size, max_pool_connections=10, timeout=30):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.check_size = check_size
+        self.max_pool_connections = max_pool_connections
+        self.timeout = timeout
+        self.session = self.create_session()
+        self.lock = threading.Lock()
+        self.counters = {'s3_gets': 0, 'http_gets': 0, 'not_modified': 0}
+
+    def create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_pool_connections, pool_maxsize=self.max_pool_connections)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def record(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def catalog_key(self, url):
+        return catalog_key_from_url(url, self.bucket)
+
+    def fetch(self, url, max_bytes, etag=None):
+        """Fetch a URL, reading catalog-bucket URLs directly from S3."""
+        key = self.catalog_key(url)
+        if key is not None and self.s3 is not None:
+            return self.get_object(key, max_bytes, etag)
+        return self.get_url(url, max_bytes, etag)
+
+    def get_object(self, key, max_bytes, etag=None):
+        """Stream a catalog object with get_object (conditional on etag if given)."""
+        params = {'Bucket': self.bucket, 'Key': key}
+        if etag:
+            params['IfNoneMatch'] = etag
+        self.record('s3_gets')
+        try:
+            response = self.s3.get_object(**params)
+        except ClientError as e:
+            if e.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 304:
+                self.record('not_modified')
+                return FetchedAsset(None, etag)
+            raise
+        body = response['Body']
+        try:
+            self.check_size(response.get('ContentLength', 0), max_bytes)
+            buffer = BytesIO()
+            for chunk in body.iter_chunks(chunk_size=ASSET_CHUNK_SIZE):
+                buffer.write(chunk)
+                self.check_size(buffer.tell(), max_bytes)
+        finally:
+            body.close()
+        buffer.seek(0)
+        return FetchedAsset(buffer, response.get('ETag'), response.get('ContentType') or 'application/octet-stream')
+
+    def get_url(self, url, max_bytes, etag=None):
+        """Stream any other URL over the keep-alive session (conditional on etag if given)."""
+        headers = {'If-None-Match': etag} if etag else {}
+        self.record('http_gets')
+        with self.session.get(url, timeout=self.timeout, stream=True, headers=headers) as response:
+            if etag and response.status_code == 304:
+                self.record('not_modified')
+                return FetchedAsset(None, etag)
+            response.raise_for_status()
+            declared = response.headers.get('Content-Length')
+            if declared and declared.isdigit():
+                self.check_size(int(declared), max_bytes)
+            buffer = BytesIO()
+            for chunk in response.iter_content(chunk_size=ASSET_CHUNK_SIZE):
+                buffer.write(chunk)
+                self.check_size(buffer.tell(), max_bytes)
+            fetched_etag = response.headers.get('ETag')
+            content_type = response.headers.get('Content-Type') or 'application/octet-stream'
+        buffer.seek(0)
+        return FetchedAsset(buffer, fetched_etag, content_type)
+
+    def reset_after_fork(self, s3_client):
+        """Use the forked worker's own S3 client, HTTP connection pool and lock."""
+        self.s3 = s3_client
+        self.session = self.create_session()
+        self.lock = threading.Lock()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Compare the old two-decode upload analysis with the single reduced-scale
+decode done by image_analysis.AnalysisContext.
+
+The old path decoded the upload at full resolution twice (once for color
+extraction, once for room analysis) and LANCZOS-resized each copy. The
+context decodes once, straight at reduced scale (JPEG draft mode or
+Image.reduce), and derives both analysis arrays from that. For every image
+this reports the wall time of each path, the size of the largest bitmap it
+held, and how far the resulting room arrays differ.
+
+HEIC files are decoded through pillow_heif; when they embed a thumbnail at
+least as large as the decode scale floor, the context uses it instead of
+decoding the full HEVC image.
+
+Usage (from the backend directory):
+    python benchmarks/analysis_decode.py path/to/photos --repeat 5
+    python benchmarks/analysis_decode.py --synthetic 4032x3024
+    python benchmarks/analysis_decode.py --synthetic 4032x3024 --format heic --heic-thumbnail 1280
+"""
+import argparse
+import os
+import statistics
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from common import image_paths, register_heif, timed  # Also puts the backend on sys.path
+from image_analysis import (
+    AnalysisContext, COLOR_ANALYSIS_MAX_DIM, decode_image, resize_to_max_dim
+)
+
+
+def synthetic_photo(width, height, image_format='jpeg', heic_thumbnail=0):
+    """A smooth, photo-like JPEG or HEIC (gradients plus mild noise) of the given size."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([
+        120 + 80 * np.sin(x / width * 3.1),
+        110 + 70 * np.cos(y / height * 2.3),
+        100 + 60 * np.sin((x + y) / (width + height) * 4.0),
+    ], axis=-1)
+    base += rng.normal(0, 6, base.shape)
+    img = Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+    buffer = BytesIO()
+    if image_format == 'heic':
+        if heic_thumbnail:
+            img.info['thumbnails'] = [heic_thumbnail]
+        img.save(buffer, format='HEIF', quality=80)
+    else:
+        img.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def old_path(data):
+    """Two full decodes, as upload_image used to do; returns (room_array, color_pixels, peak bitmap bytes)."""
+    img = decode_image(BytesIO(data))
+    peak = img.width * img.height * 3
+    small = resize_to_max_dim(img, 1200)
+    small.thumbnail((100, 100))
+    color_pixels = np.array(small)
+    img = decode_image(BytesIO(data))
+    room_array = np.array(resize_to_max_dim(img, 800))
+    return room_array, color_pixels, peak
+
+
+def context_path(data, base_dim):
+    """One reduced-scale decode through AnalysisContext."""
+    context = AnalysisContext.from_stream(BytesIO(data), base_dim=base_dim)
+    peak = context.image.width * context.image.height * 3
+    return context.room_array, context.color_pixels, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image_dir', nargs='?')
+    parser.add_argument('--synthetic', help='Benchmark a generated JPEG of WIDTHxHEIGHT instead of a directory')
+    parser.add_argument('--format', choices=('jpeg', 'heic'), default='jpeg', help='Format of the synthetic image')
+    parser.add_argument('--heic-thumbnail', type=int, default=0,
+                        help='Embed a thumbnail with this longer side in the synthetic HEIC (0 for none)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--base-dim', type=int, default=max(1280, COLOR_ANALYSIS_MAX_DIM),
+                        help='Decode scale floor (the app uses max(MODERATION_MAX_DIM, 1200))')
+    args = parser.parse_args()
+
+    register_heif()
+
+    if args.synthetic:
+        width, height = (int(v) for v in args.synthetic.lower().split('x'))
+        images = [(f'synthetic {width}x{height} {args.format}',
+                   synthetic_photo(width, height, args.format, args.heic_thumbnail))]
+    elif args.image_dir:
+        images = []
+        for path in image_paths(args.image_dir):
+            with open(path, 'rb') as f:
+                images.append((os.path.basename(path), f.read()))
+    else:
+        parser.error('pass an image directory or --synthetic WIDTHxHEIGHT')
+
+    print(f"{'image':<28} {'old ms':>8} {'new ms':>8} {'speedup':>8} {'old MB':>7} {'new MB':>7} {'room diff':>10}")
+    speedups = []
+    for name, data in images:
+        old_time, (old_room, _, old_peak) = timed(old_path, data, repeat=args.repeat)
+        new_time, (new_room, _, new_peak) = timed(context_path, data, args.base_dim, repeat=args.repeat)
+        speedups.append(old_time / new_time)
+        if old_room.shape == new_room.shape:
+            diff = f"{np.abs(old_room.astype(np.int16) - new_room.astype(np.int16)).mean():.2f}"
+        else:
+            diff = f"{old_room.shape[1]}x{old_room.shape[0]}/{new_room.shape[1]}x{new_room.shape[0]}"
+        print(f"{name[:28]:<28} {old_time * 1000:>8.0f} {new_time * 1000:>8.0f} {old_time / new_time:>7.1f}x "
+              f"{old_peak / 1e6:>7.1f} {new_peak / 1e6:>7.1f} {diff:>10}")
+    if speedups:
+        print(f"\nMedian speedup: {statistics.median(speedups):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
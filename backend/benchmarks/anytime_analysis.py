@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Show what the deadline-aware room analysis trades away at each latency budget.
+
+For every image, image_analysis.analyze_room_array_anytime is run under each
+budget. The script reports the resolution it reached, how long it took, and
+how many of the categorical room features (brightness, contrast, texture,
+style, room type, saturation, temperature) it reported match the unbounded
+full-resolution analysis, and how many it omitted (texture and style are
+left out below image_analysis.ANYTIME_DETAIL_MIN_DIM).
+
+Usage (from the backend directory):
+    python benchmarks/anytime_analysis.py path/to/photos
+    python benchmarks/anytime_analysis.py --synthetic 50 --budgets 0.005 0.02 0.05 0.2
+"""
+import argparse
+import statistics
+import sys
+import time
+from collections import Counter
+
+from common import register_heif  # Also puts the backend on sys.path
+from image_analysis import analyze_room_array, analyze_room_array_anytime
+from room_features_parity import load_room_arrays, synthetic_rooms
+
+
+def flatten(room_analysis):
+    """The categorical features of a room analysis as one flat dict."""
+    flat = {key: value for key, value in room_analysis.items() if key != 'color_palette'}
+    flat.update(room_analysis['color_palette'])
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image_dir', nargs='?')
+    parser.add_argument('--synthetic', type=int, help='Use N generated room images instead of a directory')
+    parser.add_argument('--budgets', type=float, nargs='+', default=[0.005, 0.02, 0.05, 0.1, 0.5],
+                        help='Latency budgets in seconds')
+    args = parser.parse_args()
+
+    register_heif()
+
+    if args.synthetic:
+        images = list(synthetic_rooms(args.synthetic))
+    elif args.image_dir:
+        images = list(load_room_arrays(args.image_dir))
+    else:
+        parser.error('pass an image directory or --synthetic N')
+    if not images:
+        print('No images found')
+        sys.exit(1)
+
+    references = [flatten(analyze_room_array(img_array)['room_analysis']) for _, img_array in images]
+
+    print(f"{'budget ms':>9} {'median ms':>10} {'agreement':>10} {'omitted':>8}  resolutions reached")
+    for budget in args.budgets:
+        times, resolutions = [], Counter()
+        matched = total = omitted = 0
+        for (_, img_array), reference in zip(images, references):
+            start = time.monotonic()
+            result = analyze_room_array_anytime(img_array, deadline=start + budget)
+            times.append(time.monotonic() - start)
+            resolutions[result['analysis_timing']['resolution']] += 1
+            actual = flatten(result['room_analysis'])
+            reported = [key for key in reference if actual[key] is not None]
+            matched += sum(actual[key] == reference[key] for key in reported)
+            total += len(reported)
+            omitted += len(reference) - len(reported)
+        reached = ', '.join(f"{dim}px x{count}" for dim, count in sorted(resolutions.items()))
+        print(f"{budget * 1000:>9.0f} {statistics.median(times) * 1000:>10.1f} {matched / total:>9.1%} {omitted / len(images):>8.1f}  {reached}")
+
+
+if __name__ == '__main__':
+    main()
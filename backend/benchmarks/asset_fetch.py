@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare fetching catalog images through presigned URLs with requests.get
+(the old generate_mockup / convert-image-to-data-url path) against
+assets.AssetResolver, which reads them with get_object on a pooled S3 client.
+
+By default it runs against moto's in-process S3 stand-in, so it also works
+as a self-check of the resolver: it verifies that catalog URLs and filenames
+resolve to the same bytes as the presigned download, that a conditional get
+with the current ETag reports "not modified", and that the byte limit
+aborts oversized objects. Exits with status 1 if any check fails. Pass
+--bucket to time a real bucket instead (the checks still run).
+
+Usage (from the backend directory):
+    python benchmarks/asset_fetch.py
+    python benchmarks/asset_fetch.py --bucket my-catalog-bucket --key some-artwork.jpg --repeat 20
+"""
+import argparse
+import os
+import sys
+
+import boto3
+import requests
+
+from common import timed  # Also puts the backend on sys.path
+from assets import AssetResolver
+
+
+class LimitExceeded(ValueError):
+    pass
+
+
+def check_size(size, max_bytes):
+    if size > max_bytes:
+        raise LimitExceeded(f'{size} bytes > {max_bytes}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bucket', help='Real bucket to use instead of moto')
+    parser.add_argument('--key', default='benchmark-artwork.jpg')
+    parser.add_argument('--size', type=int, default=2 * 1024 * 1024, help='Object size to upload when using moto')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    mock = None
+    bucket = args.bucket
+    if bucket is None:
+        from moto import mock_aws
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+        mock = mock_aws()
+        mock.start()
+        bucket = 'asset-benchmark'
+    s3 = boto3.client('s3', region_name=os.getenv('AWS_REGION', 'us-east-1'))
+    if mock is not None:
+        s3.create_bucket(Bucket=bucket)
+        s3.put_object(Bucket=bucket, Key=args.key, Body=os.urandom(args.size), ContentType='image/jpeg')
+
+    resolver = AssetResolver(s3, bucket, check_size=check_size)
+    url = s3.generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': args.key})
+    max_bytes = 64 * 1024 * 1024
+
+    presigned_time, expected = timed(lambda: requests.get(url, timeout=30).content, repeat=args.repeat)
+    resolver_time, asset = timed(lambda: resolver.fetch(url, max_bytes), repeat=args.repeat)
+    print(f"Median fetch: presigned requests.get {presigned_time * 1000:.1f}ms, "
+          f"resolver get_object {resolver_time * 1000:.1f}ms")
+
+    failures = []
+    if resolver.catalog_key(url) != args.key:
+        failures.append(f"URL resolved to key {resolver.catalog_key(url)!r}")
+    if asset.stream.getvalue() != expected:
+        failures.append('resolver bytes differ from the presigned download')
+    if resolver.get_object(args.key, max_bytes).stream.getvalue() != expected:
+        failures.append('get_object by filename returned different bytes')
+    if not resolver.get_object(args.key, max_bytes, etag=asset.etag).not_modified:
+        failures.append('conditional get with the current ETag was not "not modified"')
+    try:
+        resolver.get_object(args.key, len(expected) - 1)
+        failures.append('byte limit did not abort an oversized object')
+    except LimitExceeded:
+        pass
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print(f"Resolver stats: {resolver.stats()}")
+    if mock is not None:
+        mock.stop()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Importing this module puts the backend directory on sys.path, so the
+scripts can import the app's modules however they are launched.
+"""
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import requests
+from PIL import Image
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.heic')
+
+
+def register_heif():
+    """Let PIL open HEIC files when pillow-heif is installed."""
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except ImportError:
+        pass
+
+
+def image_paths(image_dir):
+    """Paths of the images in image_dir, sorted by name."""
+    return [os.path.join(image_dir, name) for name in sorted(os.listdir(image_dir))
+            if name.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def load_images(image_dir):
+    """Yield (name, RGB image) for every image in image_dir."""
+    for path in image_paths(image_dir):
+        with Image.open(path) as img:
+            yield os.path.basename(path), img.convert('RGB')
+
+
+def timed(func, *args, repeat=5):
+    """(median seconds, last result) of repeat calls to func(*args)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def palette_rgb(palette):
+    """The colors of an extract_palette-style palette as an (n, 3) float array."""
+    return np.array([[int(item['color'][i:i + 2], 16) for i in (1, 3, 5)] for item in palette], dtype=float)
+
+
+def palette_agreement(reference, candidate):
+    """(weighted nearest-color distance, dominant-color distance) between two palettes."""
+    ref_rgb, cand_rgb = palette_rgb(reference), palette_rgb(candidate)
+    nearest = np.linalg.norm(ref_rgb[:, None, :] - cand_rgb[None, :, :], axis=2).min(axis=1)
+    weights = np.array([item['percentage'] for item in reference])
+    return float((nearest * weights).sum() / weights.sum()), float(np.linalg.norm(ref_rgb[0] - cand_rgb[0]))
+
+
+def wait_for_health(url, timeout):
+    """Poll the health endpoint until it answers or the timeout expires."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    return False
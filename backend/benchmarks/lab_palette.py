@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Measure the RGB -> Lab lookup table and the cost of clustering palettes in
+CIELAB.
+
+Reports how long palette.lab_lut takes to build and how far its lookups are
+(in delta-E) from the exact conversion over random colors. For every image it
+also times extract_palette in 'rgb' and 'lab' mode, and times an exact
+per-pixel Lab conversion (srgb_to_lab on the whole thumbnail) as the cost
+the table avoids.
+
+Usage (from the backend directory):
+    python benchmarks/lab_palette.py path/to/images
+    python benchmarks/lab_palette.py --synthetic 50
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from common import load_images, register_heif, timed  # Also puts the backend on sys.path
+from image_analysis import AnalysisContext
+from palette import extract_palette, lab_lut, rgb_to_lab, srgb_to_lab
+
+
+def synthetic_thumbnails(count, size=(100, 75)):
+    """Color thumbnails with a few flat regions, a lighting gradient and noise."""
+    rng = np.random.default_rng(5)
+    width, height = size
+    x = np.arange(width)
+    for index in range(count):
+        img = np.zeros((height, width, 3), dtype=np.float32)
+        img[:] = rng.integers(40, 235, 3)
+        for _ in range(rng.integers(2, 6)):
+            x0, y0 = rng.integers(0, width), rng.integers(0, height)
+            img[y0:y0 + rng.integers(8, 40), x0:x0 + rng.integers(10, 50)] = rng.integers(0, 256, 3)
+        img *= (0.75 + 0.25 * (x / width))[None, :, None]
+        img += rng.normal(0, 8, img.shape)
+        yield f'synthetic-{index:03d}', np.clip(img, 0, 255).astype(np.uint8)
+
+
+def load_thumbnails(image_dir):
+    for name, img in load_images(image_dir):
+        yield name, AnalysisContext(img).color_pixels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image_dir', nargs='?')
+    parser.add_argument('--synthetic', type=int, help='Use N generated room images instead of a directory')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = lab_lut()
+    print(f"Lookup table: {table.shape} {table.dtype}, {table.nbytes / 1e6:.1f}MB, "
+          f"built in {(time.perf_counter() - start) * 1000:.0f}ms")
+    colors = np.random.default_rng(0).integers(0, 256, (200_000, 3))
+    delta_e = np.linalg.norm(rgb_to_lab(colors) - srgb_to_lab(colors), axis=1)
+    print(f"Lookup error over {len(colors)} random colors: mean {delta_e.mean():.2f}, max {delta_e.max():.2f} delta-E")
+
+    register_heif()
+
+    if args.synthetic:
+        images = synthetic_thumbnails(args.synthetic)
+    elif args.image_dir:
+        images = load_thumbnails(args.image_dir)
+    else:
+        parser.error('pass an image directory or --synthetic N')
+
+    rgb_times, lab_times, exact_times = [], [], []
+    for _, pixels in images:
+        rgb_times.append(timed(extract_palette, pixels, repeat=args.repeat)[0])
+        lab_times.append(timed(lambda p: extract_palette(p, color_space='lab'), pixels, repeat=args.repeat)[0])
+        exact_times.append(timed(srgb_to_lab, pixels.reshape(-1, 3), repeat=args.repeat)[0])
+    if not rgb_times:
+        print('No images found')
+        sys.exit(1)
+    print(f"Images: {len(rgb_times)}")
+    print(f"Median extract_palette: rgb {statistics.median(rgb_times) * 1000:.2f}ms, "
+          f"lab {statistics.median(lab_times) * 1000:.2f}ms")
+    print(f"Median exact per-pixel Lab conversion: {statistics.median(exact_times) * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
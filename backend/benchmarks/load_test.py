@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Load test comparing gunicorn's sync and gthread worker classes.
+
+Runs app_aws under gunicorn once per worker class and fires concurrent
+/api/generate-mockup requests whose artwork is served by a local HTTP server
+with artificial latency (standing in for a slow S3 download). At the same
+time it polls /health and records how long those checks take. With sync
+workers every request queues behind the slow downloads; with gthread the
+downloads overlap and /health stays fast.
+
+Usage (from the backend directory, with the usual AWS environment set):
+    python benchmarks/load_test.py --concurrency 8 --requests 40 --latency 1.0
+"""
+import argparse
+import base64
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import requests
+from PIL import Image
+
+from common import BACKEND_DIR, wait_for_health
+
+
+def make_jpeg(width, height, color):
+    """Return JPEG bytes for a solid-color test image."""
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def start_slow_asset_server(port, latency, body):
+    """Serve `body` as image/jpeg on every GET after sleeping `latency` seconds."""
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_load(base_url, payload, concurrency, total_requests):
+    """Fire mockup requests while polling /health; return timing summary."""
+    mockup_latencies = []
+    health_latencies = []
+    errors = 0
+    done = threading.Event()
+
+    def one_mockup(_):
+        start = time.perf_counter()
+        response = requests.post(f'{base_url}/api/generate-mockup', json=payload, timeout=300)
+        elapsed = time.perf_counter() - start
+        return elapsed, response.status_code
+
+    def poll_health():
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                requests.get(f'{base_url}/health', timeout=300)
+                health_latencies.append(time.perf_counter() - start)
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+
+    health_thread = threading.Thread(target=poll_health, daemon=True)
+    health_thread.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for elapsed, status in executor.map(one_mockup, range(total_requests)):
+            mockup_latencies.append(elapsed)
+            if status != 200:
+                errors += 1
+    wall_time = time.perf_counter() - start
+    done.set()
+    health_thread.join()
+
+    return {
+        'throughput': total_requests / wall_time,
+        'mockup_p50': statistics.median(mockup_latencies),
+        'mockup_max': max(mockup_latencies),
+        'health_p50': statistics.median(health_latencies) if health_latencies else float('nan'),
+        'health_max': max(health_latencies) if health_latencies else float('nan'),
+        'errors': errors,
+    }
+
+
+def run_server(worker_class, args, payload):
+    """Start gunicorn with the given worker class and run the load against it."""
+    env = dict(os.environ)
+    env['GUNICORN_WORKER_CLASS'] = worker_class
+    env['GUNICORN_WORKERS'] = str(args.workers)
+    env['GUNICORN_THREADS'] = str(args.threads)
+    env['GUNICORN_BIND'] = f'127.0.0.1:{args.port}'
+    env['RATELIMIT_ENABLED'] = 'false'
+
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app_aws:app'],
+        cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f'http://127.0.0.1:{args.port}'
+        if not wait_for_health(f'{base_url}/health', args.boot_timeout):
+            raise RuntimeError('gunicorn did not become healthy in time')
+        return run_load(base_url, payload, args.concurrency, args.requests)
+    finally:
+        master.send_signal(signal.SIGTERM)
+        try:
+            master.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            master.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=1.0, help='Artificial artwork download latency in seconds')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--asset-port', type=int, default=8767)
+    parser.add_argument('--boot-timeout', type=int, default=120)
+    args = parser.parse_args()
+
+    asset_server = start_slow_asset_server(args.asset_port, args.latency, make_jpeg(800, 1000, (180, 60, 40)))
+    room = base64.b64encode(make_jpeg(1600, 1200, (220, 215, 200))).decode('utf-8')
+    payload = {
+        'artwork_url': f'http://127.0.0.1:{args.asset_port}/artwork.jpg',
+        'room_url': f'data:image/jpeg;base64,{room}',
+        'artwork_position': {'x': 50, 'y': 40},
+    }
+
+    results = {}
+    try:
+        for worker_class in ('sync', 'gthread'):
+            print(f"Running {args.requests} mockups at concurrency {args.concurrency} against {worker_class} workers...")
+            results[worker_class] = run_server(worker_class, args, payload)
+    finally:
+        asset_server.shutdown()
+
+    print()
+    print(f"{'workers':<8} {'req/s':>7} {'mockup p50':>11} {'mockup max':>11} {'health p50':>11} {'health max':>11} {'errors':>7}")
+    for worker_class, r in results.items():
+        print(f"{worker_class:<8} {r['throughput']:>7.2f} {r['mockup_p50']:>10.2f}s {r['mockup_max']:>10.2f}s "
+              f"{r['health_p50']:>10.3f}s {r['health_max']:>10.3f}s {r['errors']:>7}")
+    if results['sync']['throughput']:
+        print(f"\ngthread throughput gain: {results['gthread']['throughput'] / results['sync']['throughput']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Compare per-worker memory with and without gunicorn --preload.
+
+Starts app_aws under gunicorn twice (GUNICORN_PRELOAD=false, then true) with
+the same number of workers, waits for the workers to boot and warm up, and
+reports each worker's unique set size (USS): the memory that would be freed
+if that worker exited. With preload plus gc.freeze() the catalog and imported
+modules live in pages shared with the master, so USS per worker should drop.
+
+Usage (from the backend directory, with the usual AWS environment set):
+    python benchmarks/measure_preload_memory.py --workers 4
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import psutil
+import requests
+
+from common import BACKEND_DIR, wait_for_health
+
+
+def measure_run(preload, workers, port, warmup_requests, boot_timeout):
+    """Run gunicorn once and return (master_uss_mb, [worker_uss_mb, ...])."""
+    env = dict(os.environ)
+    env['GUNICORN_PRELOAD'] = 'true' if preload else 'false'
+    env['GUNICORN_WORKERS'] = str(workers)
+    env['GUNICORN_BIND'] = f'127.0.0.1:{port}'
+
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app_aws:app'],
+        cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        if not wait_for_health(f'{base_url}/health', boot_timeout):
+            raise RuntimeError('gunicorn did not become healthy in time')
+
+        # Touch the catalog in every worker so non-preloaded workers pay for
+        # their own copy, as they would under real traffic.
+        for _ in range(warmup_requests):
+            requests.get(f'{base_url}/api/preferences-options', timeout=30)
+        time.sleep(2)
+
+        proc = psutil.Process(master.pid)
+        master_uss = proc.memory_full_info().uss / 1024 / 1024
+        worker_uss = [child.memory_full_info().uss / 1024 / 1024 for child in proc.children()]
+        return master_uss, worker_uss
+    finally:
+        master.send_signal(signal.SIGTERM)
+        try:
+            master.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            master.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--warmup-requests', type=int, default=20)
+    parser.add_argument('--boot-timeout', type=int, default=120)
+    args = parser.parse_args()
+
+    results = {}
+    for preload in (False, True):
+        label = 'preload' if preload else 'no preload'
+        print(f"Measuring {args.workers} workers with {label}...")
+        results[label] = measure_run(preload, args.workers, args.port, args.warmup_requests, args.boot_timeout)
+
+    print()
+    print(f"{'mode':<12} {'master USS':>12} {'worker USS (mean)':>18} {'workers total':>14}")
+    for label, (master_uss, worker_uss) in results.items():
+        mean = sum(worker_uss) / len(worker_uss) if worker_uss else 0.0
+        print(f"{label:<12} {master_uss:>10.1f}MB {mean:>16.1f}MB {sum(worker_uss):>12.1f}MB")
+
+    baseline = results['no preload'][1]
+    preloaded = results['preload'][1]
+    if baseline and preloaded:
+        saved = sum(baseline) / len(baseline) - sum(preloaded) / len(preloaded)
+        print(f"\nPreload saves {saved:.1f}MB of unique memory per worker")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Check that downscaled moderation payloads give the same Rekognition verdicts
+as full-resolution images.
+
+For every image in a directory this sends both the original bytes (when they
+fit Rekognition's 5MB limit) and the payload produced by
+moderation.encode_moderation_payload to detect_moderation_labels, then
+reports verdict agreement, label differences, payload sizes and latency.
+Exits with status 1 if any verdict differs.
+
+Usage (from the backend directory, with AWS credentials configured):
+    python benchmarks/moderation_verdict_stability.py path/to/images --max-dim 1280 --quality 85
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+
+import boto3
+from PIL import Image
+
+from common import image_paths, register_heif  # Also puts the backend on sys.path
+from moderation import encode_moderation_payload, REKOGNITION_MAX_IMAGE_BYTES
+
+
+def moderate(client, payload, min_confidence):
+    """Return (approved, label names, seconds) for one payload."""
+    start = time.perf_counter()
+    response = client.detect_moderation_labels(Image={'Bytes': payload}, MinConfidence=min_confidence)
+    elapsed = time.perf_counter() - start
+    labels = sorted(label['Name'] for label in response.get('ModerationLabels', []))
+    return len(labels) == 0, labels, elapsed
+
+
+def full_resolution_payload(path):
+    """Original file bytes, or a quality-95 JPEG for formats Rekognition can't read (HEIC)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.lower().endswith(('.jpg', '.jpeg', '.png')):
+        return data
+    buffer = BytesIO()
+    Image.open(BytesIO(data)).convert('RGB').save(buffer, format='JPEG', quality=95)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image_dir')
+    parser.add_argument('--max-dim', type=int, default=1280)
+    parser.add_argument('--quality', type=int, default=85)
+    parser.add_argument('--min-confidence', type=float, default=50.0)
+    parser.add_argument('--region', default=os.getenv('AWS_REGION', 'us-east-1'))
+    args = parser.parse_args()
+
+    register_heif()
+
+    client = boto3.client('rekognition', region_name=args.region)
+    paths = image_paths(args.image_dir)
+
+    compared = mismatches = skipped = 0
+    full_sizes, small_sizes, full_times, small_times = [], [], [], []
+    for path in paths:
+        name = os.path.basename(path)
+        full = full_resolution_payload(path)
+        if len(full) > REKOGNITION_MAX_IMAGE_BYTES:
+            print(f"SKIP  {name}: full-resolution payload is {len(full)} bytes, over the Rekognition limit")
+            skipped += 1
+            continue
+        img = Image.open(BytesIO(full)).convert('RGB')
+        small = encode_moderation_payload(img, max_dim=args.max_dim, quality=args.quality)
+
+        full_ok, full_labels, full_time = moderate(client, full, args.min_confidence)
+        small_ok, small_labels, small_time = moderate(client, small, args.min_confidence)
+        compared += 1
+        full_sizes.append(len(full))
+        small_sizes.append(len(small))
+        full_times.append(full_time)
+        small_times.append(small_time)
+
+        status = 'OK   ' if full_ok == small_ok else 'DIFF '
+        if full_ok != small_ok:
+            mismatches += 1
+        label_note = '' if full_labels == small_labels else f" labels full={full_labels} small={small_labels}"
+        print(f"{status} {name}: {len(full)} -> {len(small)} bytes, "
+              f"approved full={full_ok} small={small_ok}{label_note}")
+
+    print()
+    print(f"Compared {compared} images ({skipped} skipped), {mismatches} verdict mismatches")
+    if compared:
+        print(f"Mean payload: {statistics.mean(full_sizes) / 1024:.0f}KB full vs {statistics.mean(small_sizes) / 1024:.0f}KB downscaled")
+        print(f"Median Rekognition latency: {statistics.median(full_times) * 1000:.0f}ms full vs "
+              f"{statistics.median(small_times) * 1000:.0f}ms downscaled")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark palette.extract_palette against the sklearn KMeans extractor it
+replaced, and check that the two produce the same palettes.
+
+For every image the 100px color thumbnail is built once, then both
+extractors run on it. The script reports median time per call and two
+agreement measures:
+  - weighted distance: for each KMeans color, the RGB distance to the
+    nearest histogram-palette color, weighted by the KMeans percentage
+  - dominant distance: RGB distance between the two top colors
+It exits with status 1 if any image's weighted distance is above
+--max-distance.
+
+Usage (from the backend directory; needs scikit-learn for the reference):
+    python benchmarks/palette_extraction.py path/to/images
+    python benchmarks/palette_extraction.py --synthetic 50
+"""
+import argparse
+import statistics
+import sys
+
+import numpy as np
+from PIL import Image
+from sklearn.cluster import KMeans
+
+from common import load_images, palette_agreement, register_heif, timed  # Also puts the backend on sys.path
+from image_analysis import AnalysisContext
+from palette import extract_palette
+
+
+def kmeans_palette(pixels, n_colors=5):
+    """The previous extractor: sklearn KMeans on the raw thumbnail pixels."""
+    pixels = pixels.reshape(-1, 3)
+    kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init='auto').fit(pixels)
+    colors = kmeans.cluster_centers_.astype(int)
+    percentages = np.bincount(kmeans.labels_, minlength=n_colors) / len(pixels)
+    palette = [{'color': f'#{c[0]:02x}{c[1]:02x}{c[2]:02x}', 'percentage': float(p)}
+               for c, p in zip(colors, percentages)]
+    palette.sort(key=lambda x: x['percentage'], reverse=True)
+    return palette
+
+
+def synthetic_rooms(count, size=(900, 600)):
+    """Room-like test images: a few flat color regions with gradients and noise."""
+    rng = np.random.default_rng(7)
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width]
+    for index in range(count):
+        img = np.zeros((height, width, 3), dtype=np.float32)
+        img[:] = rng.integers(40, 235, 3)
+        for _ in range(rng.integers(2, 6)):
+            x0, y0 = rng.integers(0, width), rng.integers(0, height)
+            w, h = rng.integers(width // 8, width // 2), rng.integers(height // 8, height // 2)
+            img[y0:y0 + h, x0:x0 + w] = rng.integers(0, 256, 3)
+        img *= (0.75 + 0.25 * (x / width))[..., None]
+        img += rng.normal(0, 8, img.shape)
+        yield f'synthetic-{index:03d}', Image.fromarray(np.clip(img, 0, 255).astype(np.uint8))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image_dir', nargs='?')
+    parser.add_argument('--synthetic', type=int, help='Use N generated room images instead of a directory')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-distance', type=float, default=30.0,
+                        help='Fail if the weighted nearest-color distance exceeds this (RGB units)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print both palettes for every image')
+    args = parser.parse_args()
+
+    register_heif()
+
+    if args.synthetic:
+        images = synthetic_rooms(args.synthetic)
+    elif args.image_dir:
+        images = load_images(args.image_dir)
+    else:
+        parser.error('pass an image directory or --synthetic N')
+
+    kmeans_times, palette_times, weighted, dominant = [], [], [], []
+    failures = 0
+    for name, img in images:
+        pixels = AnalysisContext(img).color_pixels
+        kmeans_time, reference = timed(kmeans_palette, pixels, repeat=args.repeat)
+        palette_time, candidate = timed(extract_palette, pixels, repeat=args.repeat)
+        kmeans_times.append(kmeans_time)
+        palette_times.append(palette_time)
+        weighted_distance, dominant_distance = palette_agreement(reference, candidate)
+        weighted.append(weighted_distance)
+        dominant.append(dominant_distance)
+        failed = weighted_distance > args.max_distance
+        failures += failed
+        if failed or args.verbose:
+            print(f"{'FAIL' if failed else 'OK  '} {name}: weighted {weighted_distance:.1f}, dominant {dominant_distance:.1f}")
+            print(f"     kmeans  {[(c['color'], round(c['percentage'], 2)) for c in reference]}")
+            print(f"     palette {[(c['color'], round(c['percentage'], 2)) for c in candidate]}")
+
+    if not weighted:
+        print('No images found')
+        sys.exit(1)
+    print(f"Images: {len(weighted)}, agreement failures (> {args.max_distance:.0f}): {failures}")
+    print(f"Weighted nearest-color distance: median {statistics.median(weighted):.1f}, max {max(weighted):.1f}")
+    print(f"Dominant-color distance:         median {statistics.median(dominant):.1f}, max {max(dominant):.1f}")
+    print(f"Median time per call: KMeans {statistics.median(kmeans_times) * 1000:.2f}ms, "
+          f"histogram palette {statistics.median(palette_times) * 1000:.2f}ms "
+          f"({statistics.median(kmeans_times) / statistics.median(palette_times):.0f}x faster)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Check that the fused room feature pass (image_analysis.room_features) gives
+the same categorical room analysis as the previous per-analyzer code, and
+measure what it saves.
+
+The previous brightness, contrast, texture and architectural-style analyzers
+each recomputed a float64 grayscale image (and texture re-imported scipy),
+and the color palette analyzer called colorsys.rgb_to_hsv once per pixel.
+Their code is reproduced below as the reference. For every image this
+compares brightness, contrast, texture_complexity, architectural_style,
+room_type and the palette saturation/temperature, then reports median time
+and peak NumPy allocation (tracemalloc) for both paths. Exits with status 1
+on any mismatch.
+
+Usage (from the backend directory):
+    python benchmarks/room_features_parity.py path/to/photos
+    python benchmarks/room_features_parity.py --synthetic 100
+"""
+import argparse
+import colorsys
+import statistics
+import sys
+import tracemalloc
+
+import numpy as np
+from scipy import ndimage
+
+from common import load_images, register_heif, timed  # Also puts the backend on sys.path
+from image_analysis import (
+    AnalysisContext, room_features, analyze_brightness, analyze_color_palette, analyze_contrast,
+    analyze_texture_complexity, detect_architectural_style, detect_room_type
+)
+
+FEATURES = ('brightness', 'contrast', 'texture_complexity', 'architectural_style', 'room_type',
+            'saturation', 'temperature')
+
+
+def legacy_analysis(img_array):
+    """The previous analyzers, each recomputing float64 grayscale."""
+    gray = np.mean(img_array, axis=2)
+    brightness = np.mean(gray) / 255.0
+    brightness_level = 'bright' if brightness > 0.7 else 'medium' if brightness > 0.4 else 'dark'
+
+    gray = np.mean(img_array, axis=2)
+    contrast = np.std(gray) / 255.0
+    contrast_level = 'high' if contrast > 0.15 else 'medium' if contrast > 0.08 else 'low'
+
+    gray = np.mean(img_array, axis=2)
+    edge_magnitude = np.sqrt(ndimage.sobel(gray, axis=1) ** 2 + ndimage.sobel(gray, axis=0) ** 2)
+    texture_score = np.mean(edge_magnitude)
+    texture = 'complex' if texture_score > 30 else 'moderate' if texture_score > 15 else 'simple'
+
+    gray = np.mean(img_array, axis=2)
+    horizontal_edges = np.sum(np.abs(np.diff(gray, axis=0)))
+    vertical_edges = np.sum(np.abs(np.diff(gray, axis=1)))
+    edge_ratio = horizontal_edges / (vertical_edges + 1)
+    avg_brightness = np.mean(gray) / 255.0
+    if avg_brightness > 0.7 and edge_ratio > 1.2:
+        style = 'modern'
+    elif avg_brightness < 0.4:
+        style = 'traditional'
+    elif edge_ratio < 0.8:
+        style = 'rustic'
+    else:
+        style = 'contemporary'
+
+    height, width = img_array.shape[:2]
+    avg_color = np.mean(img_array, axis=(0, 1))
+    if width / height > 1.5:
+        room_type = 'living_room'
+    elif avg_color[0] > avg_color[1] and avg_color[0] > avg_color[2]:
+        room_type = 'bedroom'
+    else:
+        room_type = 'general'
+
+    hsv = np.array([colorsys.rgb_to_hsv(r / 255, g / 255, b / 255) for r, g, b in img_array.reshape(-1, 3)])
+    avg_saturation = np.mean(hsv[:, 1])
+    saturation = 'vibrant' if avg_saturation > 0.3 else 'moderate' if avg_saturation > 0.15 else 'muted'
+    temperature = 'warm' if np.mean(img_array[:, :, 0]) > np.mean(img_array[:, :, 2]) else 'cool'
+
+    return dict(zip(FEATURES, (brightness_level, contrast_level, texture, style, room_type, saturation, temperature)))
+
+
+def fused_analysis(img_array):
+    features = room_features(img_array)
+    palette = analyze_color_palette(features)
+    return dict(zip(FEATURES, (
+        analyze_brightness(features), analyze_contrast(features), analyze_texture_complexity(features),
+        detect_architectural_style(features), detect_room_type(features),
+        palette['saturation'], palette['temperature'],
+    )))
+
+
+def synthetic_rooms(count, size=(800, 600)):
+    """Room-like images spanning dark/bright, flat/busy and wide/tall cases."""
+    rng = np.random.default_rng(11)
+    for index in range(count):
+        width, height = size if index % 3 else (size[0], int(size[0] / rng.uniform(1.2, 1.9)))
+        y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+        img = np.empty((height, width, 3), dtype=np.float32)
+        img[:] = rng.integers(10, 245, 3)
+        img *= (rng.uniform(0.5, 1.0) + rng.uniform(0, 0.5) * np.sin(x / rng.uniform(20, 200)))[..., None]
+        if index % 2:
+            stripes = (np.sin(y / rng.uniform(3, 30)) > 0)[..., None] * rng.integers(0, 80)
+            img += stripes
+        img += rng.normal(0, rng.uniform(1, 25), img.shape)
+        yield f'synthetic-{index:03d}', np.clip(img, 0, 255).astype(np.uint8)
+
+
+def load_room_arrays(image_dir):
+    for name, img in load_images(image_dir):
+        yield name, AnalysisContext(img).room_array
+
+
+def measure(func, img_array, repeat):
+    """(median seconds, peak traced bytes, result) for func(img_array)."""
+    median, result = timed(func, img_array, repeat=repeat)
+    tracemalloc.start()
+    func(img_array)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return median, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image_dir', nargs='?')
+    parser.add_argument('--synthetic', type=int, help='Use N generated room images instead of a directory')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    register_heif()
+
+    if args.synthetic:
+        images = synthetic_rooms(args.synthetic)
+    elif args.image_dir:
+        images = load_room_arrays(args.image_dir)
+    else:
+        parser.error('pass an image directory or --synthetic N')
+
+    legacy_times, fused_times, legacy_peaks, fused_peaks = [], [], [], []
+    compared = mismatches = 0
+    for name, img_array in images:
+        legacy_time, legacy_peak, expected = measure(legacy_analysis, img_array, args.repeat)
+        fused_time, fused_peak, actual = measure(fused_analysis, img_array, args.repeat)
+        legacy_times.append(legacy_time)
+        fused_times.append(fused_time)
+        legacy_peaks.append(legacy_peak)
+        fused_peaks.append(fused_peak)
+        compared += 1
+        differences = {key: (expected[key], actual[key]) for key in FEATURES if expected[key] != actual[key]}
+        if differences:
+            mismatches += 1
+            print(f"DIFF {name}: {differences}")
+
+    if not compared:
+        print('No images found')
+        sys.exit(1)
+    print(f"Images: {compared}, categorical mismatches: {mismatches}")
+    print(f"Median time:        legacy {statistics.median(legacy_times) * 1000:.1f}ms, "
+          f"fused {statistics.median(fused_times) * 1000:.1f}ms")
+    print(f"Median peak alloc:  legacy {statistics.median(legacy_peaks) / 1e6:.1f}MB, "
+          f"fused {statistics.median(fused_peaks) / 1e6:.1f}MB")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
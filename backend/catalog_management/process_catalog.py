@@ -3,7 +3,7 @@ process_catalog.py
 
 Purpose:
     Generates or updates catalog.json by processing all images in the catalog/images/ directory.
-    For each image, extracts the 5 most dominant colors using KMeans clustering and creates a record
+    For each image, extracts the 5 most dominant colors (histogram palette, see backend/palette.py) and creates a record
     with a unique ID, filename, title, artist, description, price, product URL, and attributes (dominant colors, mood, style, subject—latter three are placeholders).
     Uses catalog_metadata.json for custom descriptions and product URLs.
     Writes all records to catalog.json.
@@ -11,18 +11,26 @@ Purpose:
 Usage:
     Run this script to create a fresh catalog or update it based on the images present.
     Update catalog_metadata.json to customize descriptions and product URLs for each image.
+    Set PALETTE_COLOR_SPACE (rgb or lab) to the value the app runs with, since palettes are only
+    comparable within one color space.
 """
 import os
+import sys
 import json
 import uuid
 from PIL import Image
 import numpy as np
-from sklearn.cluster import KMeans
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from config import config
+from palette import extract_palette
 
 CATALOG_DIR = os.path.join(os.path.dirname(__file__), '..', 'catalog')
 IMAGE_DIR = os.path.join(CATALOG_DIR, 'images')
 CATALOG_JSON_PATH = os.path.join(CATALOG_DIR, 'catalog.json')
 METADATA_PATH = os.path.join(os.path.dirname(__file__), 'catalog_metadata.json')
+# Must match the app's PALETTE_COLOR_SPACE for catalog and upload palettes to be comparable
+PALETTE_COLOR_SPACE = config.get_analysis_config()['palette_color_space']
 
 def load_metadata():
     """Loads the metadata file with custom descriptions and product URLs."""
@@ -61,38 +69,10 @@ def extract_dominant_colors(image_path, n_colors=5):
         # Resize for faster processing
         img.thumbnail((100, 100))
         
-        # Reshape the image to be a list of pixels
-        pixels = np.array(img).reshape(-1, 3)
-        
-        # Use KMeans to find dominant colors
-        kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init='auto')
-        kmeans.fit(pixels)
-        
-        # Get cluster centers (colors) and labels
-        colors = kmeans.cluster_centers_.astype(int)
-        labels = kmeans.labels_
-        
-        # Count pixels in each cluster and calculate percentages
-        if labels is not None:
-            label_counts = np.bincount(labels)
-            total_pixels = len(pixels)
-            percentages = label_counts / total_pixels
-            
-            # Combine colors and percentages
-            dominant_colors = []
-            for i in range(len(colors)):
-                dominant_colors.append({
-                    'color': f'#{colors[i][0]:02x}{colors[i][1]:02x}{colors[i][2]:02x}',
-                    'percentage': float(percentages[i])
-                })
-                
-            # Sort by percentage in descending order
-            dominant_colors.sort(key=lambda x: x['percentage'], reverse=True)
-            
-            return dominant_colors
-        else:
-            print(f"Error: No labels generated for {image_path}")
-            return []
+        dominant_colors = extract_palette(np.array(img), n_colors, PALETTE_COLOR_SPACE)
+        if not dominant_colors:
+            print(f"Error: No colors extracted for {image_path}")
+        return dominant_colors
     except Exception as e:
         print(f"Error processing {image_path}: {e}")
         return []
@@ -112,7 +92,7 @@ def get_artwork_metadata(filename, metadata):
 
 def process_catalog():
     """Processes all images in the IMAGE_DIR and updates the catalog.json file."""
-    print("Starting art catalog processing...")
+    print(f"Starting art catalog processing ({PALETTE_COLOR_SPACE} palettes)...")
     
     # Load metadata
     metadata = load_metadata()
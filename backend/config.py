@@ -7,7 +7,26 @@ try:
         AWS_REGION, CATALOG_TABLE_NAME, CATALOG_BUCKET_NAME, 
         APPROVED_BUCKET, QUARANTINE_BUCKET, APP_ENV,
         MAX_RECOMMENDATIONS, MIN_RECOMMENDATIONS, CONFIDENCE_THRESHOLD,
-        CATALOG_CACHE_TTL, PRESIGNED_URL_CACHE_TTL, MODERATION_CACHE_TTL
+        CATALOG_CACHE_TTL, PRESIGNED_URL_CACHE_TTL, MODERATION_CACHE_TTL,
+        RATELIMIT_ENABLED, AWS_MAX_POOL_CONNECTIONS,
+        ANALYSIS_POOL_WORKERS, ANALYSIS_POOL_MAX_QUEUE, ANALYSIS_TASK_TIMEOUT, ANALYSIS_LATENCY_BUDGET, PALETTE_COLOR_SPACE,
+        MODERATION_MAX_DIM, MODERATION_JPEG_QUALITY,
+        MODERATION_HASH_DB, MODERATION_HASH_MAX_DISTANCE, MODERATION_HASH_APPROVE_MAX_DISTANCE,
+        MODERATION_HASH_MAX_ENTRIES, MODERATION_HASH_MAX_AGE_DAYS,
+        UPLOAD_MAX_BYTES, UPLOAD_SPOOL_BYTES,
+        DECODE_MAX_PIXELS, DECODE_MAX_FULL_PIXELS, DECODE_MAX_FRAMES,
+        TASK_MEMORY_BYTES, MEMORY_HEADROOM_FRACTION, WORKER_BASE_MEMORY_BYTES, ANALYSIS_PROCESS_MEMORY_BYTES,
+        WORKER_CACHE_MEMORY_BYTES, MIN_WORKER_CACHE_MEMORY_BYTES, CACHE_MEMORY_SHARES,
+        ARTWORK_CACHE_MEMORY_BYTES, ARTWORK_CACHE_DIR, ARTWORK_CACHE_DISK_BYTES,
+        ARTWORK_CACHE_MAX_DIM, ARTWORK_CACHE_REVALIDATE_SECONDS,
+        MOCKUP_CACHE_MAX_AGE, MOCKUP_POSITION_GRID, MOCKUP_RENDER_CACHE_MEMORY_BYTES,
+        MOCKUP_RENDER_CACHE_DIR, MOCKUP_RENDER_CACHE_DISK_BYTES, MOCKUP_RENDER_CACHE_BUCKET,
+        MOCKUP_RENDER_CACHE_PREFIX, MOCKUP_RENDER_CACHE_MAX_AGE_SECONDS, MOCKUP_BATCH_MAX_ITEMS, MOCKUP_BATCH_WORKERS,
+        MOCKUP_EFFECTS_CACHE_BYTES,
+        ROOM_SESSION_TTL_SECONDS, ROOM_SESSION_MEMORY_BYTES, ROOM_SESSION_MAX_DIM,
+        ROOM_SESSION_DIR, ROOM_SESSION_DISK_BYTES, ROOM_PREVIEW_CACHE_BYTES,
+        MOCKUP_PREFETCH_COUNT, MOCKUP_PREFETCH_MAX_LOAD, MOCKUP_PREFETCH_MAX_ACTIVE_REQUESTS,
+        MOCKUP_PREFETCH_MAX_PENDING
     )
 except ImportError:
     # Fallback values if constants.py is not available
@@ -23,6 +42,84 @@ except ImportError:
     CATALOG_CACHE_TTL = 300
     PRESIGNED_URL_CACHE_TTL = 3600
     MODERATION_CACHE_TTL = 600
+    RATELIMIT_ENABLED = True
+    AWS_MAX_POOL_CONNECTIONS = 25
+    ANALYSIS_POOL_WORKERS = 2
+    ANALYSIS_POOL_MAX_QUEUE = 8
+    ANALYSIS_TASK_TIMEOUT = 20
+    ANALYSIS_LATENCY_BUDGET = 2.0
+    PALETTE_COLOR_SPACE = 'rgb'
+    MODERATION_MAX_DIM = 1280
+    MODERATION_JPEG_QUALITY = 85
+    MODERATION_HASH_DB = 'moderation_verdicts.db'
+    MODERATION_HASH_MAX_DISTANCE = 12
+    MODERATION_HASH_APPROVE_MAX_DISTANCE = 2
+    MODERATION_HASH_MAX_ENTRIES = 50000
+    MODERATION_HASH_MAX_AGE_DAYS = 30
+    UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+    UPLOAD_SPOOL_BYTES = 1024 * 1024
+    DECODE_MAX_PIXELS = 100_000_000
+    DECODE_MAX_FULL_PIXELS = 50_000_000
+    DECODE_MAX_FRAMES = 16
+    TASK_MEMORY_BYTES = 2048 * 1024 * 1024
+    MEMORY_HEADROOM_FRACTION = 0.2
+    WORKER_BASE_MEMORY_BYTES = 320 * 1024 * 1024
+    ANALYSIS_PROCESS_MEMORY_BYTES = 64 * 1024 * 1024
+    WORKER_CACHE_MEMORY_BYTES = 0
+    MIN_WORKER_CACHE_MEMORY_BYTES = 32 * 1024 * 1024
+    CACHE_MEMORY_SHARES = {'artwork_cache': 0.4, 'room_sessions': 0.35, 'render_cache': 0.125, 'room_previews': 0.125}
+    ARTWORK_CACHE_MEMORY_BYTES = None
+    ARTWORK_CACHE_DIR = '/tmp/artwork-cache'
+    ARTWORK_CACHE_DISK_BYTES = 1024 * 1024 * 1024
+    ARTWORK_CACHE_MAX_DIM = 1600
+    ARTWORK_CACHE_REVALIDATE_SECONDS = 300
+    MOCKUP_CACHE_MAX_AGE = 3600
+    MOCKUP_POSITION_GRID = 0.5
+    MOCKUP_RENDER_CACHE_MEMORY_BYTES = None
+    MOCKUP_RENDER_CACHE_DIR = ''
+    MOCKUP_RENDER_CACHE_DISK_BYTES = 512 * 1024 * 1024
+    MOCKUP_RENDER_CACHE_BUCKET = ''
+    MOCKUP_RENDER_CACHE_PREFIX = 'mockup-renders/'
+    MOCKUP_RENDER_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
+    MOCKUP_BATCH_MAX_ITEMS = 12
+    MOCKUP_BATCH_WORKERS = 4
+    MOCKUP_EFFECTS_CACHE_BYTES = 16 * 1024 * 1024
+    ROOM_SESSION_TTL_SECONDS = 1800
+    ROOM_SESSION_MEMORY_BYTES = None
+    ROOM_SESSION_MAX_DIM = 2048
+    ROOM_SESSION_DIR = '/tmp/room-sessions'
+    ROOM_SESSION_DISK_BYTES = 1024 * 1024 * 1024
+    ROOM_PREVIEW_CACHE_BYTES = None
+    MOCKUP_PREFETCH_COUNT = 3
+    MOCKUP_PREFETCH_MAX_LOAD = 0.75
+    MOCKUP_PREFETCH_MAX_ACTIVE_REQUESTS = 1
+    MOCKUP_PREFETCH_MAX_PENDING = 8
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def backend_path(path):
+    """Anchor a relative data path to the backend directory rather than the working directory ('' stays '')."""
+    return os.path.join(BACKEND_DIR, path) if path else path
+
+def worker_cache_budget(task_memory_bytes, workers, analysis_processes, headroom_fraction=MEMORY_HEADROOM_FRACTION,
+                        worker_base_bytes=WORKER_BASE_MEMORY_BYTES, analysis_process_bytes=ANALYSIS_PROCESS_MEMORY_BYTES):
+    """Bytes each worker may spend on in-memory caches so that all workers fit in the task.
+
+    The task's memory, less the headroom, is split between the workers; each
+    worker's share, less its own footprint and its analysis pool processes',
+    is its cache budget (never below MIN_WORKER_CACHE_MEMORY_BYTES).
+    """
+    workers = max(1, workers)
+    usable = task_memory_bytes * (1 - headroom_fraction)
+    per_worker = usable / workers - worker_base_bytes - analysis_processes * analysis_process_bytes
+    return max(MIN_WORKER_CACHE_MEMORY_BYTES, int(per_worker))
+
+def cache_memory_bytes(name, default, share, budget):
+    """A cache's memory size: its own environment variable or constant if set, else its share of budget."""
+    value = os.getenv(name, default)
+    if value is None or value == '':
+        return int(budget * share)
+    return int(value)
 
 class Config:
     """Central configuration management for the Taberner Studio app"""
@@ -54,6 +151,84 @@ class Config:
         
         # Confidence threshold for showing attributes
         self.confidence_threshold = float(os.getenv('CONFIDENCE_THRESHOLD', CONFIDENCE_THRESHOLD))
+        
+        # Server Configuration - Environment variables take precedence
+        self.ratelimit_enabled = os.getenv('RATELIMIT_ENABLED', str(RATELIMIT_ENABLED)).lower() == 'true'
+        self.aws_max_pool_connections = int(os.getenv('AWS_MAX_POOL_CONNECTIONS', AWS_MAX_POOL_CONNECTIONS))
+        
+        # Analysis Pool Configuration - Environment variables take precedence
+        self.analysis_pool_workers = int(os.getenv('ANALYSIS_POOL_WORKERS', ANALYSIS_POOL_WORKERS))
+        self.analysis_pool_max_queue = int(os.getenv('ANALYSIS_POOL_MAX_QUEUE', ANALYSIS_POOL_MAX_QUEUE))
+        self.analysis_task_timeout = float(os.getenv('ANALYSIS_TASK_TIMEOUT', ANALYSIS_TASK_TIMEOUT))
+        self.analysis_latency_budget = float(os.getenv('ANALYSIS_LATENCY_BUDGET', ANALYSIS_LATENCY_BUDGET))
+        self.palette_color_space = os.getenv('PALETTE_COLOR_SPACE', PALETTE_COLOR_SPACE).lower()
+        
+        # Moderation Configuration - Environment variables take precedence
+        self.moderation_max_dim = int(os.getenv('MODERATION_MAX_DIM', MODERATION_MAX_DIM))
+        self.moderation_jpeg_quality = int(os.getenv('MODERATION_JPEG_QUALITY', MODERATION_JPEG_QUALITY))
+        self.moderation_hash_db = backend_path(os.getenv('MODERATION_HASH_DB', MODERATION_HASH_DB))
+        self.moderation_hash_max_distance = int(os.getenv('MODERATION_HASH_MAX_DISTANCE', MODERATION_HASH_MAX_DISTANCE))
+        self.moderation_hash_approve_max_distance = int(os.getenv('MODERATION_HASH_APPROVE_MAX_DISTANCE', MODERATION_HASH_APPROVE_MAX_DISTANCE))
+        self.moderation_hash_max_entries = int(os.getenv('MODERATION_HASH_MAX_ENTRIES', MODERATION_HASH_MAX_ENTRIES))
+        self.moderation_hash_max_age_days = int(os.getenv('MODERATION_HASH_MAX_AGE_DAYS', MODERATION_HASH_MAX_AGE_DAYS))
+        
+        # Upload Configuration - Environment variables take precedence
+        self.upload_max_bytes = int(os.getenv('UPLOAD_MAX_BYTES', UPLOAD_MAX_BYTES))
+        self.upload_spool_bytes = int(os.getenv('UPLOAD_SPOOL_BYTES', UPLOAD_SPOOL_BYTES))
+        
+        # Decode Budget Configuration - Environment variables take precedence
+        self.decode_max_pixels = int(os.getenv('DECODE_MAX_PIXELS', DECODE_MAX_PIXELS))
+        self.decode_max_full_pixels = int(os.getenv('DECODE_MAX_FULL_PIXELS', DECODE_MAX_FULL_PIXELS))
+        self.decode_max_frames = int(os.getenv('DECODE_MAX_FRAMES', DECODE_MAX_FRAMES))
+        
+        # Memory Budget Configuration - per-worker cache sizes below default to shares of this budget
+        self.task_memory_bytes = int(os.getenv('TASK_MEMORY_BYTES', TASK_MEMORY_BYTES))
+        self.gunicorn_workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+        self.worker_cache_memory_bytes = int(os.getenv('WORKER_CACHE_MEMORY_BYTES', WORKER_CACHE_MEMORY_BYTES)) or worker_cache_budget(
+            self.task_memory_bytes, self.gunicorn_workers, self.analysis_pool_workers)
+        
+        # Artwork Cache Configuration - Environment variables take precedence
+        self.artwork_cache_memory_bytes = cache_memory_bytes(
+            'ARTWORK_CACHE_MEMORY_BYTES', ARTWORK_CACHE_MEMORY_BYTES,
+            CACHE_MEMORY_SHARES['artwork_cache'], self.worker_cache_memory_bytes)
+        self.artwork_cache_dir = os.getenv('ARTWORK_CACHE_DIR', ARTWORK_CACHE_DIR)
+        self.artwork_cache_disk_bytes = int(os.getenv('ARTWORK_CACHE_DISK_BYTES', ARTWORK_CACHE_DISK_BYTES))
+        self.artwork_cache_max_dim = int(os.getenv('ARTWORK_CACHE_MAX_DIM', ARTWORK_CACHE_MAX_DIM))
+        self.artwork_cache_revalidate_seconds = int(os.getenv('ARTWORK_CACHE_REVALIDATE_SECONDS', ARTWORK_CACHE_REVALIDATE_SECONDS))
+        
+        # Mockup Configuration - Environment variables take precedence
+        self.mockup_cache_max_age = int(os.getenv('MOCKUP_CACHE_MAX_AGE', MOCKUP_CACHE_MAX_AGE))
+        self.mockup_position_grid = float(os.getenv('MOCKUP_POSITION_GRID', MOCKUP_POSITION_GRID))
+        self.mockup_render_cache_memory_bytes = cache_memory_bytes(
+            'MOCKUP_RENDER_CACHE_MEMORY_BYTES', MOCKUP_RENDER_CACHE_MEMORY_BYTES,
+            CACHE_MEMORY_SHARES['render_cache'], self.worker_cache_memory_bytes)
+        self.mockup_render_cache_dir = os.getenv('MOCKUP_RENDER_CACHE_DIR', MOCKUP_RENDER_CACHE_DIR)
+        self.mockup_render_cache_disk_bytes = int(os.getenv('MOCKUP_RENDER_CACHE_DISK_BYTES', MOCKUP_RENDER_CACHE_DISK_BYTES))
+        self.mockup_render_cache_bucket = os.getenv('MOCKUP_RENDER_CACHE_BUCKET', MOCKUP_RENDER_CACHE_BUCKET)
+        self.mockup_render_cache_prefix = os.getenv('MOCKUP_RENDER_CACHE_PREFIX', MOCKUP_RENDER_CACHE_PREFIX)
+        self.mockup_render_cache_max_age_seconds = int(os.getenv('MOCKUP_RENDER_CACHE_MAX_AGE_SECONDS',
+                                                                 MOCKUP_RENDER_CACHE_MAX_AGE_SECONDS))
+        self.mockup_batch_max_items = int(os.getenv('MOCKUP_BATCH_MAX_ITEMS', MOCKUP_BATCH_MAX_ITEMS))
+        self.mockup_batch_workers = int(os.getenv('MOCKUP_BATCH_WORKERS', MOCKUP_BATCH_WORKERS))
+        self.mockup_effects_cache_bytes = int(os.getenv('MOCKUP_EFFECTS_CACHE_BYTES', MOCKUP_EFFECTS_CACHE_BYTES))
+        
+        # Room Session Configuration - Environment variables take precedence
+        self.room_session_ttl_seconds = int(os.getenv('ROOM_SESSION_TTL_SECONDS', ROOM_SESSION_TTL_SECONDS))
+        self.room_session_memory_bytes = cache_memory_bytes(
+            'ROOM_SESSION_MEMORY_BYTES', ROOM_SESSION_MEMORY_BYTES,
+            CACHE_MEMORY_SHARES['room_sessions'], self.worker_cache_memory_bytes)
+        self.room_session_max_dim = int(os.getenv('ROOM_SESSION_MAX_DIM', ROOM_SESSION_MAX_DIM))
+        self.room_session_dir = os.getenv('ROOM_SESSION_DIR', ROOM_SESSION_DIR)
+        self.room_session_disk_bytes = int(os.getenv('ROOM_SESSION_DISK_BYTES', ROOM_SESSION_DISK_BYTES))
+        self.room_preview_cache_bytes = cache_memory_bytes(
+            'ROOM_PREVIEW_CACHE_BYTES', ROOM_PREVIEW_CACHE_BYTES,
+            CACHE_MEMORY_SHARES['room_previews'], self.worker_cache_memory_bytes)
+        
+        # Mockup Prefetch Configuration - Environment variables take precedence
+        self.mockup_prefetch_count = int(os.getenv('MOCKUP_PREFETCH_COUNT', MOCKUP_PREFETCH_COUNT))
+        self.mockup_prefetch_max_load = float(os.getenv('MOCKUP_PREFETCH_MAX_LOAD', MOCKUP_PREFETCH_MAX_LOAD))
+        self.mockup_prefetch_max_active_requests = int(os.getenv('MOCKUP_PREFETCH_MAX_ACTIVE_REQUESTS', MOCKUP_PREFETCH_MAX_ACTIVE_REQUESTS))
+        self.mockup_prefetch_max_pending = int(os.getenv('MOCKUP_PREFETCH_MAX_PENDING', MOCKUP_PREFETCH_MAX_PENDING))
     
     def get_aws_config(self) -> Dict[str, Any]:
         """Get AWS configuration as a dictionary"""
@@ -82,6 +257,96 @@ class Config:
             'moderation_cache_ttl': self.moderation_cache_ttl
         }
     
+    def get_server_config(self) -> Dict[str, Any]:
+        """Get server configuration as a dictionary"""
+        return {
+            'ratelimit_enabled': self.ratelimit_enabled,
+            'aws_max_pool_connections': self.aws_max_pool_connections
+        }
+    
+    def get_analysis_config(self) -> Dict[str, Any]:
+        """Get image analysis configuration as a dictionary"""
+        return {
+            'pool_workers': self.analysis_pool_workers,
+            'pool_max_queue': self.analysis_pool_max_queue,
+            'task_timeout': self.analysis_task_timeout,
+            'latency_budget': self.analysis_latency_budget,
+            'palette_color_space': self.palette_color_space
+        }
+    
+    def get_moderation_config(self) -> Dict[str, Any]:
+        """Get content moderation configuration as a dictionary"""
+        return {
+            'max_dim': self.moderation_max_dim,
+            'jpeg_quality': self.moderation_jpeg_quality,
+            'hash_db': self.moderation_hash_db,
+            'hash_max_distance': self.moderation_hash_max_distance,
+            'hash_approve_max_distance': self.moderation_hash_approve_max_distance,
+            'hash_max_entries': self.moderation_hash_max_entries,
+            'hash_max_age_days': self.moderation_hash_max_age_days
+        }
+    
+    def get_upload_config(self) -> Dict[str, Any]:
+        """Get binary upload configuration as a dictionary"""
+        return {
+            'max_bytes': self.upload_max_bytes,
+            'spool_bytes': self.upload_spool_bytes
+        }
+    
+    def get_decode_config(self) -> Dict[str, Any]:
+        """Get image decode budget configuration as a dictionary"""
+        return {
+            'max_pixels': self.decode_max_pixels,
+            'max_full_decode_pixels': self.decode_max_full_pixels,
+            'max_frames': self.decode_max_frames
+        }
+    
+    def get_artwork_cache_config(self) -> Dict[str, Any]:
+        """Get artwork image cache configuration as a dictionary"""
+        return {
+            'memory_bytes': self.artwork_cache_memory_bytes,
+            'disk_dir': self.artwork_cache_dir,
+            'disk_bytes': self.artwork_cache_disk_bytes,
+            'max_dim': self.artwork_cache_max_dim,
+            'revalidate_seconds': self.artwork_cache_revalidate_seconds
+        }
+    
+    def get_mockup_config(self) -> Dict[str, Any]:
+        """Get mockup rendering configuration as a dictionary"""
+        return {
+            'cache_max_age': self.mockup_cache_max_age,
+            'position_grid': self.mockup_position_grid,
+            'render_cache_memory_bytes': self.mockup_render_cache_memory_bytes,
+            'render_cache_dir': self.mockup_render_cache_dir,
+            'render_cache_disk_bytes': self.mockup_render_cache_disk_bytes,
+            'render_cache_bucket': self.mockup_render_cache_bucket,
+            'render_cache_prefix': self.mockup_render_cache_prefix,
+            'render_cache_max_age_seconds': self.mockup_render_cache_max_age_seconds,
+            'batch_max_items': self.mockup_batch_max_items,
+            'batch_workers': self.mockup_batch_workers,
+            'effects_cache_bytes': self.mockup_effects_cache_bytes
+        }
+    
+    def get_room_session_config(self) -> Dict[str, Any]:
+        """Get room session configuration as a dictionary"""
+        return {
+            'ttl_seconds': self.room_session_ttl_seconds,
+            'memory_bytes': self.room_session_memory_bytes,
+            'max_dim': self.room_session_max_dim,
+            'disk_dir': self.room_session_dir,
+            'disk_bytes': self.room_session_disk_bytes,
+            'preview_cache_bytes': self.room_preview_cache_bytes
+        }
+    
+    def get_mockup_prefetch_config(self) -> Dict[str, Any]:
+        """Get speculative mockup prefetch configuration as a dictionary"""
+        return {
+            'count': self.mockup_prefetch_count,
+            'max_load': self.mockup_prefetch_max_load,
+            'max_active_requests': self.mockup_prefetch_max_active_requests,
+            'max_pending': self.mockup_prefetch_max_pending
+        }
+    
     def __str__(self) -> str:
         """String representation of configuration"""
         return f"""Config:
@@ -94,7 +359,20 @@ class Config:
   Max Recommendations: {self.max_recommendations}
   Min Recommendations: {self.min_recommendations}
   Confidence Threshold: {self.confidence_threshold}
-  Cache TTLs: Catalog={self.catalog_cache_ttl}s, URLs={self.presigned_url_cache_ttl}s, Moderation={self.moderation_cache_ttl}s"""
+  Cache TTLs: Catalog={self.catalog_cache_ttl}s, URLs={self.presigned_url_cache_ttl}s, Moderation={self.moderation_cache_ttl}s
+  Rate Limiting Enabled: {self.ratelimit_enabled}
+  AWS Max Pool Connections: {self.aws_max_pool_connections}
+  Analysis Pool: workers={self.analysis_pool_workers}, max queue={self.analysis_pool_max_queue}, timeout={self.analysis_task_timeout}s, latency budget={self.analysis_latency_budget}s, palette space={self.palette_color_space}
+  Moderation Payload: max dim={self.moderation_max_dim}px, JPEG quality={self.moderation_jpeg_quality}
+  Moderation Verdict Cache: db={self.moderation_hash_db or 'memory only'}, max distance={self.moderation_hash_max_distance} bits (approvals {self.moderation_hash_approve_max_distance}), max entries={self.moderation_hash_max_entries}, max age={self.moderation_hash_max_age_days} days
+  Uploads: max size={self.upload_max_bytes} bytes, spooled in memory up to {self.upload_spool_bytes} bytes
+  Decode Budget: max {self.decode_max_pixels} pixels, full decode up to {self.decode_max_full_pixels} pixels, max {self.decode_max_frames} frames
+  Memory Budget: task={self.task_memory_bytes} bytes, {self.gunicorn_workers} worker(s), cache budget={self.worker_cache_memory_bytes} bytes per worker
+  Artwork Cache: memory={self.artwork_cache_memory_bytes} bytes, disk={self.artwork_cache_disk_bytes} bytes at {self.artwork_cache_dir}, max dim={self.artwork_cache_max_dim}
+  Mockups: cache max age={self.mockup_cache_max_age}s, batch max items={self.mockup_batch_max_items}, batch workers={self.mockup_batch_workers}, effects cache={self.mockup_effects_cache_bytes} bytes
+  Mockup Render Cache: position grid={self.mockup_position_grid}%, memory={self.mockup_render_cache_memory_bytes} bytes, store={self.mockup_render_cache_bucket or self.mockup_render_cache_dir or 'none'}, S3 max age={self.mockup_render_cache_max_age_seconds}s
+  Room Sessions: ttl={self.room_session_ttl_seconds}s, memory={self.room_session_memory_bytes} bytes, disk={self.room_session_disk_bytes} bytes at {self.room_session_dir or 'none'}, max dim={self.room_session_max_dim}, preview cache={self.room_preview_cache_bytes} bytes
+  Mockup Prefetch: count={self.mockup_prefetch_count}, max load={self.mockup_prefetch_max_load}/CPU, max active requests={self.mockup_prefetch_max_active_requests}"""
 
 # Global configuration instance
 config = Config() 
\ No newline at end of file
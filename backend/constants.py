@@ -14,4 +14,79 @@ CONFIDENCE_THRESHOLD = 0.7
 # Cache Configuration
 CATALOG_CACHE_TTL = 300  # 5 minutes
 PRESIGNED_URL_CACHE_TTL = 3600  # 1 hour
-MODERATION_CACHE_TTL = 600  # 10 minutes 
\ No newline at end of file
+MODERATION_CACHE_TTL = 600  # 10 minutes
+
+# Server Configuration
+RATELIMIT_ENABLED = True
+AWS_MAX_POOL_CONNECTIONS = 25  # Should be at least the number of worker threads
+
+# Analysis Pool Configuration
+ANALYSIS_POOL_WORKERS = 2  # 0 runs image analysis inline on the request thread
+ANALYSIS_POOL_MAX_QUEUE = 8
+ANALYSIS_TASK_TIMEOUT = 20  # seconds
+ANALYSIS_LATENCY_BUDGET = 2.0  # seconds; 0 always runs the full-resolution room analysis
+PALETTE_COLOR_SPACE = 'rgb'  # 'lab' clusters palettes in CIELAB; the catalog must be built the same way
+
+# Moderation Configuration
+MODERATION_MAX_DIM = 1280  # Longest side of the JPEG sent to Rekognition
+MODERATION_JPEG_QUALITY = 85
+MODERATION_HASH_DB = 'moderation_verdicts.db'  # SQLite file for persisted verdicts, relative to backend/ ('' keeps them in memory only)
+MODERATION_HASH_MAX_DISTANCE = 12  # Max differing bits (of 256) for a near-duplicate rejection match
+MODERATION_HASH_APPROVE_MAX_DISTANCE = 2  # Approvals are only reused for (almost) identical images
+MODERATION_HASH_MAX_ENTRIES = 50000  # Verdicts kept per process (oldest dropped first)
+MODERATION_HASH_MAX_AGE_DAYS = 30
+
+# Upload Configuration
+UPLOAD_MAX_BYTES = 20 * 1024 * 1024  # Largest accepted binary upload
+UPLOAD_SPOOL_BYTES = 1024 * 1024  # Uploads larger than this are spooled to a temp file
+
+# Decode Budget Configuration
+DECODE_MAX_PIXELS = 100_000_000  # Images with more pixels are rejected before decoding
+DECODE_MAX_FULL_PIXELS = 50_000_000  # Larger JPEGs are decoded at reduced scale, larger other formats rejected
+DECODE_MAX_FRAMES = 16
+
+# Memory Budget Configuration
+# Each gunicorn worker's in-memory caches are sized from one budget, derived from
+# the task memory; see "Memory sizing" in aws/environment-variables-reference.md
+TASK_MEMORY_BYTES = 2048 * 1024 * 1024  # "memory" of the task in aws/ecs-task-definition.json
+MEMORY_HEADROOM_FRACTION = 0.2  # of the task memory, left unplanned for fragmentation and spikes
+WORKER_BASE_MEMORY_BYTES = 320 * 1024 * 1024  # per worker outside its caches: the app and requests in flight
+ANALYSIS_PROCESS_MEMORY_BYTES = 64 * 1024 * 1024  # per analysis pool process (NumPy, the Lab LUT, one image)
+WORKER_CACHE_MEMORY_BYTES = 0  # per-worker cache budget; 0 derives it from the values above and GUNICORN_WORKERS
+MIN_WORKER_CACHE_MEMORY_BYTES = 32 * 1024 * 1024
+# Share of the worker cache budget each in-memory cache gets, unless its own size is set
+CACHE_MEMORY_SHARES = {'artwork_cache': 0.4, 'room_sessions': 0.35, 'render_cache': 0.125, 'room_previews': 0.125}
+
+# Artwork Cache Configuration
+ARTWORK_CACHE_MEMORY_BYTES = None  # decoded, pre-scaled bitmaps per worker (None: its share of the cache budget)
+ARTWORK_CACHE_DIR = '/tmp/artwork-cache'  # original artwork bytes, shared by workers; empty disables the disk tier
+ARTWORK_CACHE_DISK_BYTES = 1024 * 1024 * 1024
+ARTWORK_CACHE_MAX_DIM = 1600  # longest side of cached bitmaps
+ARTWORK_CACHE_REVALIDATE_SECONDS = 300
+
+# Mockup Configuration
+MOCKUP_CACHE_MAX_AGE = 3600  # seconds browsers may reuse a binary mockup response
+MOCKUP_POSITION_GRID = 0.5  # artwork positions are snapped to this many percent of the room size
+MOCKUP_RENDER_CACHE_MEMORY_BYTES = None  # encoded renders kept in memory per worker (None: its share)
+MOCKUP_RENDER_CACHE_DIR = ''  # shared disk tier for encoded renders (empty to disable)
+MOCKUP_RENDER_CACHE_DISK_BYTES = 512 * 1024 * 1024
+MOCKUP_RENDER_CACHE_BUCKET = ''  # S3 tier for encoded renders, shared by all hosts (takes precedence over the disk tier)
+MOCKUP_RENDER_CACHE_PREFIX = 'mockup-renders/'
+MOCKUP_RENDER_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600  # S3 renders older than this are re-rendered
+MOCKUP_BATCH_MAX_ITEMS = 12  # artworks per /api/mockup/batch request
+MOCKUP_BATCH_WORKERS = 4  # threads compositing batch mockups per worker
+MOCKUP_EFFECTS_CACHE_BYTES = 16 * 1024 * 1024  # cached shadow profiles and frame sprites per worker
+
+# Room Session Configuration
+ROOM_SESSION_TTL_SECONDS = 1800  # sessions expire this long after their last use
+ROOM_SESSION_MEMORY_BYTES = None  # decoded room bitmaps kept in memory per worker (None: its share)
+ROOM_SESSION_MAX_DIM = 2048  # longest side of stored room bitmaps
+ROOM_SESSION_DIR = '/tmp/room-sessions'  # shared by the workers on a host (empty for memory only)
+ROOM_SESSION_DISK_BYTES = 1024 * 1024 * 1024
+ROOM_PREVIEW_CACHE_BYTES = None  # rooms scaled to preview sizes, per worker (None: its share)
+
+# Mockup Prefetch Configuration
+MOCKUP_PREFETCH_COUNT = 3  # top recommendations rendered speculatively after an upload (0 disables)
+MOCKUP_PREFETCH_MAX_LOAD = 0.75  # 1-minute load average per CPU above which prefetching pauses
+MOCKUP_PREFETCH_MAX_ACTIVE_REQUESTS = 1  # foreground requests a worker may be serving while it prefetches
+MOCKUP_PREFETCH_MAX_PENDING = 8
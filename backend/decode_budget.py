@@ -0,0 +1,160 @@
+"""
+Pre-decode inspection and pixel budgets for untrusted images.
+
+Image.open only parses the header, so the dimensions, mode, format and frame
+count of an upload are known before any pixel data is decoded. DecodeBudget
+uses that to reject images that are too large to decode at all (huge
+panoramas, decompression bombs) and to send images that are too large to
+decode at full size through reduced-scale decoding instead, which JPEG
+supports natively (DCT scaling via draft()). Counters for inspected,
+rejected and downscaled images are exposed through stats().
+
+Pillow has its own decompression-bomb guard in Image.open (an error above
+twice Image.MAX_IMAGE_PIXELS, a warning above it, which is an error when
+warnings are). Both are reported as DecodeBudgetExceeded too, so callers
+handle every oversized image the same way.
+"""
+import logging
+import threading
+from dataclasses import dataclass
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Formats whose decoders can produce a reduced-scale image without first
+# decoding the full-resolution one
+REDUCED_DECODE_FORMATS = {'JPEG', 'MPO'}
+
+
+class DecodeBudgetExceeded(ValueError):
+    """Raised when an image is over the pixel, frame or byte budget."""
+
+
+@dataclass(frozen=True)
+class ImageHeader:
+    """What Image.open learns from the header, before any pixels are decoded."""
+    format: str
+    mode: str
+    width: int
+    height: int
+    frames: int
+
+    @property
+    def pixels(self):
+        return self.width * self.height
+
+
+def open_image(stream):
+    """Image.open, with Pillow's decompression-bomb guard raised as DecodeBudgetExceeded."""
+    try:
+        return Image.open(stream)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise DecodeBudgetExceeded(f"decompression bomb: {e}") from None
+
+
+def inspect_image(stream):
+    """Read only the image header from a seekable stream (which is rewound afterwards)."""
+    position = stream.tell()
+    try:
+        with open_image(stream) as img:
+            return ImageHeader(
+                format=img.format or '',
+                mode=img.mode,
+                width=img.width,
+                height=img.height,
+                frames=getattr(img, 'n_frames', 1),
+            )
+    finally:
+        stream.seek(position)
+
+
+class DecodeBudget:
+    """Per-image pixel and frame budgets, plus counters of what they did."""
+
+    def __init__(self, max_pixels=100_000_000, max_full_decode_pixels=50_000_000, max_frames=16):
+        self.max_pixels = max_pixels
+        self.max_full_decode_pixels = max_full_decode_pixels
+        self.max_frames = max_frames
+        self.lock = threading.Lock()
+        self.counters = {'inspected': 0, 'rejected': 0, 'downscaled': 0}
+
+    def record(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def check(self, header):
+        """Validate a header against the budget.
+
+        Returns True if the image must be decoded at reduced scale (counted as
+        downscaled), False if it may be decoded at full size. Raises
+        DecodeBudgetExceeded otherwise.
+        """
+        self.record('inspected')
+        reason = None
+        if header.pixels > self.max_pixels:
+            reason = f"{header.width}x{header.height} image exceeds the {self.max_pixels // 1_000_000}MP limit"
+        elif header.frames > self.max_frames:
+            reason = f"image has {header.frames} frames (limit {self.max_frames})"
+        elif header.pixels > self.max_full_decode_pixels and self.reduction_factor(header) is None:
+            reason = (f"{header.width}x{header.height} {header.format} image exceeds the "
+                      f"{self.max_full_decode_pixels // 1_000_000}MP full-decode limit")
+        if reason:
+            self.record('rejected')
+            logger.warning(f"Decode budget rejected image: {reason}")
+            raise DecodeBudgetExceeded(reason)
+        if header.pixels > self.max_full_decode_pixels:
+            self.record('downscaled')
+            return True
+        return False
+
+    def reduction_factor(self, header):
+        """Smallest JPEG DCT scale-down (2, 4 or 8) that brings the image within the full-decode budget."""
+        if header.format not in REDUCED_DECODE_FORMATS:
+            return None
+        for factor in (2, 4, 8):
+            if header.pixels / (factor * factor) <= self.max_full_decode_pixels:
+                return factor
+        return None
+
+    def check_stream(self, stream):
+        """Inspect and check a seekable stream; returns (header, needs_reduced_decode)."""
+        try:
+            header = inspect_image(stream)
+        except DecodeBudgetExceeded as e:
+            self.record('inspected')
+            self.record('rejected')
+            logger.warning(f"Decode budget rejected image: {e}")
+            raise
+        return header, self.check(header)
+
+    def check_size(self, size, max_bytes):
+        """Reject encoded payloads over max_bytes before they are decoded."""
+        if size > max_bytes:
+            self.record('rejected')
+            raise DecodeBudgetExceeded(f"image is {size} bytes (limit {max_bytes})")
+
+    def open(self, stream):
+        """Open an image for decoding within budget.
+
+        Images under the full-decode budget are returned as opened. Larger
+        ones (JPEG only, see check) have draft() applied so the decoder
+        produces at most max_full_decode_pixels.
+        """
+        header, reduce = self.check_stream(stream)
+        img = open_image(stream)
+        if reduce:
+            factor = self.reduction_factor(header)
+            # draft() picks the largest scale whose output is still at least
+            # the requested size, so ask for exactly 1/factor
+            img.draft(img.mode, (header.width // factor, header.height // factor))
+            logger.info(f"Decoding {header.width}x{header.height} {header.format} at reduced scale {img.size}")
+        return img
+
+    def reset_after_fork(self):
+        self.lock = threading.Lock()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, max_pixels=self.max_pixels,
+                        max_full_decode_pixels=self.max_full_decode_pixels)
@@ -0,0 +1,44 @@
+"""
+Gunicorn configuration for the Taberner Studio backend.
+
+With preload enabled the master imports app_aws once, warms the catalog and
+freezes the garbage collector before forking, so workers share those pages
+copy-on-write instead of each building its own copy. AWS clients, caches and
+the rate limiter are re-created in every worker by app_aws.reinit_after_fork.
+
+Workers use the threaded (gthread) worker class so a slow mockup download or
+Rekognition call only occupies one thread, leaving the others (and /health)
+free to serve requests.
+
+All settings can be overridden with environment variables (see
+aws/environment-variables-reference.md).
+"""
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def when_ready(server):
+    """Warm shared state in the master and freeze it before the first fork."""
+    if not server.cfg.preload_app:
+        return
+    import app_aws
+    app_aws.warm_shared_state()
+    # Collect once, then move every surviving object into the permanent
+    # generation so later collections in the workers never touch (and
+    # therefore never copy) the pages they live on.
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Froze {gc.get_freeze_count()} objects before forking workers")
+
+
+def pre_fork(server, worker):
+    """Freeze anything the master allocated since the last fork."""
+    if server.cfg.preload_app:
+        gc.freeze()
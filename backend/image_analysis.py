@@ -0,0 +1,487 @@
+"""
+Pure image analysis for room photos.
+
+Everything here works on PIL images and NumPy arrays only and has no
+import-time side effects (no AWS clients, no Flask app), so the same
+functions can run on the request thread or inside analysis pool processes.
+"""
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+from palette import extract_palette
+
+logger = logging.getLogger(__name__)
+
+# Longest side of the images each analyzer works on
+COLOR_ANALYSIS_MAX_DIM = 1200
+ROOM_ANALYSIS_MAX_DIM = 800
+COLOR_THUMBNAIL_SIZE = 100
+
+# Resolutions (longest side) the anytime room analysis works through, coarse
+# to full; the first is always computed, whatever the deadline
+ANYTIME_ANALYSIS_DIMS = (128, 256, 512, ROOM_ANALYSIS_MAX_DIM)
+# The texture and edge thresholds are calibrated at ROOM_ANALYSIS_MAX_DIM and
+# drift at coarser scales, so the categories built on them are only reported
+# once a stage of at least this size has run
+ANYTIME_DETAIL_MIN_DIM = 512
+ANYTIME_DETAIL_CATEGORIES = ('texture_complexity', 'architectural_style')
+
+def resize_to_max_dim(img, max_dim, reducing_gap=None):
+    """Downscale an image with LANCZOS so neither side exceeds max_dim.
+    
+    reducing_gap is passed to Image.resize; setting it (e.g. 2.0) box-reduces
+    by an integer factor first, which is much faster for large reductions.
+    """
+    if img.width > max_dim or img.height > max_dim:
+        aspect = img.width / img.height
+        if img.width > img.height:
+            new_width = max_dim
+            new_height = int(max_dim / aspect)
+        else:
+            new_height = max_dim
+            new_width = int(max_dim * aspect)
+        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS, reducing_gap=reducing_gap)
+    return img
+
+def decode_image(image_stream):
+    """Decode an image stream into an RGB PIL image."""
+    return Image.open(image_stream).convert('RGB')
+
+def heif_thumbnail(image_stream, min_dim):
+    """Return the smallest embedded HEIF thumbnail whose longer side is >= min_dim, or None.
+    
+    HEVC has no reduced-resolution decoding, but HEIF files can carry
+    pre-rendered thumbnails that decode in a fraction of the time. Needs a
+    pillow_heif with the info['thumbnails'] / get_thumbnail API; with older
+    releases (or no suitable thumbnail) the caller falls back to a full decode.
+    """
+    try:
+        import pillow_heif
+        image_stream.seek(0)
+        heif_file = pillow_heif.open_heif(image_stream)
+        primary = heif_file[heif_file.primary_index]
+        sizes = primary.info.get('thumbnails') or []
+        candidates = [(size, index) for index, size in enumerate(sizes) if size >= min_dim]
+        if not candidates:
+            return None
+        _, index = min(candidates)
+        return primary.get_thumbnail(index).to_pillow().convert('RGB')
+    except Exception as e:
+        logger.debug(f"No usable HEIF thumbnail: {e}")
+        return None
+    finally:
+        image_stream.seek(0)
+
+def decode_image_reduced(image_stream, min_dim):
+    """Decode an image stream into RGB at the smallest scale whose longer side is still >= min_dim.
+    
+    HEIF images use an embedded thumbnail when one is large enough. JPEGs are
+    decoded straight at 1/2, 1/4 or 1/8 scale with draft(), so a 12MP photo
+    never exists in memory at full size. Other formats (and HEIF without a
+    usable thumbnail) are decoded normally and then shrunk by an integer
+    factor with Image.reduce, which is much cheaper than a LANCZOS resize of
+    the full image.
+    Returns (image, source_size), where source_size is the full-resolution size.
+    """
+    img = Image.open(image_stream)
+    source_size = img.size
+    longest = max(img.size)
+    if img.format == 'HEIF' and longest > min_dim:
+        thumbnail = heif_thumbnail(image_stream, min_dim)
+        if thumbnail is not None:
+            return thumbnail, source_size
+        img = Image.open(image_stream)
+    if img.format == 'JPEG' and longest > min_dim:
+        scale = min_dim / longest
+        img.draft('RGB', (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+    img = img.convert('RGB')
+    factor = max(img.size) // min_dim
+    if factor > 1:
+        img = img.reduce(factor)
+    return img, source_size
+
+class AnalysisContext:
+    """A single decode of a room photo, shared by every analyzer.
+
+    The image is decoded once at a reduced scale (just large enough for the
+    biggest consumer, base_dim) and the resolutions the analyzers need are
+    derived from it on first use and then reused.
+    """
+    
+    def __init__(self, image, source_size=None):
+        self.image = image
+        self.source_size = source_size or image.size
+        self._room_image = None
+        self._room_array = None
+        self._color_pixels = None
+    
+    @classmethod
+    def from_stream(cls, image_stream, base_dim=COLOR_ANALYSIS_MAX_DIM):
+        """Decode image_stream once; base_dim is the largest size any consumer needs."""
+        return cls(*decode_image_reduced(image_stream, base_dim))
+    
+    @property
+    def room_image(self):
+        """The image downscaled to ROOM_ANALYSIS_MAX_DIM for room analysis."""
+        if self._room_image is None:
+            self._room_image = resize_to_max_dim(self.image, ROOM_ANALYSIS_MAX_DIM)
+        return self._room_image
+    
+    @property
+    def room_array(self):
+        """RGB array used for room analysis."""
+        if self._room_array is None:
+            self._room_array = np.array(self.room_image)
+        return self._room_array
+    
+    @property
+    def color_pixels(self):
+        """Small RGB array used for color extraction (and perceptual hashing)."""
+        if self._color_pixels is None:
+            small = self.room_image.copy()  # thumbnail() works in place
+            small.thumbnail((COLOR_THUMBNAIL_SIZE, COLOR_THUMBNAIL_SIZE))
+            self._color_pixels = np.array(small)
+        return self._color_pixels
+
+def color_thumbnail_from_image(img):
+    """Build the small RGB array used for color extraction from a decoded image."""
+    return AnalysisContext(img).color_pixels
+
+def room_array_from_image(img):
+    """Build the RGB array used for room analysis from a decoded image."""
+    return AnalysisContext(img).room_array
+
+def load_color_thumbnail(image_stream):
+    """Decode an image stream into the small RGB array used for color extraction."""
+    return AnalysisContext.from_stream(image_stream).color_pixels
+
+def load_room_array(image_stream):
+    """Decode an image stream into the RGB array used for room analysis."""
+    # Reset stream position
+    image_stream.seek(0)
+    return AnalysisContext.from_stream(image_stream).room_array
+
+def dominant_colors_from_pixels(pixels, n_colors=5, color_space='rgb'):
+    """Return [{'color', 'percentage'}] for the dominant colors of RGB pixels, sorted by share."""
+    return extract_palette(pixels, n_colors, color_space)
+
+@dataclass(frozen=True)
+class RoomFeatures:
+    """Numeric features of a room photo, computed in one pass by room_features."""
+    width: int
+    height: int
+    mean_rgb: tuple             # per-channel mean, 0-255
+    saturation: float           # mean HSV saturation, 0-1
+    brightness: float           # mean luminance, 0-1
+    contrast: float             # luminance standard deviation, 0-1
+    texture_score: float        # mean Sobel gradient magnitude
+    horizontal_edges: float     # sum of |row-to-row luminance differences|
+    vertical_edges: float       # sum of |column-to-column luminance differences|
+    
+    @property
+    def aspect_ratio(self):
+        return self.width / self.height
+    
+    @property
+    def edge_ratio(self):
+        return self.horizontal_edges / (self.vertical_edges + 1)
+
+def _sobel_from_differences(diff, axis):
+    """Sobel response along axis, built from the forward differences along that axis.
+    
+    Matches scipy.ndimage.sobel with its default 'reflect' boundary: the
+    central difference is the sum of two neighbouring forward differences,
+    then it is smoothed with [1, 2, 1] across the other axis.
+    """
+    diff = np.moveaxis(diff, axis, 0)
+    central = np.empty((diff.shape[0] + 1,) + diff.shape[1:], dtype=np.float32)
+    central[0] = diff[0]
+    np.add(diff[:-1], diff[1:], out=central[1:-1])
+    central[-1] = diff[-1]
+    
+    smoothed = central * 2
+    smoothed[:, 1:] += central[:, :-1]
+    smoothed[:, :-1] += central[:, 1:]
+    smoothed[:, 0] += central[:, 0]
+    smoothed[:, -1] += central[:, -1]
+    return np.moveaxis(smoothed, 0, axis)
+
+def room_features(img_array):
+    """Compute every numeric room feature from an RGB array in a single pass.
+    
+    Luminance is computed once, in float32, and the row/column differences
+    used for the directional edge sums are reused to build the Sobel gradients.
+    """
+    height, width = img_array.shape[:2]
+    mean_rgb = tuple(float(v) for v in img_array.reshape(-1, 3).mean(axis=0))
+    
+    # HSV saturation is (max - min) / max per pixel (0 for black pixels)
+    channel_max = img_array.max(axis=2)
+    chroma = np.subtract(channel_max, img_array.min(axis=2), dtype=np.float32)
+    np.divide(chroma, channel_max, out=chroma, where=channel_max > 0)
+    saturation = float(chroma.mean(dtype=np.float64))
+    del channel_max, chroma
+    
+    gray = np.add.reduce(img_array, axis=2, dtype=np.float32)
+    gray *= np.float32(1 / 3)
+    brightness = float(gray.mean(dtype=np.float64)) / 255.0
+    contrast = float(gray.std(dtype=np.float64)) / 255.0
+    
+    row_diff = np.diff(gray, axis=0)
+    col_diff = np.diff(gray, axis=1)
+    del gray
+    horizontal_edges = float(np.abs(row_diff).sum(dtype=np.float64))
+    vertical_edges = float(np.abs(col_diff).sum(dtype=np.float64))
+    
+    texture_score = 0.0
+    if height > 1 and width > 1:
+        # Free each difference array as soon as its gradient is built
+        gradient = _sobel_from_differences(col_diff, 1)
+        del col_diff
+        np.hypot(gradient, _sobel_from_differences(row_diff, 0), out=gradient)
+        del row_diff
+        texture_score = float(gradient.mean(dtype=np.float64))
+    
+    return RoomFeatures(
+        width=width,
+        height=height,
+        mean_rgb=mean_rgb,
+        saturation=saturation,
+        brightness=brightness,
+        contrast=contrast,
+        texture_score=texture_score,
+        horizontal_edges=horizontal_edges,
+        vertical_edges=vertical_edges,
+    )
+
+def classify_room(features):
+    """Turn room features into the categorical room analysis."""
+    return {
+        'brightness': analyze_brightness(features),
+        'color_palette': analyze_color_palette(features),
+        'contrast': analyze_contrast(features),
+        'texture_complexity': analyze_texture_complexity(features),
+        'architectural_style': detect_architectural_style(features),
+        'room_type': detect_room_type(features)
+    }
+
+def analyze_room_array(img_array):
+    """Run every room analyzer on an RGB array and derive art recommendations."""
+    # Analyze various characteristics
+    room_analysis = classify_room(room_features(img_array))
+    
+    # Determine appropriate art characteristics
+    art_recommendations = determine_art_characteristics(room_analysis)
+    
+    return {
+        'room_analysis': room_analysis,
+        'recommended_art_characteristics': art_recommendations
+    }
+
+def analyze_room_array_anytime(img_array, deadline=None, dims=ANYTIME_ANALYSIS_DIMS):
+    """Room analysis that refines from coarse to full resolution until a deadline.
+    
+    The features are first computed on a copy of img_array downscaled to
+    dims[0]. After each stage the analysis moves to the largest remaining
+    size whose predicted cost (the last stage's time scaled by pixel count)
+    still fits before deadline, a time.monotonic() timestamp, and stops when
+    none does; with no deadline it goes straight to full resolution. The
+    result is that of analyze_room_array for the finest stage reached, plus
+    an 'analysis_timing' entry with the time spent on every stage. Coarse
+    stages track the full-resolution analysis closely for brightness,
+    contrast and color; the texture and edge based categories
+    (ANYTIME_DETAIL_CATEGORIES) are None, and listed as 'omitted' in the
+    timing, when the analysis stopped below ANYTIME_DETAIL_MIN_DIM.
+    """
+    start = time.monotonic()
+    source = Image.fromarray(img_array)
+    longest = max(img_array.shape[:2])
+    # Never upscale: stop at the array's own size
+    remaining = [dim for dim in dims if dim < longest] + [longest]
+    
+    stages = []
+    features = None
+    dim = remaining[0]
+    while dim is not None:
+        remaining = [d for d in remaining if d > dim]
+        stage_start = time.monotonic()
+        stage_array = img_array if dim == longest else np.asarray(resize_to_max_dim(source, dim, reducing_gap=2.0))
+        resized = time.monotonic()
+        features = room_features(stage_array)
+        done = time.monotonic()
+        stages.append({
+            'dim': dim,
+            'resize_ms': round((resized - stage_start) * 1000, 2),
+            'features_ms': round((done - resized) * 1000, 2)
+        })
+        
+        stage_seconds = done - stage_start
+        dim = None
+        for candidate in reversed(remaining):
+            predicted = stage_seconds * (candidate / stages[-1]['dim']) ** 2
+            if deadline is None or time.monotonic() + predicted <= deadline:
+                dim = candidate
+                break
+    
+    room_analysis = classify_room(features)
+    complete = stages[-1]['dim'] == longest
+    omitted = []
+    if not complete:
+        logger.info(f"Room analysis stopped at {stages[-1]['dim']}px to meet its deadline")
+        if stages[-1]['dim'] < ANYTIME_DETAIL_MIN_DIM:
+            omitted = list(ANYTIME_DETAIL_CATEGORIES)
+            room_analysis.update(dict.fromkeys(omitted))
+    return {
+        'room_analysis': room_analysis,
+        'recommended_art_characteristics': determine_art_characteristics(room_analysis),
+        'analysis_timing': {
+            'resolution': stages[-1]['dim'],
+            'complete': complete,
+            'omitted': omitted,
+            'stages': stages,
+            'total_ms': round((time.monotonic() - start) * 1000, 2)
+        }
+    }
+
+def analyze_brightness(features):
+    """Analyze overall brightness of the room."""
+    if features.brightness > 0.7:
+        return 'bright'
+    elif features.brightness > 0.4:
+        return 'medium'
+    else:
+        return 'dark'
+
+def analyze_color_palette(features):
+    """Analyze the room's color palette characteristics."""
+    # Calculate color temperature (warm vs cool)
+    red_channel, _, blue_channel = features.mean_rgb
+    color_temp = 'warm' if red_channel > blue_channel else 'cool'
+    
+    if features.saturation > 0.3:
+        saturation_level = 'vibrant'
+    elif features.saturation > 0.15:
+        saturation_level = 'moderate'
+    else:
+        saturation_level = 'muted'
+    
+    return {
+        'saturation': saturation_level,
+        'temperature': color_temp
+    }
+
+def analyze_contrast(features):
+    """Analyze contrast levels in the room."""
+    if features.contrast > 0.15:
+        return 'high'
+    elif features.contrast > 0.08:
+        return 'medium'
+    else:
+        return 'low'
+
+def analyze_texture_complexity(features):
+    """Analyze texture complexity from the mean Sobel edge magnitude."""
+    if features.texture_score > 30:
+        return 'complex'
+    elif features.texture_score > 15:
+        return 'moderate'
+    else:
+        return 'simple'
+
+def detect_architectural_style(features):
+    """Detect architectural style based on visual cues."""
+    # This is a simplified heuristic-based approach
+    # In a production system, you might use a trained ML model
+    
+    # Line patterns (horizontal/vertical dominance) and overall brightness
+    if features.brightness > 0.7 and features.edge_ratio > 1.2:
+        return 'modern'
+    elif features.brightness < 0.4:
+        return 'traditional'
+    elif features.edge_ratio < 0.8:
+        return 'rustic'
+    else:
+        return 'contemporary'
+
+def detect_room_type(features):
+    """Detect room type based on visual characteristics."""
+    # Simplified heuristic approach
+    # In production, this could use object detection to identify furniture
+    red, green, blue = features.mean_rgb
+    
+    # Simple heuristics
+    if features.aspect_ratio > 1.5:
+        return 'living_room'  # Often wider spaces
+    elif red > green and red > blue:
+        return 'bedroom'  # Often warmer tones
+    else:
+        return 'general'
+
+def determine_art_characteristics(room_analysis):
+    """Determine appropriate art characteristics based on room analysis."""
+    recommendations = {
+        'preferred_styles': [],
+        'preferred_subjects': [],
+        'size_recommendation': 'medium',
+        'color_guidance': '',
+        'reasoning': []
+    }
+    
+    brightness = room_analysis['brightness']
+    color_palette = room_analysis['color_palette']
+    contrast = room_analysis['contrast']
+    texture = room_analysis['texture_complexity']
+    arch_style = room_analysis['architectural_style']
+    room_type = room_analysis['room_type']
+    
+    # Style recommendations based on architectural style
+    if arch_style == 'modern':
+        recommendations['preferred_styles'].extend(['Contemporary', 'Abstract', 'Minimalist'])
+        recommendations['preferred_subjects'].extend(['Abstract', 'Geometric', 'Cityscape'])
+        recommendations['reasoning'].append("Modern architecture pairs well with contemporary and abstract art")
+    elif arch_style == 'traditional':
+        recommendations['preferred_styles'].extend(['Classical', 'Realistic', 'Impressionist'])
+        recommendations['preferred_subjects'].extend(['Landscape', 'Portrait', 'Still Life'])
+        recommendations['reasoning'].append("Traditional spaces complement classical and realistic art styles")
+    elif arch_style == 'rustic':
+        recommendations['preferred_styles'].extend(['Folk', 'Landscape', 'Nature'])
+        recommendations['preferred_subjects'].extend(['Landscape', 'Nature', 'Animal'])
+        recommendations['reasoning'].append("Rustic environments work well with nature-inspired art")
+    elif arch_style == 'contemporary':
+        recommendations['preferred_styles'].extend(['Contemporary', 'Mixed Media'])
+        recommendations['preferred_subjects'].extend(['Abstract', 'Landscape', 'Portrait'])
+        recommendations['reasoning'].append("Contemporary spaces allow for diverse art styles")
+    
+    # Adjust based on brightness
+    if brightness == 'dark':
+        recommendations['color_guidance'] = 'Consider brighter, more vibrant pieces to add energy'
+        recommendations['reasoning'].append("Darker rooms benefit from brighter artwork")
+    elif brightness == 'bright':
+        recommendations['color_guidance'] = 'Subtle or bold pieces both work well'
+        recommendations['reasoning'].append("Bright rooms provide flexibility in color choices")
+    
+    # Adjust based on color palette
+    if color_palette['saturation'] == 'muted':
+        recommendations['reasoning'].append("Muted room colors allow for more vibrant art")
+    elif color_palette['saturation'] == 'vibrant':
+        recommendations['reasoning'].append("Vibrant room colors pair well with complementary or neutral art")
+    
+    # Room type specific recommendations
+    if room_type == 'bedroom':
+        recommendations['preferred_subjects'].extend(['Landscape', 'Abstract', 'Nature'])
+        recommendations['reasoning'].append("Bedrooms benefit from calming subjects")
+    elif room_type == 'living_room':
+        recommendations['preferred_subjects'].extend(['Landscape', 'Abstract', 'Portrait'])
+        recommendations['size_recommendation'] = 'large'
+        recommendations['reasoning'].append("Living rooms can accommodate larger statement pieces")
+    
+    # Remove duplicates
+    recommendations['preferred_styles'] = list(set(recommendations['preferred_styles']))
+    recommendations['preferred_subjects'] = list(set(recommendations['preferred_subjects']))
+    
+    return recommendations
@@ -0,0 +1,305 @@
+"""
+Frames, mats and drop shadows for mockups.
+
+A bare paste looks like a sticker on the wall. A frame style adds a soft
+drop shadow under the piece and, optionally, a frame (solid or wood grain,
+shaded as if lit from the top left) and a mat around the artwork. The
+artwork's placement box stays the same; the frame and mat take up its
+outer edge and the artwork shrinks to the window inside them, so framing
+never changes a layout.
+
+Everything expensive is computed once and cached: Gaussian kernels, frame
+textures per style, the blurred 1-D shadow profiles (a blurred rectangle is
+separable, so its mask is the outer product of two profiles, which costs
+less than keeping and rescaling a 2-D mask) and the frame-and-mat sprites.
+Sprites are drawn at the piece's SIZE_BUCKET-rounded size and stretched
+along their bands to the exact piece (corners untouched), so pieces of
+similar size share one. Profiles and sprites share a cache
+bounded by total size in bytes, and pieces larger than MAX_CACHED_SIDE
+(beyond any preview) are built per request instead of filling it.
+Applying an effect is then a NumPy multiply (shadow) and a copy of the
+border bands (frame) over the piece's own region of the mockup.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+# Shadow blur radius and offset (right, down), as fractions of the piece's shorter side
+SHADOW_BLUR = 0.035
+SHADOW_OFFSET = (0.01, 0.025)
+SHADOW_OPACITY = 0.45
+# Blur radii are snapped to multiples of this many pixels, so pieces of similar size share a kernel
+SHADOW_RADIUS_STEP = 2
+
+TEXTURE_SIZE = 512
+# Sprites are cached per piece size rounded to this many pixels
+SIZE_BUCKET = 32
+# Longest piece side whose profiles and sprites are cached (the preview tier's max_dim)
+MAX_CACHED_SIDE = 1280
+# Brightness of each side of the frame: top, left, bottom, right
+FRAME_SHADING = (1.12, 1.04, 0.78, 0.9)
+# How far the frame darkens the mat below and beside it, as a fraction of the mat width
+MAT_SHADOW_FRACTION = 0.12
+
+
+@dataclass(frozen=True)
+class FrameStyle:
+    """How a piece is presented on the wall."""
+    name: str
+    # Frame color; None for no frame
+    frame_color: tuple = None
+    # Strength of the wood grain in the frame texture (0 for a solid color)
+    grain: float = 0.0
+    # Frame and mat widths as fractions of the piece's shorter side
+    frame_fraction: float = 0.0
+    mat_fraction: float = 0.0
+    mat_color: tuple = (244, 242, 236)
+    shadow: bool = True
+
+
+FRAME_STYLES = {
+    'shadow': FrameStyle(name='shadow'),
+    'black': FrameStyle(name='black', frame_color=(28, 28, 30), frame_fraction=0.04),
+    'white': FrameStyle(name='white', frame_color=(238, 236, 232), frame_fraction=0.04),
+    'oak': FrameStyle(name='oak', frame_color=(176, 132, 86), grain=0.14, frame_fraction=0.05),
+    'black-mat': FrameStyle(name='black-mat', frame_color=(28, 28, 30), frame_fraction=0.035, mat_fraction=0.1),
+    'oak-mat': FrameStyle(name='oak-mat', frame_color=(176, 132, 86), grain=0.14, frame_fraction=0.045,
+                          mat_fraction=0.1),
+}
+# A request without a frame (or with 'none') gets the plain paste
+NO_FRAME = 'none'
+
+
+def border_widths(style, width, height):
+    """(frame, mat) widths in pixels for a piece of width x height."""
+    short_side = min(width, height)
+    frame_px = max(1, round(short_side * style.frame_fraction)) if style.frame_color else 0
+    mat_px = round(short_side * style.mat_fraction)
+    return frame_px, mat_px
+
+
+class EffectCache:
+    """Shadow profiles and frame sprites (read-only arrays), bounded by total size in bytes, least recently used first."""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # key -> array
+        self.entries = OrderedDict()
+        self.used = 0
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key, build):
+        """Return the cached array for key, building (and caching) it with build() on a miss."""
+        with self.lock:
+            array = self.entries.get(key)
+            if array is not None:
+                self.entries.move_to_end(key)
+                self.counters['hits'] += 1
+                return array
+            self.counters['misses'] += 1
+        array = build()
+        array.flags.writeable = False  # Shared by every request
+        if array.nbytes > self.max_bytes:
+            return array
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.used -= previous.nbytes
+            self.entries[key] = array
+            self.used += array.nbytes
+            while self.used > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.used -= evicted.nbytes
+                self.counters['evictions'] += 1
+        return array
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.used = 0
+
+    def reset_after_fork(self):
+        self.lock = threading.Lock()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries), used=self.used, max_bytes=self.max_bytes)
+
+
+effect_cache = EffectCache()
+
+
+def configure_cache(max_bytes):
+    """Set the size of the profile and sprite cache."""
+    effect_cache.max_bytes = max_bytes
+    effect_cache.clear()
+
+
+def size_bucket(length):
+    return max(SIZE_BUCKET, round(length / SIZE_BUCKET) * SIZE_BUCKET)
+
+
+# --- Shadows ---
+
+@lru_cache(maxsize=64)
+def _gaussian_kernel(radius):
+    x = np.arange(-radius, radius + 1, dtype=np.float32)
+    kernel = np.exp(-0.5 * (x / (radius / 2.0)) ** 2)
+    return kernel / kernel.sum()
+
+
+def _build_shadow_profile(length, radius):
+    return np.convolve(np.pad(np.ones(length, np.float32), radius), _gaussian_kernel(radius), mode='same')
+
+
+def shadow_profile(length, radius):
+    """A run of length pixels blurred with a Gaussian of radius, padded by radius on both sides."""
+    if length > MAX_CACHED_SIDE:
+        return _build_shadow_profile(length, radius)
+    return effect_cache.get(('shadow', length, radius), lambda: _build_shadow_profile(length, radius))
+
+
+def shadow_shade(width, height, radius):
+    """Per-pixel brightness multiplier of the shadow of a width x height piece, padded by radius."""
+    mask = np.outer(shadow_profile(height, radius), shadow_profile(width, radius))
+    shade = 1.0 - SHADOW_OPACITY * mask
+    return shade[:, :, None]
+
+
+def cast_shadow(image, box, style):
+    """Darken the wall under and around a piece at box (left, top, width, height), in place."""
+    if not style.shadow:
+        return
+    left, top, width, height = box
+    short_side = min(width, height)
+    radius = max(SHADOW_RADIUS_STEP, round(short_side * SHADOW_BLUR / SHADOW_RADIUS_STEP) * SHADOW_RADIUS_STEP)
+    shade = shadow_shade(width, height, radius)
+    origin = (left + round(short_side * SHADOW_OFFSET[0]) - radius, top + round(short_side * SHADOW_OFFSET[1]) - radius)
+    # Cropping past the edge pads with black and pasting back clips it, so pieces may hang off the photo
+    region = np.asarray(image.crop((*origin, origin[0] + shade.shape[1], origin[1] + shade.shape[0])), dtype=np.float32)
+    region[..., :3] *= shade
+    image.paste(Image.fromarray(region.astype(np.uint8)), origin)
+
+
+# --- Frames and mats ---
+
+@lru_cache(maxsize=8)
+def frame_texture(name):
+    """TEXTURE_SIZE square RGB texture of a style's frame, with any grain running along the rows."""
+    style = FRAME_STYLES[name]
+    color = np.array(style.frame_color, dtype=np.float32)
+    if not style.grain:
+        return np.broadcast_to(color, (TEXTURE_SIZE, TEXTURE_SIZE, 3))
+    rng = np.random.default_rng(sum(map(ord, name)))
+    across = np.arange(TEXTURE_SIZE, dtype=np.float32)[:, None]
+    along = np.arange(TEXTURE_SIZE, dtype=np.float32)[None, :]
+    # Wavy growth rings across the rail, with some smoothed per-line variation
+    rings = np.sin(2 * np.pi * (across + 3.0 * np.sin(along / 45.0)) / 7.0)
+    lines = np.convolve(rng.normal(size=TEXTURE_SIZE + 7), np.ones(8) / 8, mode='valid')[:, None]
+    brightness = 1.0 + style.grain * (0.6 * rings + 0.8 * lines) / 1.4
+    return np.clip(color * brightness[:, :, None], 0, 255).astype(np.float32)
+
+
+def _build_frame_sprite(name, width, height):
+    """Frame and mat of a width x height piece, as an RGB uint8 array (the window inside them is left black)."""
+    style = FRAME_STYLES[name]
+    frame_px, mat_px = border_widths(style, width, height)
+    inset = frame_px + mat_px
+    # Coordinates of the border pixels only: full top and bottom bands, then the sides between them
+    rows, columns = np.arange(height), np.arange(width)
+    bands = [(rows[:inset], columns), (rows[height - inset:], columns),
+             (rows[inset:height - inset], columns[:inset]), (rows[inset:height - inset], columns[width - inset:])]
+    y, x = (np.concatenate(coords) for coords in zip(*(
+        [axis.ravel() for axis in np.meshgrid(band_rows, band_columns, indexing='ij')] for band_rows, band_columns in bands)))
+    # Distance to each outer edge; the nearest decides which side a pixel belongs to (mitred corners)
+    edges = np.stack([y, x, height - 1 - y, width - 1 - x])
+    side = edges.argmin(axis=0)
+    depth = edges.min(axis=0)
+
+    colors = np.empty((len(y), 3), dtype=np.float32)
+    in_frame = depth < frame_px
+    if frame_px:
+        # Grain runs along each rail: rows along top and bottom, columns along the sides
+        along = np.where(side % 2 == 0, x, y)[in_frame] % TEXTURE_SIZE
+        texture = frame_texture(name)[depth[in_frame] % TEXTURE_SIZE, along]
+        colors[in_frame] = texture * np.array(FRAME_SHADING, dtype=np.float32)[side[in_frame], None]
+    if mat_px:
+        # The frame's inner edge shades the top and left of the mat
+        in_mat = ~in_frame
+        ramp = max(1.0, mat_px * MAT_SHADOW_FRACTION)
+        darkening = 0.2 * np.clip(1 - (depth[in_mat] - frame_px) / ramp, 0, 1) * (side[in_mat] <= 1)
+        colors[in_mat] = np.array(style.mat_color, dtype=np.float32) * (1 - darkening)[:, None]
+    sprite = np.zeros((height, width, 3), dtype=np.uint8)
+    sprite[y, x] = np.clip(colors, 0, 255)
+    return sprite
+
+
+def sprite_size(width, height):
+    """Size of the sprite drawn for a width x height piece: its SIZE_BUCKET-rounded size, or its own if too large to cache."""
+    if max(width, height) > MAX_CACHED_SIDE:
+        return width, height
+    return size_bucket(width), size_bucket(height)
+
+
+def frame_sprite(name, width, height):
+    """Frame and mat of a width x height piece (see _build_frame_sprite), cached up to MAX_CACHED_SIDE."""
+    if max(width, height) > MAX_CACHED_SIDE:
+        return _build_frame_sprite(name, width, height)
+    return effect_cache.get(('frame', name, width, height), lambda: _build_frame_sprite(name, width, height))
+
+
+def _stretch(length, sprite_length, inset):
+    """Index into a sprite side of sprite_length for each of length pixels.
+
+    The inset-wide ends (the corners) map one to one and the run between
+    them is scaled nearest-neighbour, so frame and mat keep their width.
+    """
+    index = np.empty(length, dtype=np.intp)
+    index[:inset] = np.arange(inset)
+    index[length - inset:] = np.arange(sprite_length - inset, sprite_length)
+    middle, sprite_middle = length - 2 * inset, sprite_length - 2 * inset
+    index[inset:length - inset] = inset + ((np.arange(middle) + 0.5) * (sprite_middle / middle)).astype(np.intp)
+    return index
+
+
+def draw_frame(image, box, style):
+    """Draw the style's frame and mat into box (left, top, width, height) in place; returns the artwork's window box.
+
+    Frame and mat widths follow the sprite's (bucketed) size, so every piece
+    drawn from one sprite has the same border.
+    """
+    left, top, width, height = box
+    sprite_width, sprite_height = sprite_size(width, height)
+    frame_px, mat_px = border_widths(style, sprite_width, sprite_height)
+    inset = frame_px + mat_px
+    if not inset or width <= 4 * inset or height <= 4 * inset:
+        return box  # Unframed, or too small for a frame to read
+    sprite = frame_sprite(style.name, sprite_width, sprite_height)
+    rows, columns = _stretch(height, sprite_height, inset), _stretch(width, sprite_width, inset)
+    region = np.array(image.crop((left, top, left + width, top + height)))
+    # The border is a band inset pixels wide: copy its four sides, leaving the window as it is
+    for band_rows, band_columns in ((np.s_[:inset], np.s_[:]), (np.s_[-inset:], np.s_[:]),
+                                    (np.s_[inset:-inset], np.s_[:inset]), (np.s_[inset:-inset], np.s_[-inset:])):
+        region[band_rows, band_columns, :3] = sprite[np.ix_(rows[band_rows], columns[band_columns])]
+    image.paste(Image.fromarray(region), (left, top))
+    return left + inset, top + inset, width - 2 * inset, height - 2 * inset
+
+
+def clear_caches():
+    """Drop the cached kernels, textures, profiles and sprites."""
+    for cached in (_gaussian_kernel, frame_texture):
+        cached.cache_clear()
+    effect_cache.clear()
+
+
+def reset_after_fork():
+    effect_cache.reset_after_fork()
+
+
+def cache_stats():
+    return {'effects': effect_cache.stats(), 'frame_textures': frame_texture.cache_info()._asdict()}
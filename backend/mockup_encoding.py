@@ -0,0 +1,205 @@
+"""
+Output encoding for rendered mockups.
+
+The JSON mockup route returns a quality-100, 4:4:4 JPEG wrapped in a base64
+data URL, which is several MB for a phone-sized room photo. The binary route
+picks a format the client accepts (AVIF, WebP or JPEG, from the Accept
+header) and an encoder profile per use: 'preview' is downscaled and tuned
+for encode speed, 'download' keeps full size and higher quality. The image is
+encoded on a helper thread and handed to the response in chunks as the
+encoder produces them, so the first bytes go out before encoding finishes
+(for baseline JPEG, which libjpeg writes out as it goes). A streamed result
+that goes into the render cache is still collected whole as it passes
+(see RenderCache.iter_and_store), briefly taking about twice its encoded
+size when the chunks are joined.
+"""
+import hashlib
+import queue
+import threading
+from dataclasses import dataclass, field
+
+from PIL import Image, features
+
+ENCODE_CHUNK_SIZE = 64 * 1024
+
+# Range of client-requested output widths (pixels)
+MIN_WIDTH = 16
+MAX_WIDTH = 8192
+
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+PIL_FORMATS = {'avif': 'AVIF', 'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+
+@dataclass(frozen=True)
+class MockupProfile:
+    """Encoder settings for one use of a mockup."""
+    name: str
+    # Longest side of the output (None keeps the room photo's size)
+    max_dim: int = None
+    # Formats in order of preference when the client accepts several
+    formats: tuple = ('webp', 'avif', 'jpeg')
+    # Per-format encoder options. JPEG stays baseline (no progressive or
+    # optimize), the mode in which libjpeg writes output as it goes
+    params: dict = field(default_factory=dict)
+
+
+PROFILES = {
+    'preview': MockupProfile(
+        name='preview',
+        max_dim=1280,
+        formats=('webp', 'avif', 'jpeg'),
+        params={
+            'jpeg': {'quality': 82, 'subsampling': '4:2:0'},
+            'webp': {'quality': 80, 'method': 4},
+            'avif': {'quality': 60, 'speed': 8},
+        },
+    ),
+    'download': MockupProfile(
+        name='download',
+        # Full-size WebP/AVIF take seconds to encode (JPEG ~0.1s at 12MP) and
+        # JPEG is what people expect to save, so those are only used on request
+        formats=('jpeg', 'webp', 'avif'),
+        params={
+            'jpeg': {'quality': 92, 'subsampling': '4:4:4'},
+            'webp': {'quality': 90, 'method': 4},
+            'avif': {'quality': 80, 'speed': 8},
+        },
+    ),
+}
+DEFAULT_PROFILE = 'preview'
+
+
+def available_formats():
+    """Output formats this Pillow build can encode (JPEG always)."""
+    formats = {'jpeg'}
+    for name in ('webp', 'avif'):
+        if features.check(name):
+            formats.add(name)
+    return formats
+
+
+def negotiate_format(accept, profile, requested=None, available=None):
+    """Choose an output format for a client.
+
+    accept is the request's parsed Accept header (werkzeug MIMEAccept). AVIF
+    and WebP count as accepted only when the client names them explicitly
+    with a non-zero quality, so a bare */* gets JPEG; JPEG is always
+    acceptable. requested, if it names an available format, wins over
+    negotiation.
+    """
+    available = available_formats() if available is None else available
+    if requested in available:
+        return requested
+    accepted = {value.lower() for value, quality in accept if quality > 0}
+    for name in profile.formats:
+        if name == 'jpeg' or (name in available and MIME_TYPES[name] in accepted):
+            return name
+    return 'jpeg'
+
+
+def output_size(size, profile, width=None):
+    """Size of a mockup of a room of size: capped at the profile's max_dim and at width, never enlarged."""
+    scale = 1.0
+    if profile.max_dim:
+        scale = min(scale, profile.max_dim / max(size))
+    if width:
+        scale = min(scale, width / size[0])
+    if scale >= 1.0:
+        return tuple(size)
+    return (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+
+
+def prepare_image(image, profile, width=None):
+    """Downscale to the profile's max_dim (and width) and convert to a mode every encoder takes."""
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    size = output_size(image.size, profile, width)
+    if size != image.size:
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return image
+
+
+def render_key(*parts):
+    """Stable hex digest identifying a rendering from its inputs (used as the ETag)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:32]
+
+
+class EncodeCancelled(Exception):
+    """Raised inside the encoder when the response consumer has gone away."""
+
+
+class _ChunkWriter:
+    """File-like sink that batches encoder output into chunks on a bounded queue."""
+
+    def __init__(self, chunks, cancelled, chunk_size):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        chunk, self.buffer = bytes(self.buffer), bytearray()
+        # Block while the consumer is behind, but give up once it has gone
+        while True:
+            if self.cancelled.is_set():
+                raise EncodeCancelled()
+            try:
+                self.chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+_DONE = object()
+
+
+def iter_encoded(image, fmt, params, chunk_size=ENCODE_CHUNK_SIZE):
+    """Encode image as fmt on a helper thread, yielding the bytes in chunks as they are produced.
+
+    Encoder errors are re-raised from the generator. Closing the generator
+    early (the client disconnected) stops the encoder at its next write.
+    """
+    chunks = queue.Queue(maxsize=4)
+    cancelled = threading.Event()
+
+    def encode():
+        writer = _ChunkWriter(chunks, cancelled, chunk_size)
+        try:
+            image.save(writer, format=PIL_FORMATS[fmt], **params)
+            writer.flush()
+            result = _DONE
+        except EncodeCancelled:
+            return
+        except Exception as e:
+            result = e
+        while not cancelled.is_set():
+            try:
+                chunks.put(result, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    thread = threading.Thread(target=encode, name='mockup-encode', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
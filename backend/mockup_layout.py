@@ -0,0 +1,149 @@
+"""
+Placement geometry for mockups.
+
+Where an artwork goes and how big it is are computed once, in pixels of the
+room photo at its full resolution (the reference size), and then scaled to
+whatever size the mockup is actually rendered at. A screen-sized preview
+composited from a downscaled room therefore shows the artwork at exactly the
+same relative size and position as the full-resolution download. Gallery
+walls (several artworks arranged as a grid, a salon hang or a row) are laid
+out the same way, as one block of boxes computed with NumPy.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+# Artworks are sized to at most this fraction of the room's width (landscape
+# artworks) or height (portrait artworks), and never enlarged
+ARTWORK_MAX_FRACTION = 0.3
+
+
+@dataclass(frozen=True)
+class Placement:
+    """An artwork's box in pixels of a room of reference_size."""
+    left: int
+    top: int
+    width: int
+    height: int
+    reference_size: tuple
+
+    def scaled(self, size):
+        """(left, top, width, height) of the box in a rendering of the room at size."""
+        if tuple(size) == tuple(self.reference_size):
+            return self.left, self.top, self.width, self.height
+        scale_x = size[0] / self.reference_size[0]
+        scale_y = size[1] / self.reference_size[1]
+        return (round(self.left * scale_x), round(self.top * scale_y),
+                max(1, round(self.width * scale_x)), max(1, round(self.height * scale_y)))
+
+
+def place_artwork(room_size, artwork_size, position, max_fraction=ARTWORK_MAX_FRACTION):
+    """Place an artwork centered on position (x/y percentages of the room, default 50) in a room of room_size."""
+    room_width, room_height = room_size
+    artwork_width, artwork_height = artwork_size
+    artwork_ratio = artwork_width / artwork_height
+    if artwork_ratio > 1:  # Landscape
+        width = min(int(room_width * max_fraction), artwork_width)
+        height = int(width / artwork_ratio)
+    else:  # Portrait
+        height = min(int(room_height * max_fraction), artwork_height)
+        width = int(height * artwork_ratio)
+    x_percent = position.get('x', 50) / 100.0
+    y_percent = position.get('y', 50) / 100.0
+    left = int((room_width * x_percent) - (width / 2))
+    top = int((room_height * y_percent) - (height / 2))
+    return Placement(left, top, width, height, tuple(room_size))
+
+
+# --- Gallery walls ---
+
+GALLERY_LAYOUTS = ('grid', 'salon', 'row')
+GALLERY_MAX_PIECES = 12
+# The arrangement fits in this fraction of the room's width and height
+GALLERY_MAX_FRACTION = (0.6, 0.45)
+# Space between pieces, as a fraction of the (largest) piece height
+GALLERY_GAP_FRACTION = 0.08
+# Relative heights cycled through the pieces of a salon hang
+SALON_HEIGHTS = (1.0, 0.68, 0.84, 0.6, 0.92)
+
+
+def _row_boxes(aspects, heights, gap):
+    """Pack pieces left to right, vertically centered on a common midline; returns (n, 4) [x, y, w, h] from (0, 0)."""
+    widths = aspects * heights
+    lefts = np.concatenate(([0.0], np.cumsum(widths[:-1] + gap)))
+    tops = (heights.max() - heights) / 2
+    return np.stack([lefts, tops, widths, heights], axis=1)
+
+
+def _grid_boxes(aspects, gap):
+    """Uniform cells in a near-square grid, each piece fitted and centered in its cell."""
+    n = len(aspects)
+    cols = int(np.ceil(np.sqrt(n)))
+    rows = int(np.ceil(n / cols))
+    # Cells as wide as the widest piece at unit height, so no piece shrinks on account of the cell width
+    cell_w, cell_h = max(1.0, float(aspects.max())), 1.0
+    fit = np.minimum(cell_w / aspects, cell_h)
+    widths, heights = aspects * fit, fit
+    index = np.arange(n)
+    col, row = index % cols, index // cols
+    # Center a short last row
+    last_count = n - (rows - 1) * cols
+    offset = np.where(row == rows - 1, (cols - last_count) * (cell_w + gap) / 2, 0.0)
+    lefts = col * (cell_w + gap) + (cell_w - widths) / 2 + offset
+    tops = row * (cell_h + gap) + (cell_h - heights) / 2
+    return np.stack([lefts, tops, widths, heights], axis=1)
+
+
+def _salon_boxes(aspects, gap):
+    """Rows of pieces of varied heights on shared midlines, each row centered, for a ragged salon hang."""
+    n = len(aspects)
+    row_count = 1 if n <= 2 else 2 if n <= 6 else 3
+    heights = np.resize(np.array(SALON_HEIGHTS), n)
+    rows = np.array_split(np.arange(n), row_count)
+    boxes = np.zeros((n, 4))
+    top = 0.0
+    row_widths = []
+    for members in rows:
+        row = _row_boxes(aspects[members], heights[members], gap)
+        row[:, 1] += top
+        boxes[members] = row
+        top += row[:, 3].max() + gap
+        row_widths.append(row[-1, 0] + row[-1, 2])
+    total = max(row_widths)
+    for members, width in zip(rows, row_widths):
+        boxes[members, 0] += (total - width) / 2
+    return boxes
+
+
+def gallery_layout(room_size, artwork_sizes, layout='grid', position=None,
+                   max_fraction=GALLERY_MAX_FRACTION, gap_fraction=GALLERY_GAP_FRACTION):
+    """Arrange several artworks as a gallery wall centered on position (x/y percentages, default 50).
+
+    The arrangement is built at unit scale in NumPy ('grid': uniform cells,
+    'salon': staggered rows of varied sizes, 'row': one line of equal
+    heights) and then scaled as a block to fit max_fraction of the room.
+    Returns one Placement per artwork, in the order given.
+    """
+    if layout not in GALLERY_LAYOUTS:
+        raise ValueError(f"Unknown gallery layout {layout!r}")
+    aspects = np.array([width / height for width, height in artwork_sizes], dtype=np.float64)
+    if layout == 'row':
+        boxes = _row_boxes(aspects, np.ones(len(aspects)), gap_fraction)
+    elif layout == 'grid':
+        boxes = _grid_boxes(aspects, gap_fraction)
+    else:
+        boxes = _salon_boxes(aspects, gap_fraction)
+
+    room_width, room_height = room_size
+    block_width = (boxes[:, 0] + boxes[:, 2]).max()
+    block_height = (boxes[:, 1] + boxes[:, 3]).max()
+    scale = min(room_width * max_fraction[0] / block_width, room_height * max_fraction[1] / block_height)
+    position = position or {}
+    center_x = room_width * position.get('x', 50) / 100.0
+    center_y = room_height * position.get('y', 50) / 100.0
+    boxes = boxes * scale
+    boxes[:, 0] += center_x - block_width * scale / 2
+    boxes[:, 1] += center_y - block_height * scale / 2
+    boxes = np.floor(boxes).astype(int)
+    return [Placement(int(left), int(top), max(1, int(width)), max(1, int(height)), tuple(room_size))
+            for left, top, width, height in boxes]
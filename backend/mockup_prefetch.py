@@ -0,0 +1,142 @@
+"""
+Speculative background rendering of the mockups a user is likely to open next.
+
+Right after an upload people almost always open a mockup of one of the top
+few recommendations. MockupPrefetcher renders those into the render cache
+once the upload response has been sent, so the first click is a cache hit.
+It must never slow down real requests, so:
+
+  - jobs run on a single background thread at a lowered OS scheduling
+    priority (nice), with a bounded queue that drops work rather than
+    piling it up;
+  - a job is skipped while this worker is serving more than
+    max_active_requests foreground requests, or while the host's 1-minute
+    load average per CPU is above max_load (other workers and processes
+    compete for the same CPUs, which the in-flight count cannot see);
+  - a running job checks again between its stages (artwork load,
+    composite, encode) and is cancelled as soon as the worker gets busy.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchCancelled(Exception):
+    """Raised by PrefetchJob.check() when a job should stop for foreground work."""
+
+
+class PrefetchJob:
+    """Handed to a prefetch function so it can give way to foreground work between its stages."""
+
+    def __init__(self, prefetcher):
+        self.prefetcher = prefetcher
+
+    def check(self):
+        reason = self.prefetcher.busy()
+        if reason:
+            raise PrefetchCancelled(reason)
+
+
+class MockupPrefetcher:
+    """Low-priority, load-aware background queue for speculative mockup renders."""
+
+    def __init__(self, max_load=0.75, max_active_requests=1, max_pending=8, nice=10):
+        self.max_load = max_load
+        self.max_active_requests = max_active_requests
+        self.max_pending = max_pending
+        self.nice = nice
+        self.executor = None
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.active_requests = 0
+        self.counters = {'scheduled': 0, 'completed': 0, 'dropped': 0, 'skipped_busy': 0,
+                         'cancelled': 0, 'failed': 0}
+
+    def record(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    # --- Foreground load ---
+
+    def request_started(self):
+        with self.lock:
+            self.active_requests += 1
+
+    def request_finished(self):
+        with self.lock:
+            self.active_requests = max(0, self.active_requests - 1)
+
+    def busy(self):
+        """Why background work should wait right now, or None if the worker is idle enough."""
+        with self.lock:
+            active = self.active_requests
+        if active > self.max_active_requests:
+            return f'{active} active requests'
+        try:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except OSError:
+            return None
+        if load > self.max_load:
+            return f'load {load:.2f} per CPU'
+        return None
+
+    # --- Background thread ---
+
+    def _init_thread(self):
+        """Lower the prefetch thread's scheduling priority (Linux applies nice per thread)."""
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (AttributeError, OSError) as e:
+            logger.debug(f"Could not lower prefetch thread priority: {e}")
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mockup-prefetch',
+                                                   initializer=self._init_thread)
+            return self.executor
+
+    def schedule(self, func, *args):
+        """Queue func(job, *args) to run in the background; returns False if the queue was full."""
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.counters['dropped'] += 1
+                return False
+            self.pending += 1
+            self.counters['scheduled'] += 1
+        self.get_executor().submit(self._run, func, args)
+        return True
+
+    def _run(self, func, args):
+        try:
+            job = PrefetchJob(self)
+            reason = self.busy()
+            if reason:
+                self.record('skipped_busy')
+                logger.debug(f"Skipped mockup prefetch: {reason}")
+                return
+            func(job, *args)
+            self.record('completed')
+        except PrefetchCancelled as e:
+            self.record('cancelled')
+            logger.debug(f"Cancelled mockup prefetch: {e}")
+        except Exception as e:
+            self.record('failed')
+            logger.warning(f"Mockup prefetch failed: {e}")
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def reset_after_fork(self):
+        """Forget the parent's thread and in-flight counts in a freshly forked worker."""
+        self.executor = None
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.active_requests = 0
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, pending=self.pending, active_requests=self.active_requests)
@@ -0,0 +1,348 @@
+"""
+Helpers for content moderation with AWS Rekognition.
+
+Uploads are often multi-MB phone photos, but Rekognition's moderation labels
+do not need full resolution. encode_moderation_payload turns the image the
+analysis pipeline has already decoded into a small JPEG, keeping it under
+Rekognition's inline image limit.
+
+Verdicts are cached by perceptual hash (PerceptualModerationCache) so
+near-duplicate uploads don't pay for another Rekognition call.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Rekognition rejects inline Image.Bytes payloads larger than 5MB
+REKOGNITION_MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+# Never degrade the payload below this while shrinking it to fit the limit
+MIN_MODERATION_QUALITY = 50
+MIN_MODERATION_DIM = 320
+
+
+class ModerationUnavailable(Exception):
+    """An image could not be submitted for moderation at all (no payload fits the limit).
+
+    This is not a verdict: the image is neither approved nor rejected, and
+    must not be cached or quarantined as if it had been rejected.
+    """
+
+
+def scale_to_max_dim(img, max_dim):
+    """Downscale so the longer side is at most max_dim (returns img itself if already small)."""
+    longest = max(img.width, img.height)
+    if longest <= max_dim:
+        return img
+    scale = max_dim / longest
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+
+def encode_jpeg(img, quality):
+    """Encode an RGB image as baseline JPEG bytes."""
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def encode_moderation_payload(img, max_dim=1280, quality=85, max_bytes=REKOGNITION_MAX_IMAGE_BYTES):
+    """Re-encode a decoded RGB image as a downscaled JPEG for detect_moderation_labels.
+
+    If the result is still over max_bytes the quality is lowered first and the
+    dimensions second, down to MIN_MODERATION_QUALITY / MIN_MODERATION_DIM.
+    Returns the JPEG bytes, or None if no acceptable payload fits the limit.
+    """
+    preview = scale_to_max_dim(img, max_dim)
+    payload = encode_jpeg(preview, quality)
+    while len(payload) > max_bytes:
+        if quality > MIN_MODERATION_QUALITY:
+            quality = max(MIN_MODERATION_QUALITY, quality - 10)
+        elif max(preview.width, preview.height) > MIN_MODERATION_DIM:
+            preview = scale_to_max_dim(preview, max(MIN_MODERATION_DIM, int(max(preview.width, preview.height) * 0.75)))
+        else:
+            return None
+        payload = encode_jpeg(preview, quality)
+    return payload
+
+
+# --- Perceptual-hash verdict cache ---
+
+def perceptual_hash(pixels, hash_size=16):
+    """Difference hash (dHash) of an RGB or grayscale pixel array.
+
+    The image is converted to luminance and area-averaged down to
+    hash_size x (hash_size + 1) cells; each bit records whether a cell is
+    brighter than its right-hand neighbour, giving a hash_size**2-bit integer.
+    Re-compression, resizing and small crops flip only a few bits, while
+    content added to part of the image flips many.
+    """
+    pixels = np.asarray(pixels, dtype=np.float32)
+    gray = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32) if pixels.ndim == 3 else pixels
+    height, width = gray.shape
+    # Area-average into the hash grid (every cell gets at least one pixel)
+    row_starts = (np.arange(hash_size) * height) // hash_size
+    col_starts = (np.arange(hash_size + 1) * width) // (hash_size + 1)
+    cells = np.add.reduceat(np.add.reduceat(gray, row_starts, axis=0), col_starts, axis=1)
+    row_sizes = np.diff(np.append(row_starts, height))
+    col_sizes = np.diff(np.append(col_starts, width))
+    cells /= np.outer(row_sizes, col_sizes)
+    bits = (cells[:, 1:] > cells[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes for Hamming-radius lookups."""
+
+    def __init__(self):
+        self.root = None  # [hash, value, {distance: child}]
+        self.size = 0
+
+    def add(self, key, value):
+        """Insert key (replacing the value if the exact key already exists)."""
+        if self.root is None:
+            self.root = [key, value, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(key, node[0])
+            if distance == 0:
+                node[1] = value
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, value, {}]
+                self.size += 1
+                return
+            node = child
+
+    def nearest(self, key, max_distance, accept=None):
+        """Return (distance, value) of the closest key within max_distance, or None.
+
+        Nodes whose (key, value) fails accept are skipped but still searched
+        through, so a stale entry never hides a live one below it.
+        """
+        if self.root is None:
+            return None
+        best = None
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(key, node[0])
+            if (distance <= max_distance and (best is None or distance < best[0])
+                    and (accept is None or accept(node[0], node[1]))):
+                best = (distance, node[1])
+                if distance == 0:
+                    break
+            # Triangle inequality: only children within max_distance of this
+            # node's distance can hold a match
+            for child_distance, child in node[2].items():
+                if abs(child_distance - distance) <= max_distance:
+                    stack.append(child)
+        return best
+
+    def __len__(self):
+        return self.size
+
+
+class PerceptualModerationCache:
+    """Moderation verdicts keyed by perceptual hash, persisted in SQLite.
+
+    Near-duplicate uploads (re-exported, re-compressed or slightly cropped
+    copies of the same photo) reuse an earlier rejection when their hashes
+    are within max_distance bits. Approvals are only reused within
+    approve_max_distance bits: an image that is close to an approved one may
+    have had something added to it, so it is moderated again.
+
+    Verdicts are written through to db_path so they survive restarts; each
+    process keeps at most max_entries of them in memory (newest first), in
+    one BK-tree for approvals and one for rejections. Expired verdicts are
+    skipped on lookup and pruned, with the oldest entries beyond the cap,
+    from memory and the database (which keeps the newest max_entries
+    across all workers).
+    """
+
+    # Prune at least this often, even when the cache is under its cap
+    PRUNE_INTERVAL = 3600
+    # Pruning for the cap drops to this fraction of max_entries, so it doesn't run on every write
+    PRUNE_TARGET = 0.9
+
+    def __init__(self, db_path=None, max_distance=12, approve_max_distance=2, max_entries=50000, max_age_days=30):
+        self.db_path = db_path
+        self.max_distance = max_distance
+        self.approve_max_distance = min(approve_max_distance, max_distance)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 24 * 3600
+        # image hash -> (is_approved, reason, created_at), oldest first; the trees index into it
+        self.verdicts = OrderedDict()
+        self.approvals = BKTree()
+        self.rejections = BKTree()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.last_prune = time.time()
+        self.counters = {'hits': 0, 'misses': 0, 'pruned': 0}
+        if self.db_path:
+            self.init_db()
+            self.load()
+
+    def init_db(self):
+        """Create the verdict table once; connections opened later only run queries."""
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')  # Persistent: set once per database file
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS moderation_verdicts ('
+                    'image_hash TEXT PRIMARY KEY, approved INTEGER NOT NULL, reason TEXT, created_at REAL NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS moderation_verdicts_created ON moderation_verdicts (created_at)')
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Could not initialise moderation verdict database {self.db_path}: {e}")
+
+    def connection(self):
+        """This thread's connection to the verdict database (opened on first use)."""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            self.local.conn = conn
+        return conn
+
+    def load(self):
+        """Load the newest unexpired verdicts (up to max_entries) from the database."""
+        try:
+            rows = self.connection().execute(
+                'SELECT image_hash, approved, reason, created_at FROM moderation_verdicts '
+                'WHERE created_at >= ? ORDER BY created_at DESC LIMIT ?',
+                (time.time() - self.max_age_seconds, self.max_entries)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Could not load moderation verdicts from {self.db_path}: {e}")
+            return
+        with self.lock:
+            for image_hash, approved, reason, created_at in reversed(rows):
+                self.remember(int(image_hash, 16), bool(approved), reason, created_at)
+        logger.info(f"Loaded {len(rows)} moderation verdicts from {self.db_path}")
+
+    def remember(self, image_hash, is_approved, reason, created_at):
+        """Record a verdict in memory; callers hold the lock."""
+        self.verdicts.pop(image_hash, None)
+        self.verdicts[image_hash] = (is_approved, reason, created_at)
+        # If the hash was cached with the opposite verdict its node stays in the other tree; lookups skip it
+        (self.approvals if is_approved else self.rejections).add(image_hash, image_hash)
+
+    def lookup(self, tree, is_approved, image_hash, max_distance, now):
+        """Closest current, unexpired verdict in tree within max_distance, as (distance, verdict), or None."""
+        oldest = now - self.max_age_seconds
+
+        def is_live(key, _):
+            verdict = self.verdicts.get(key)
+            return verdict is not None and verdict[0] == is_approved and verdict[2] >= oldest
+
+        match = tree.nearest(image_hash, max_distance, is_live)
+        if match is None:
+            return None
+        distance, key = match
+        return distance, self.verdicts[key][:2]
+
+    def get(self, image_hash):
+        """Return the cached (is_approved, reason) for a near-duplicate, or None.
+
+        Rejections match within max_distance, approvals only within
+        approve_max_distance.
+        """
+        now = time.time()
+        with self.lock:
+            match = (self.lookup(self.rejections, False, image_hash, self.max_distance, now)
+                     or self.lookup(self.approvals, True, image_hash, self.approve_max_distance, now))
+            self.counters['hits' if match else 'misses'] += 1
+        if match is None:
+            return None
+        distance, verdict = match
+        logger.info(f"Perceptual moderation cache hit ({'approved' if verdict[0] else 'rejected'}) "
+                    f"at Hamming distance {distance}")
+        return verdict
+
+    def set(self, image_hash, verdict):
+        """Remember an (is_approved, reason) verdict and persist it."""
+        is_approved, reason = verdict
+        now = time.time()
+        with self.lock:
+            self.remember(image_hash, is_approved, reason, now)
+            should_prune = len(self.verdicts) > self.max_entries or now - self.last_prune > self.PRUNE_INTERVAL
+        if self.db_path:
+            try:
+                conn = self.connection()
+                with conn:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO moderation_verdicts (image_hash, approved, reason, created_at) '
+                        'VALUES (?, ?, ?, ?)',
+                        (f'{image_hash:x}', int(is_approved), reason, now)
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Could not persist moderation verdict: {e}")
+        if should_prune:
+            self.prune()
+
+    def prune(self):
+        """Drop expired verdicts, and the oldest ones beyond the entry cap, then rebuild the trees."""
+        now = time.time()
+        oldest = now - self.max_age_seconds
+        with self.lock:
+            self.last_prune = now
+            before = len(self.verdicts)
+            excess = before - int(self.max_entries * self.PRUNE_TARGET) if before > self.max_entries else 0
+            # verdicts is ordered oldest first, so expired entries and the excess are all at the front
+            while self.verdicts:
+                image_hash, (_, _, created_at) = next(iter(self.verdicts.items()))
+                if created_at >= oldest and excess <= 0:
+                    break
+                del self.verdicts[image_hash]
+                excess -= 1
+            self.approvals, self.rejections = BKTree(), BKTree()
+            for image_hash, (is_approved, _, _) in self.verdicts.items():
+                (self.approvals if is_approved else self.rejections).add(image_hash, image_hash)
+            self.counters['pruned'] += before - len(self.verdicts)
+        if self.db_path:
+            try:
+                conn = self.connection()
+                with conn:
+                    # Other workers write to the same file, so the cap is applied to the table as a whole
+                    conn.execute(
+                        'DELETE FROM moderation_verdicts WHERE created_at < ? OR image_hash NOT IN '
+                        '(SELECT image_hash FROM moderation_verdicts ORDER BY created_at DESC LIMIT ?)',
+                        (oldest, self.max_entries)
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Could not prune moderation verdicts: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.verdicts),
+                'max_entries': self.max_entries,
+                **self.counters,
+            }
+
+    def reset_after_fork(self):
+        # The parent's SQLite connections must not be used in the child
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def __len__(self):
+        return len(self.verdicts)
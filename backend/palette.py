@@ -0,0 +1,190 @@
+"""
+Dominant color (palette) extraction without scikit-learn.
+
+Pixels are binned into a coarse RGB histogram with np.bincount, so a photo of
+any size collapses to at most a few thousand occupied bins. Those bins are
+split with a variance-minimising median cut to get initial clusters, which are then
+refined with a few weighted k-means (Lloyd) iterations over the bins only.
+There is no random initialisation, so the same pixels always give the same
+palette, and no threadpool or per-call setup cost.
+
+With color_space='lab' the bins are clustered in CIELAB instead of raw RGB,
+so clusters follow perceived color differences. RGB is converted to Lab
+through a 64x64x64 float16 lookup table that is built once per process
+(lab_lut) and shared by the app and the catalog tooling; the catalog and
+uploads must use the same color space for their palettes to be comparable.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+# Bits kept per channel when binning (5 bits -> 32 levels, 32768 bins)
+HISTOGRAM_BITS = 5
+REFINE_ITERATIONS = 10
+
+COLOR_SPACES = ('rgb', 'lab')
+# Grid points per channel in the RGB -> Lab lookup table (64^3 x 3 float16, 1.5MB)
+LAB_LUT_SIZE = 64
+# D65 reference white in XYZ
+D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+
+
+def srgb_to_lab(rgb):
+    """Exact sRGB (0-255, any shape ending in 3) to CIELAB (D65) conversion in float64."""
+    rgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = linear @ SRGB_TO_XYZ.T / D65_WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+@lru_cache(maxsize=1)
+def lab_lut():
+    """The RGB -> Lab lookup table, indexed [r, g, b] by grid position; built on first use."""
+    levels = np.linspace(0, 255, LAB_LUT_SIZE)
+    grid = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'), axis=-1)
+    return srgb_to_lab(grid).astype(np.float16)
+
+
+def rgb_to_lab(rgb):
+    """Convert RGB values (0-255, any shape ending in 3) to Lab through the lookup table.
+
+    Values are rounded to the nearest grid point, which is within 3 delta-E
+    (under 1 on average) of the exact conversion, srgb_to_lab.
+    """
+    index = np.rint(np.asarray(rgb, dtype=np.float32) * ((LAB_LUT_SIZE - 1) / 255)).astype(np.intp)
+    return lab_lut()[index[..., 0], index[..., 1], index[..., 2]].astype(np.float64)
+
+
+def color_histogram(pixels, bits=HISTOGRAM_BITS):
+    """Bin RGB pixels; returns (mean color per occupied bin, pixel count per bin) as float arrays."""
+    pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    shift = 8 - bits
+    quantized = (pixels >> shift).astype(np.int32)
+    index = (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2]
+    n_bins = 1 << (3 * bits)
+    counts = np.bincount(index, minlength=n_bins)
+    occupied = np.nonzero(counts)[0]
+    sums = np.stack([
+        np.bincount(index, weights=pixels[:, channel], minlength=n_bins)[occupied]
+        for channel in range(3)
+    ], axis=1)
+    weights = counts[occupied].astype(np.float64)
+    return sums / weights[:, None], weights
+
+
+def median_cut(colors, weights, n_colors):
+    """Split weighted colors into up to n_colors boxes; returns a label per color.
+
+    Each step splits the box with the largest weighted squared error, along
+    its highest-variance channel, at the point that minimises the two
+    halves' error. Cutting at the weighted median instead would split a
+    dominant color (a wall) in two and merge small, distinct ones.
+    """
+    labels = np.zeros(len(colors), dtype=np.intp)
+    boxes = [np.arange(len(colors))]
+
+    def box_error(members):
+        box_weights = weights[members]
+        mean = (colors[members] * box_weights[:, None]).sum(axis=0) / box_weights.sum()
+        return (box_weights[:, None] * (colors[members] - mean) ** 2).sum(axis=0)
+
+    errors = [box_error(boxes[0])]
+    while len(boxes) < n_colors:
+        candidates = [index for index, members in enumerate(boxes) if len(members) > 1]
+        if not candidates:
+            break
+        best = max(candidates, key=lambda index: errors[index].sum())
+        if errors[best].sum() <= 0:
+            break
+        members = boxes[best]
+        channel = int(np.argmax(errors[best]))
+        order = members[np.argsort(colors[members, channel], kind='stable')]
+        # Error of the first k and the remaining colors along the channel, for every cut k, from prefix sums
+        values, box_weights = colors[order, channel], weights[order]
+        w, wx, wxx = (np.cumsum(box_weights * values ** power) for power in (0, 1, 2))
+        left_w, left_x, left_xx = w[:-1], wx[:-1], wxx[:-1]
+        right_w, right_x, right_xx = w[-1] - left_w, wx[-1] - left_x, wxx[-1] - left_xx
+        split_error = (left_xx - left_x ** 2 / left_w) + (right_xx - right_x ** 2 / right_w)
+        # Only cut between distinct values, so equal colors stay together
+        split_error[values[1:] == values[:-1]] = np.inf
+        split = int(np.argmin(split_error)) + 1
+        boxes[best] = order[:split]
+        boxes.append(order[split:])
+        errors[best] = box_error(boxes[best])
+        errors.append(box_error(boxes[-1]))
+    for box_index, members in enumerate(boxes):
+        labels[members] = box_index
+    return labels
+
+
+def weighted_kmeans(colors, weights, labels, iterations=REFINE_ITERATIONS):
+    """Refine an initial labelling with weighted Lloyd iterations; returns (centers, labels)."""
+    n_clusters = int(labels.max()) + 1
+    centers = None
+    for _ in range(iterations + 1):
+        cluster_weights = np.bincount(labels, weights=weights, minlength=n_clusters)
+        new_centers = np.stack([
+            np.bincount(labels, weights=weights * colors[:, channel], minlength=n_clusters)
+            for channel in range(3)
+        ], axis=1)
+        # Keep the previous center for a cluster that lost all its bins
+        empty = cluster_weights == 0
+        new_centers[~empty] /= cluster_weights[~empty, None]
+        if centers is not None:
+            new_centers[empty] = centers[empty]
+        centers = new_centers
+        distances = ((colors[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    return centers, labels
+
+
+def extract_palette(pixels, n_colors=5, color_space='rgb'):
+    """Return the n_colors dominant colors of RGB pixels as [{'color', 'percentage'}], largest first.
+
+    color_space is 'rgb' or 'lab' (cluster in CIELAB). Colors are always
+    reported in RGB: in Lab mode each is the weighted mean RGB of its cluster.
+    """
+    if color_space not in COLOR_SPACES:
+        raise ValueError(f"Unknown palette color space {color_space!r}, expected one of {COLOR_SPACES}")
+    colors, weights = color_histogram(pixels)
+    if len(colors) == 0:
+        return []
+    if color_space == 'lab':
+        lab = rgb_to_lab(colors)
+        _, labels = weighted_kmeans(lab, weights, median_cut(lab, weights, n_colors))
+        n_clusters = int(labels.max()) + 1
+        cluster_weights = np.bincount(labels, weights=weights, minlength=n_clusters)
+        centers = np.zeros((n_clusters, 3))
+        occupied = cluster_weights > 0
+        centers[occupied] = np.stack([
+            np.bincount(labels, weights=weights * colors[:, channel], minlength=n_clusters)
+            for channel in range(3)
+        ], axis=1)[occupied] / cluster_weights[occupied, None]
+    else:
+        centers, labels = weighted_kmeans(colors, weights, median_cut(colors, weights, n_colors))
+        cluster_weights = np.bincount(labels, weights=weights, minlength=len(centers))
+    percentages = cluster_weights / weights.sum()
+
+    dominant_colors = []
+    for center, percentage in zip(centers.astype(int), percentages):
+        if percentage > 0:
+            dominant_colors.append({
+                'color': f'#{center[0]:02x}{center[1]:02x}{center[2]:02x}',
+                'percentage': float(percentage)
+            })
+
+    dominant_colors.sort(key=lambda x: x['percentage'], reverse=True)
+    return dominant_colors
@@ -0,0 +1,282 @@
+"""
+Content-addressed cache of encoded mockup renders.
+
+A mockup is fully determined by the room photo, the artwork, where the
+artwork is placed and how the result is encoded, and people flip back and
+forth between the same few artworks on the same room. RenderCache keys each
+encoded result by a digest of those inputs (see render_key) and keeps:
+
+  - a memory tier of encoded bytes per worker, bounded by their total size
+    and evicted least recently used first;
+  - optionally a shared store, either a directory on local disk (bounded by
+    total file size, shared by the workers on a host) or an S3 prefix
+    (shared by every host; objects older than max_age_seconds are misses,
+    and a bucket lifecycle rule deletes them).
+
+A hit is served without fetching, decoding, compositing or encoding
+anything. Positions are snapped to a grid (quantize_position) before they
+are keyed and rendered, so a drag that ends a fraction of a percent away
+from an earlier one reuses its render.
+"""
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from mockup_encoding import MIME_TYPES
+
+logger = logging.getLogger(__name__)
+
+
+def quantize_position(position, grid):
+    """Snap an artwork position (x/y percentages, default 50) to multiples of grid percent."""
+    x = float(position.get('x', 50))
+    y = float(position.get('y', 50))
+    if grid > 0:
+        x = round(round(x / grid) * grid, 4)
+        y = round(round(y / grid) * grid, 4)
+    return {'x': x, 'y': y}
+
+
+@dataclass(frozen=True)
+class CachedRender:
+    """Encoded mockup bytes and their output format ('avif', 'webp' or 'jpeg')."""
+    data: bytes
+    format: str
+
+    @property
+    def mimetype(self):
+        return MIME_TYPES[self.format]
+
+
+class DiskRenderStore:
+    """Encoded renders as files named <key>.<format> in a directory, trimmed to max_bytes by mtime."""
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key, fmt):
+        return os.path.join(self.directory, f'{key}.{fmt}')
+
+    def get(self, key, fmt):
+        path = self.path(key, fmt)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Keep recently served renders from being trimmed
+        except OSError:
+            return None
+        return data
+
+    def exists(self, key, fmt):
+        return os.path.exists(self.path(key, fmt))
+
+    def put(self, key, fmt, data):
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.path(key, fmt))
+        except OSError as e:
+            logger.warning(f"Could not write render {key} to the disk store: {e}")
+            return
+        self.trim()
+
+    def trim(self):
+        """Remove the least recently used files until the store fits in max_bytes."""
+        files = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.startswith('.tmp-'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+    def reset_after_fork(self, s3_client=None):
+        pass
+
+
+class S3RenderStore:
+    """Encoded renders as objects under a prefix in an S3 bucket.
+
+    An object older than max_age_seconds (None for no limit) is treated as
+    a miss and rewritten by the next render, so renders are refreshed even
+    when an input changed without changing its key. The store never deletes
+    anything itself; bound its size with a lifecycle expiration rule on the
+    prefix, longer than max_age_seconds.
+    """
+
+    def __init__(self, s3_client, bucket, prefix='mockup-renders/', max_age_seconds=None):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_age_seconds = max_age_seconds
+        self.evictions = 0
+
+    def object_key(self, key, fmt):
+        return f'{self.prefix}{key}.{fmt}'
+
+    def get(self, key, fmt):
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=self.object_key(key, fmt))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                logger.warning(f"Could not read render {key} from s3://{self.bucket}: {e}")
+            return None
+        body = response['Body']
+        try:
+            if self.max_age_seconds is not None and 'LastModified' in response:
+                age = datetime.now(timezone.utc) - response['LastModified']
+                if age.total_seconds() > self.max_age_seconds:
+                    self.evictions += 1
+                    return None
+            return body.read()
+        finally:
+            body.close()
+
+    def exists(self, key, fmt):
+        """Whether a fresh render is stored, from its metadata alone (HEAD, no download)."""
+        try:
+            response = self.s3.head_object(Bucket=self.bucket, Key=self.object_key(key, fmt))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                logger.warning(f"Could not check render {key} in s3://{self.bucket}: {e}")
+            return False
+        if self.max_age_seconds is not None and 'LastModified' in response:
+            age = datetime.now(timezone.utc) - response['LastModified']
+            return age.total_seconds() <= self.max_age_seconds
+        return True
+
+    def put(self, key, fmt, data):
+        try:
+            self.s3.put_object(Bucket=self.bucket, Key=self.object_key(key, fmt), Body=data,
+                               ContentType=MIME_TYPES[fmt])
+        except ClientError as e:
+            logger.warning(f"Could not write render {key} to s3://{self.bucket}: {e}")
+
+    def reset_after_fork(self, s3_client=None):
+        if s3_client is not None:
+            self.s3 = s3_client
+
+
+class RenderCache:
+    """Encoded mockups in a bounded memory LRU over an optional shared store (DiskRenderStore or S3RenderStore)."""
+
+    def __init__(self, memory_bytes=64 * 1024 * 1024, store=None):
+        self.memory_bytes = memory_bytes
+        self.store = store
+        self.lock = threading.Lock()
+        # (key, format) -> encoded bytes
+        self.memory = OrderedDict()
+        self.memory_used = 0
+        self.counters = {'memory_hits': 0, 'store_hits': 0, 'misses': 0, 'stored': 0, 'memory_evictions': 0}
+
+    def record(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def get(self, key, fmt):
+        """Return the CachedRender for key in format fmt, or None if it has to be rendered."""
+        with self.lock:
+            data = self.memory.get((key, fmt))
+            if data is not None:
+                self.memory.move_to_end((key, fmt))
+                self.counters['memory_hits'] += 1
+                return CachedRender(data, fmt)
+        if self.store is not None:
+            data = self.store.get(key, fmt)
+            if data is not None:
+                self.record('store_hits')
+                self.store_memory(key, fmt, data)
+                return CachedRender(data, fmt)
+        self.record('misses')
+        return None
+
+    def contains(self, key, fmt):
+        """Whether a render is cached, without counting a lookup (for speculative rendering)."""
+        with self.lock:
+            if (key, fmt) in self.memory:
+                return True
+        return self.store is not None and self.store.exists(key, fmt)
+
+    def put(self, key, fmt, data):
+        """Keep an encoded render in memory and in the shared store."""
+        self.record('stored')
+        self.store_memory(key, fmt, data)
+        if self.store is not None:
+            self.store.put(key, fmt, data)
+
+    def store_memory(self, key, fmt, data):
+        size = len(data)
+        if size > self.memory_bytes:
+            return
+        with self.lock:
+            previous = self.memory.pop((key, fmt), None)
+            if previous is not None:
+                self.memory_used -= len(previous)
+            self.memory[(key, fmt)] = data
+            self.memory_used += size
+            while self.memory_used > self.memory_bytes:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_used -= len(evicted)
+                self.counters['memory_evictions'] += 1
+
+    def iter_and_store(self, key, fmt, chunks):
+        """Pass encoded chunks through, storing the complete render once the last one is out.
+
+        Nothing is stored if the consumer stops early (client disconnected)
+        or the encoder fails, so a partial render is never served later. The
+        chunks are kept until the end and joined for the memory tier, so each
+        request peaks at about twice the encoded size.
+        """
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        self.put(key, fmt, b''.join(parts))
+
+    def clear(self):
+        """Empty the memory tier (the shared store is kept)."""
+        with self.lock:
+            self.memory.clear()
+            self.memory_used = 0
+
+    def reset_after_fork(self, s3_client=None):
+        self.lock = threading.Lock()
+        if self.store is not None:
+            self.store.reset_after_fork(s3_client)
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            memory_entries = len(self.memory)
+            memory_used = self.memory_used
+        hits = counters['memory_hits'] + counters['store_hits']
+        lookups = hits + counters['misses']
+        return dict(counters, hit_ratio=round(hits / lookups, 4) if lookups else None,
+                    memory_entries=memory_entries, memory_used=memory_used, memory_bytes=self.memory_bytes,
+                    store=type(self.store).__name__ if self.store is not None else None,
+                    store_evictions=self.store.evictions if self.store is not None else 0)
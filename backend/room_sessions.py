@@ -0,0 +1,311 @@
+"""
+Server-side sessions for uploaded room photos.
+
+/upload-image already receives and decodes the room photo, yet every mockup
+request used to send the same photo back as a multi-MB base64 data URL and
+decode it again. RoomSessionStore keeps the decoded room bitmap (downscaled
+to max_dim) under a random token that the upload response hands to the
+client, so mockup requests can reference the room by token instead. The
+uploaded file's own bytes are kept alongside it, so full-resolution
+(download) mockups are rendered from the original photo rather than from
+the downscaled, re-encoded copy.
+
+Sessions live in a per-worker memory tier, bounded by total bitmap and
+original size and evicted least recently used first, and are written as
+high-quality JPEGs (plus the original bytes) to an optional directory shared
+by the workers on a host: a request routed to a
+different worker than the upload finds the room there and decodes a small
+file instead of failing. Both tiers expire sessions ttl_seconds after they
+were last used.
+"""
+import logging
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# token_urlsafe output only; anything else is rejected before touching the disk
+TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+SESSION_JPEG_QUALITY = 95
+# Suffixes of a session's files on disk: the downscaled bitmap and the uploaded bytes
+BITMAP_SUFFIX = '.jpg'
+ORIGINAL_SUFFIX = '.orig'
+
+
+class RoomSessionExpired(Exception):
+    """A request referenced a room token that is unknown or has expired."""
+
+
+@dataclass(frozen=True)
+class RoomSession:
+    """A stored room photo. digest identifies its content (for render cache keys).
+
+    image is the photo downscaled to the store's max_dim; original is the
+    uploaded file's bytes (None if they were not kept).
+    """
+    token: str
+    image: Image.Image
+    digest: str
+    original: bytes = None
+
+    def open_original(self):
+        """Return the uploaded file as a stream, or None."""
+        return BytesIO(self.original) if self.original is not None else None
+
+
+class RoomSessionStore:
+    """Decoded room bitmaps by session token, in memory over an optional shared directory.
+
+    Images returned by get() are shared between requests and must not be
+    modified in place.
+    """
+
+    def __init__(self, ttl_seconds=1800, memory_bytes=256 * 1024 * 1024, max_dim=2048,
+                 disk_dir=None, disk_bytes=1024 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.memory_bytes = memory_bytes
+        self.max_dim = max_dim
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.lock = threading.Lock()
+        # token -> (RoomSession, size in bytes, last used)
+        self.memory = OrderedDict()
+        self.memory_used = 0
+        self.counters = {'created': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                         'memory_evictions': 0, 'disk_evictions': 0}
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def record(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def create(self, image, digest, original=None):
+        """Store a decoded room photo (downscaled to max_dim) and its uploaded bytes; return the new session token."""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if max(image.size) > self.max_dim:
+            scale = self.max_dim / max(image.size)
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        session = RoomSession(secrets.token_urlsafe(18), image, digest, original)
+        self.record('created')
+        self.store_memory(session, time.time())
+        if self.disk_dir:
+            self.write_disk(session)
+        return session.token
+
+    def get(self, token):
+        """Return the RoomSession for token, or None if it is unknown or expired."""
+        if not token or not TOKEN_PATTERN.match(token):
+            return None
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(token)
+            if entry is not None:
+                session, size, last_used = entry
+                if now - last_used < self.ttl_seconds:
+                    self.memory[token] = (session, size, now)
+                    self.memory.move_to_end(token)
+                    self.counters['memory_hits'] += 1
+                    return session
+                del self.memory[token]
+                self.memory_used -= size
+        session = self.read_disk(token, now)
+        if session is None:
+            self.record('misses')
+            return None
+        self.record('disk_hits')
+        self.store_memory(session, now)
+        return session
+
+    def store_memory(self, session, last_used):
+        size = session.image.width * session.image.height * 3 + len(session.original or b'')
+        if size > self.memory_bytes:
+            return
+        with self.lock:
+            previous = self.memory.pop(session.token, None)
+            if previous is not None:
+                self.memory_used -= previous[1]
+            self.memory[session.token] = (session, size, last_used)
+            self.memory_used += size
+            while self.memory_used > self.memory_bytes:
+                _, (_, evicted_size, _) = self.memory.popitem(last=False)
+                self.memory_used -= evicted_size
+                self.counters['memory_evictions'] += 1
+
+    # --- Disk tier ---
+
+    def disk_path(self, token, suffix=BITMAP_SUFFIX):
+        """Path of one of the session's files (named <token>-<digest><suffix>), or None if there is none."""
+        prefix = token + '-'
+        try:
+            for name in os.listdir(self.disk_dir):
+                if name.startswith(prefix) and name.endswith(suffix):
+                    return os.path.join(self.disk_dir, name)
+        except OSError:
+            pass
+        return None
+
+    def read_disk(self, token, now):
+        if not self.disk_dir:
+            return None
+        path = self.disk_path(token)
+        if path is None:
+            return None
+        try:
+            if now - os.path.getmtime(path) >= self.ttl_seconds:
+                self.remove(path)
+                return None
+            with Image.open(path) as img:
+                image = img.convert('RGB')
+            os.utime(path)
+        except OSError:
+            return None  # Expired and removed by another worker in the meantime
+        digest = os.path.basename(path)[len(token) + 1:-len(BITMAP_SUFFIX)]
+        return RoomSession(token, image, digest, self.read_original(token))
+
+    def read_original(self, token):
+        """The session's uploaded bytes from disk, or None (mockups then fall back to the bitmap)."""
+        path = self.disk_path(token, ORIGINAL_SUFFIX)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                original = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return original
+
+    def write_disk(self, session):
+        """Atomically write the session's bitmap as JPEG, and its original bytes, then trim the tier."""
+        stem = os.path.join(self.disk_dir, f'{session.token}-{session.digest}')
+        try:
+            # The original goes first: a reader only looks for it once the bitmap exists
+            if session.original is not None:
+                self.write_file(stem + ORIGINAL_SUFFIX, lambda f: f.write(session.original))
+            self.write_file(stem + BITMAP_SUFFIX,
+                            lambda f: session.image.save(f, format='JPEG', quality=SESSION_JPEG_QUALITY))
+        except OSError as e:
+            logger.warning(f"Could not write room session to {self.disk_dir}: {e}")
+            return
+        self.trim_disk()
+
+    def write_file(self, path, write):
+        fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+
+    def trim_disk(self):
+        """Remove expired session files, then the least recently used until the tier fits in disk_bytes."""
+        now = time.time()
+        files = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if name.startswith('.tmp-'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime >= self.ttl_seconds:
+                self.remove(path)
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_bytes:
+                break
+            self.remove(path)
+            total -= size
+            self.record('disk_evictions')
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Empty the memory tier (sessions on disk stay valid until they expire)."""
+        with self.lock:
+            self.memory.clear()
+            self.memory_used = 0
+
+    def reset_after_fork(self):
+        self.lock = threading.Lock()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, memory_entries=len(self.memory), memory_used=self.memory_used,
+                        memory_bytes=self.memory_bytes, ttl_seconds=self.ttl_seconds)
+
+
+class ScaledRoomCache:
+    """Room photos already scaled to preview sizes, by room reference and size.
+
+    Someone trying artworks on a room asks for previews at the same on-screen
+    width again and again; keeping the scaled room skips the decode (or the
+    downscale of a session bitmap) for every preview after the first. Bounded
+    by total bitmap size, least recently used first.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # (room ref, size) -> (image, reference size, size in bytes)
+        self.entries = OrderedDict()
+        self.used = 0
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, room_ref, size):
+        """Return (image, reference_size) or None."""
+        with self.lock:
+            entry = self.entries.get((room_ref, tuple(size)))
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self.entries.move_to_end((room_ref, tuple(size)))
+            self.counters['hits'] += 1
+            return entry[0], entry[1]
+
+    def put(self, room_ref, image, reference_size):
+        size = image.width * image.height * len(image.getbands())
+        if size > self.max_bytes:
+            return
+        key = (room_ref, image.size)
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.used -= previous[2]
+            self.entries[key] = (image, tuple(reference_size), size)
+            self.used += size
+            while self.used > self.max_bytes:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.used -= evicted_size
+                self.counters['evictions'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.used = 0
+
+    def reset_after_fork(self):
+        self.lock = threading.Lock()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries), used=self.used, max_bytes=self.max_bytes)
@@ -0,0 +1,59 @@
+import os
+import sys
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# The backend modules use flat imports (as app_aws does when run from backend/)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+CATALOG_BUCKET = 'catalog-bucket'
+
+
+def room_jpeg(width=1600, height=1200, seed=0):
+    """A JPEG room photo: two wall colors and a red stripe, with some noise."""
+    rng = np.random.default_rng(seed)
+    pixels = np.zeros((height, width, 3), np.uint8)
+    pixels[:] = rng.integers(0, 255, 3)
+    pixels[height // 3:] = rng.integers(0, 255, 3)
+    pixels[:, width // 2:width // 2 + width // 8] = (200, 30, 40)
+    pixels = np.clip(pixels.astype(int) + rng.integers(-20, 20, pixels.shape), 0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='session')
+def app_aws(tmp_path_factory):
+    """The production app against moto's S3 and DynamoDB, with Rekognition approving everything."""
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    data_dir = tmp_path_factory.mktemp('app')
+    os.environ.update(
+        AWS_REGION='us-east-1', AWS_DEFAULT_REGION='us-east-1', AWS_ACCESS_KEY_ID='testing',
+        AWS_SECRET_ACCESS_KEY='testing', CATALOG_TABLE_NAME='catalog', CATALOG_BUCKET_NAME=CATALOG_BUCKET,
+        APPROVED_BUCKET='approved-bucket', QUARANTINE_BUCKET='quarantine-bucket', RATELIMIT_ENABLED='false',
+        MODERATION_HASH_DB=str(data_dir / 'moderation.db'), ARTWORK_CACHE_DIR=str(data_dir / 'artworks'),
+        ROOM_SESSION_DIR=str(data_dir / 'rooms'),
+    )
+    mock = moto.mock_aws()
+    mock.start()
+    boto3.resource('dynamodb', region_name='us-east-1').create_table(
+        TableName='catalog', KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}], BillingMode='PAY_PER_REQUEST')
+    s3 = boto3.client('s3', region_name='us-east-1')
+    for bucket in (CATALOG_BUCKET, 'approved-bucket', 'quarantine-bucket'):
+        s3.create_bucket(Bucket=bucket)
+
+    import app_aws as module
+    module.rekognition.detect_moderation_labels = lambda Image: {'ModerationLabels': []}
+    yield module
+    mock.stop()
+
+
+@pytest.fixture
+def client(app_aws):
+    return app_aws.app.test_client()
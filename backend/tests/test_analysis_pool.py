@@ -0,0 +1,19 @@
+import os
+
+import numpy as np
+
+from analysis_pool import AnalysisPool
+
+
+def test_tasks_return_their_queue_slot():
+    pool = AnalysisPool(max_workers=1, max_queue=1)
+    try:
+        # With and without arrays in shared memory
+        for func, arrays in ((os.getpid, ()), (np.sum, (np.arange(4),))):
+            pool.submit(func, *arrays).result()
+            # The slot comes back from the future's done callback
+            assert pool.slots.acquire(timeout=5)
+            pool.slots.release()
+        assert pool.stats()['queue_full'] == 0
+    finally:
+        pool.executor.shutdown()
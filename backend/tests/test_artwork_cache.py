@@ -0,0 +1,95 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from artwork_cache import ArtworkCache
+
+
+def jpeg_bytes(color):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class FakeStore:
+    """A catalog with one object per filename, answering conditional gets like S3."""
+
+    def __init__(self):
+        self.objects = {}
+        self.fetches = []
+
+    def put(self, filename, color, etag):
+        self.objects[filename] = (jpeg_bytes(color), etag)
+
+    def fetch(self, filename, etag):
+        self.fetches.append((filename, etag))
+        data, current = self.objects[filename]
+        if etag == current:
+            return None, current
+        return BytesIO(data), current
+
+
+def make_cache(store, tmp_path=None, revalidate_seconds=300):
+    return ArtworkCache(store.fetch, Image.open, disk_dir=str(tmp_path) if tmp_path else None,
+                        revalidate_seconds=revalidate_seconds)
+
+
+def test_version_of_fresh_entry_does_not_fetch():
+    store = FakeStore()
+    store.put('sunset.jpg', (200, 80, 40), '"v1"')
+    cache = make_cache(store)
+
+    assert cache.version('sunset.jpg') == '"v1"'
+    assert cache.version('sunset.jpg') == '"v1"'
+    assert store.fetches == [('sunset.jpg', None)]
+
+
+def test_version_follows_replaced_object():
+    store = FakeStore()
+    store.put('sunset.jpg', (200, 80, 40), '"v1"')
+    cache = make_cache(store, revalidate_seconds=0)
+    assert cache.version('sunset.jpg') == '"v1"'
+
+    store.put('sunset.jpg', (20, 80, 200), '"v2"')
+    assert cache.version('sunset.jpg') == '"v2"'
+    assert cache.get('sunset.jpg').getpixel((0, 0))[2] > 150
+
+
+def test_version_from_disk_tier(tmp_path):
+    store = FakeStore()
+    store.put('sunset.jpg', (200, 80, 40), '"v1"')
+    make_cache(store, tmp_path).get('sunset.jpg')
+
+    # A new worker answers from the shared disk tier without downloading or decoding
+    cache = make_cache(store, tmp_path)
+    assert cache.version('sunset.jpg') == '"v1"'
+    assert len(store.fetches) == 1
+    assert cache.stats()['memory_entries'] == 0
+
+
+def test_concurrent_misses_share_one_download():
+    store = FakeStore()
+    store.put('sunset.jpg', (200, 80, 40), '"v1"')
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_fetch(filename, etag):
+        started.set()
+        release.wait(5)
+        return store.fetch(filename, etag)
+
+    cache = ArtworkCache(slow_fetch, Image.open)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(cache.get, 'sunset.jpg')
+        started.wait(5)
+        followers = [executor.submit(cache.get, 'sunset.jpg') for _ in range(3)]
+        while cache.stats()['shared_loads'] < 3:
+            time.sleep(0.01)
+        release.set()
+        images = [leader.result()] + [future.result() for future in followers]
+
+    assert store.fetches == [('sunset.jpg', None)]
+    assert all(image is images[0] for image in images)
@@ -0,0 +1,171 @@
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+
+from assets import AssetResolver, catalog_key_from_url
+from decode_budget import DecodeBudget, DecodeBudgetExceeded
+
+moto = pytest.importorskip('moto')
+
+BUCKET = 'catalog-bucket'
+
+
+@pytest.mark.parametrize('url, key', [
+    # Virtual-hosted, with and without a region
+    ('https://catalog-bucket.s3.amazonaws.com/art/sunset.jpg', 'art/sunset.jpg'),
+    ('https://catalog-bucket.s3.us-east-1.amazonaws.com/sunset.jpg', 'sunset.jpg'),
+    ('https://catalog-bucket.s3-us-west-2.amazonaws.com/sunset.jpg', 'sunset.jpg'),
+    # Path-style
+    ('https://s3.amazonaws.com/catalog-bucket/art/sunset.jpg', 'art/sunset.jpg'),
+    ('https://s3.eu-west-1.amazonaws.com/catalog-bucket/sunset.jpg', 'sunset.jpg'),
+    # Presigned: the query string is not part of the key, percent-escapes are decoded
+    ('https://catalog-bucket.s3.amazonaws.com/my%20art/sunset.jpg?X-Amz-Algorithm=AWS4-HMAC-SHA256'
+     '&X-Amz-Signature=abc', 'my art/sunset.jpg'),
+    ('https://s3.amazonaws.com/catalog-bucket/sunset.jpg?AWSAccessKeyId=AKIA&Signature=x&Expires=1', 'sunset.jpg'),
+    # Bucket names are case-insensitive in the host
+    ('https://Catalog-Bucket.s3.amazonaws.com/sunset.jpg', 'sunset.jpg'),
+])
+def test_catalog_key_from_catalog_urls(url, key):
+    assert catalog_key_from_url(url, BUCKET) == key
+
+
+@pytest.mark.parametrize('url', [
+    'https://other-bucket.s3.amazonaws.com/sunset.jpg',
+    'https://s3.amazonaws.com/other-bucket/sunset.jpg',
+    'https://s3.amazonaws.com/catalog-bucket-2/sunset.jpg',
+    'https://catalog-bucket.s3.amazonaws.com/',
+    'https://example.com/catalog-bucket/sunset.jpg',
+    'https://catalog-bucket.s3.amazonaws.com.evil.example/sunset.jpg',
+    'ftp://catalog-bucket.s3.amazonaws.com/sunset.jpg',
+    'data:image/jpeg;base64,AAAA',
+    'sunset.jpg',
+    '',
+    None,
+])
+def test_catalog_key_from_other_urls(url):
+    assert catalog_key_from_url(url, BUCKET) is None
+
+
+class FakeResponse:
+    """Just enough of requests.Response for AssetResolver.get_url."""
+
+    def __init__(self, status_code=200, body=b'', headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f'HTTP {self.status_code}')
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+class FakeSession:
+    """Records requests and answers them with a canned FakeResponse."""
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def get(self, url, timeout=None, stream=False, headers=None):
+        self.requests.append((url, headers or {}))
+        return self.response
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        client.put_object(Bucket=BUCKET, Key='art/sunset.jpg', Body=b'x' * 200_000, ContentType='image/jpeg')
+        yield client
+
+
+def make_resolver(s3_client, response=None):
+    resolver = AssetResolver(s3_client, BUCKET, check_size=DecodeBudget().check_size)
+    resolver.session = FakeSession(response or FakeResponse(200, b'remote bytes', {'ETag': '"remote"'}))
+    return resolver
+
+
+def test_catalog_url_is_read_with_get_object(s3):
+    resolver = make_resolver(s3)
+    url = s3.generate_presigned_url('get_object', Params={'Bucket': BUCKET, 'Key': 'art/sunset.jpg'})
+
+    asset = resolver.fetch(url, max_bytes=1_000_000)
+    assert asset.stream.getvalue() == b'x' * 200_000
+    assert asset.content_type == 'image/jpeg'
+    assert asset.etag
+    assert resolver.session.requests == []
+    assert resolver.stats() == {'s3_gets': 1, 'http_gets': 0, 'not_modified': 0}
+
+
+def test_get_object_conditional_on_etag(s3):
+    resolver = make_resolver(s3)
+    etag = resolver.get_object('art/sunset.jpg', 1_000_000).etag
+
+    assert resolver.get_object('art/sunset.jpg', 1_000_000, etag=etag).not_modified
+    assert not resolver.get_object('art/sunset.jpg', 1_000_000, etag='"stale"').not_modified
+    assert resolver.stats()['not_modified'] == 1
+
+
+def test_get_object_enforces_byte_limit(s3):
+    resolver = make_resolver(s3)
+    with pytest.raises(DecodeBudgetExceeded):
+        resolver.get_object('art/sunset.jpg', 100_000)
+
+
+def test_get_object_missing_key_raises(s3):
+    resolver = make_resolver(s3)
+    with pytest.raises(ClientError) as excinfo:
+        resolver.get_object('art/missing.jpg', 1_000_000)
+    assert excinfo.value.response['Error']['Code'] == 'NoSuchKey'
+
+
+def test_other_urls_use_the_http_session(s3):
+    resolver = make_resolver(s3, FakeResponse(200, b'remote bytes', {'ETag': '"remote"', 'Content-Type': 'image/png'}))
+
+    asset = resolver.fetch('https://example.com/room.png', max_bytes=1_000_000)
+    assert asset.stream.getvalue() == b'remote bytes'
+    assert (asset.etag, asset.content_type) == ('"remote"', 'image/png')
+    assert resolver.session.requests == [('https://example.com/room.png', {})]
+    assert resolver.stats() == {'s3_gets': 0, 'http_gets': 1, 'not_modified': 0}
+
+
+def test_catalog_url_without_s3_client_falls_back_to_http():
+    resolver = make_resolver(None)
+    url = 'https://catalog-bucket.s3.amazonaws.com/art/sunset.jpg'
+
+    assert resolver.fetch(url, max_bytes=1_000_000).stream.getvalue() == b'remote bytes'
+    assert resolver.session.requests == [(url, {})]
+
+
+def test_get_url_conditional_on_etag():
+    resolver = make_resolver(None, FakeResponse(304))
+
+    asset = resolver.get_url('https://example.com/room.jpg', 1_000_000, etag='"remote"')
+    assert asset.not_modified and asset.etag == '"remote"'
+    assert resolver.session.requests == [('https://example.com/room.jpg', {'If-None-Match': '"remote"'})]
+
+
+@pytest.mark.parametrize('headers', [{'Content-Length': '5000'}, {}], ids=['declared', 'streamed'])
+def test_get_url_enforces_byte_limit(headers):
+    resolver = make_resolver(None, FakeResponse(200, b'y' * 5000, headers))
+    with pytest.raises(DecodeBudgetExceeded):
+        resolver.get_url('https://example.com/huge.jpg', 1000)
+
+
+def test_get_url_raises_http_errors():
+    resolver = make_resolver(None, FakeResponse(404))
+    with pytest.raises(RuntimeError):
+        resolver.get_url('https://example.com/missing.jpg', 1000)
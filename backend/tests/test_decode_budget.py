@@ -0,0 +1,77 @@
+import struct
+import warnings
+import zlib
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from decode_budget import DecodeBudget, DecodeBudgetExceeded, inspect_image
+
+
+def png_chunk(kind, body):
+    return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body) & 0xffffffff)
+
+
+def png_header(width, height):
+    """A PNG whose IHDR claims width x height, with only a few bytes of pixel data behind it."""
+    return (b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + png_chunk(b'IDAT', zlib.compress(b'\x00' * 64)) + png_chunk(b'IEND', b''))
+
+
+def jpeg_claiming(width, height):
+    """A small real JPEG with its frame header (SOF0) rewritten to claim width x height."""
+    buffer = BytesIO()
+    Image.new('RGB', (16, 16), (120, 80, 40)).save(buffer, format='JPEG')
+    data = bytearray(buffer.getvalue())
+    sof = data.index(b'\xff\xc0')
+    # Marker (2), length (2), precision (1), then height and width
+    data[sof + 5:sof + 9] = struct.pack('>HH', height, width)
+    return bytes(data)
+
+
+@pytest.mark.parametrize('data', [png_header(100_000, 100_000), jpeg_claiming(60_000, 60_000)], ids=['png', 'jpeg'])
+def test_decompression_bomb_error_is_over_budget(data):
+    # Far beyond Pillow's 2 x MAX_IMAGE_PIXELS, so Image.open itself refuses it
+    with pytest.raises(DecodeBudgetExceeded):
+        inspect_image(BytesIO(data))
+
+    budget = DecodeBudget(max_pixels=10**12, max_full_decode_pixels=10**12)
+    with pytest.raises(DecodeBudgetExceeded):
+        budget.check_stream(BytesIO(data))
+    with pytest.raises(DecodeBudgetExceeded):
+        budget.open(BytesIO(data))
+    assert budget.stats()['rejected'] == 2
+
+
+def test_decompression_bomb_warning_as_error_is_over_budget():
+    # Between MAX_IMAGE_PIXELS and twice that Pillow only warns, unless warnings are errors
+    side = int((Image.MAX_IMAGE_PIXELS * 1.5) ** 0.5)
+    data = png_header(side, side)
+    budget = DecodeBudget(max_pixels=10**12, max_full_decode_pixels=10**12)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', Image.DecompressionBombWarning)
+        with pytest.raises(DecodeBudgetExceeded):
+            budget.check_stream(BytesIO(data))
+
+
+def test_budget_rejects_forged_header_before_decoding():
+    stream = BytesIO(jpeg_claiming(11_000, 8_000))
+    budget = DecodeBudget(max_pixels=50_000_000)
+
+    header = inspect_image(stream)
+    assert (header.format, header.width, header.height) == ('JPEG', 11_000, 8_000)
+    assert stream.tell() == 0
+    with pytest.raises(DecodeBudgetExceeded):
+        budget.check(header)
+
+
+def test_large_jpeg_is_decoded_at_reduced_scale():
+    budget = DecodeBudget(max_pixels=100_000_000, max_full_decode_pixels=30_000)
+    buffer = BytesIO()
+    Image.new('RGB', (400, 300), (10, 20, 30)).save(buffer, format='JPEG')
+    buffer.seek(0)
+
+    img = budget.open(buffer)
+    assert img.size == (200, 150)
+    assert budget.stats()['downscaled'] == 1
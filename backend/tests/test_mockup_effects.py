@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import mockup_effects
+from mockup_effects import FRAME_STYLES, EffectCache, cast_shadow, draw_frame
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    mockup_effects.clear_caches()
+    yield
+    mockup_effects.clear_caches()
+
+
+def wall(width=900, height=900):
+    return Image.new('RGB', (width, height), (90, 110, 200))
+
+
+def test_similar_sizes_share_a_sprite():
+    style = FRAME_STYLES['oak-mat']
+    windows = [draw_frame(wall(), (100, 100, width, height), style) for width, height in ((300, 400), (296, 395))]
+
+    assert mockup_effects.effect_cache.stats()['misses'] == 1
+    assert mockup_effects.effect_cache.stats()['hits'] == 1
+    # Same border on every side, and the window is the box minus that border
+    for (left, top, width, height), (box_width, box_height) in zip(windows, ((300, 400), (296, 395))):
+        inset = left - 100
+        assert top - 100 == inset
+        assert (width, height) == (box_width - 2 * inset, box_height - 2 * inset)
+
+
+def test_stretched_sprite_matches_exact_sprite_at_the_corners():
+    style = FRAME_STYLES['black-mat']
+    image = wall()
+    left, top, _, _ = draw_frame(image, (0, 0, 305, 398), style)
+    inset = left
+
+    exact = mockup_effects._build_frame_sprite('black-mat', 320, 384)
+    drawn = np.asarray(image)
+    assert np.array_equal(drawn[:inset, :inset], exact[:inset, :inset])
+    assert np.array_equal(drawn[398 - inset:398, 305 - inset:305], exact[384 - inset:, 320 - inset:])
+
+
+def test_pieces_beyond_the_preview_tier_are_not_cached():
+    image = wall(3000, 3000)
+    cast_shadow(image, (100, 100, 1500, 2000), FRAME_STYLES['oak'])
+    draw_frame(image, (100, 100, 1500, 2000), FRAME_STYLES['oak'])
+
+    assert mockup_effects.effect_cache.stats()['entries'] == 0
+
+
+def test_effect_cache_is_bounded_by_bytes():
+    cache = EffectCache(max_bytes=3000)
+    for key in range(4):
+        cache.get(key, lambda: np.zeros(1000, dtype=np.uint8))
+
+    stats = cache.stats()
+    assert (stats['entries'], stats['used'], stats['evictions']) == (3, 3000, 1)
+    assert not cache.get(3, lambda: None).flags.writeable
+    # Arrays larger than the whole cache are returned but not kept
+    assert cache.get('big', lambda: np.zeros(5000, dtype=np.uint8)).nbytes == 5000
+    assert cache.stats()['entries'] == 3
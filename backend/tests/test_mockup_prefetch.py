@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from mockup_prefetch import MockupPrefetcher
+
+
+@pytest.fixture
+def load(monkeypatch):
+    """Set the host's 1-minute load average per CPU."""
+    def set_load(per_cpu):
+        monkeypatch.setattr(os, 'getloadavg', lambda: (per_cpu * (os.cpu_count() or 1), 0.0, 0.0))
+    set_load(0.0)
+    return set_load
+
+
+def test_busy_follows_in_flight_requests(load):
+    prefetcher = MockupPrefetcher(max_active_requests=1)
+    assert prefetcher.busy() is None
+    prefetcher.request_started()
+    assert prefetcher.busy() is None
+    prefetcher.request_started()
+    assert prefetcher.busy() == '2 active requests'
+    prefetcher.request_finished()
+    assert prefetcher.busy() is None
+
+
+def test_busy_follows_host_load(load):
+    prefetcher = MockupPrefetcher(max_load=0.75)
+    load(0.5)
+    assert prefetcher.busy() is None
+    # Other workers keep the CPUs busy while this one is idle
+    load(1.5)
+    assert prefetcher.busy() == 'load 1.50 per CPU'
+
+
+def test_job_is_skipped_while_busy():
+    prefetcher = MockupPrefetcher(max_active_requests=0)
+    prefetcher.request_started()
+    ran = []
+    prefetcher.schedule(lambda job: ran.append(job))
+    prefetcher.get_executor().shutdown(wait=True)
+
+    assert ran == []
+    assert prefetcher.stats()['skipped_busy'] == 1
+
+
+def test_running_job_is_cancelled_when_requests_arrive():
+    prefetcher = MockupPrefetcher(max_active_requests=0)
+
+    def job(job_handle):
+        job_handle.check()
+        prefetcher.request_started()
+        job_handle.check()
+        raise AssertionError('not cancelled')
+
+    prefetcher.schedule(job)
+    prefetcher.get_executor().shutdown(wait=True)
+    assert prefetcher.stats()['cancelled'] == 1
+
+
+def test_request_rejected_before_counting_does_not_decrement(app_aws):
+    prefetcher = app_aws.mockup_prefetcher
+    prefetcher.request_started()
+    try:
+        # The rate limiter's before_request answered 429 before ours ran, but teardown still runs
+        with app_aws.app.test_request_context():
+            app_aws.count_request_finished(None)
+        assert prefetcher.stats()['active_requests'] == 1
+    finally:
+        prefetcher.request_finished()
@@ -0,0 +1,21 @@
+import sqlite3
+
+from moderation import PerceptualModerationCache
+
+
+def stored_hashes(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {int(row[0], 16) for row in conn.execute('SELECT image_hash FROM moderation_verdicts')}
+
+
+def test_prune_caps_the_database(tmp_path):
+    db_path = str(tmp_path / 'verdicts.db')
+    cache = PerceptualModerationCache(db_path=db_path, max_entries=10)
+    # Spread far apart so no two hashes are near-duplicates
+    hashes = [(i + 1) * 0x0101010101010101 for i in range(11)]
+    for image_hash in hashes:
+        cache.set(image_hash, (False, 'rejected'))
+
+    # The eleventh verdict went over the cap: the database keeps the newest max_entries
+    assert stored_hashes(db_path) == set(hashes[1:])
+    assert len(cache.verdicts) == 9
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from palette import extract_palette, rgb_to_lab, srgb_to_lab
+
+# (RGB, share of the image) of the regions painted into the synthetic room
+KNOWN_COLORS = [
+    ((200, 190, 170), 0.40),  # Beige wall
+    ((60, 90, 140), 0.25),    # Blue sofa
+    ((120, 80, 50), 0.20),    # Wooden floor
+    ((230, 230, 225), 0.10),  # White ceiling
+    ((30, 30, 30), 0.05),     # Black lamp
+]
+
+
+def synthetic_room(noise=6.0, size=(100, 75), seed=3):
+    """A thumbnail made of KNOWN_COLORS in horizontal bands, plus Gaussian noise."""
+    width, height = size
+    total = width * height
+    pixels = np.empty((total, 3), dtype=np.float64)
+    start = 0
+    for index, (color, share) in enumerate(KNOWN_COLORS):
+        end = total if index == len(KNOWN_COLORS) - 1 else start + round(total * share)
+        pixels[start:end] = color
+        start = end
+    pixels += np.random.default_rng(seed).normal(0, noise, pixels.shape)
+    return np.clip(pixels, 0, 255).astype(np.uint8).reshape(height, width, 3)
+
+
+def palette_rgb(palette):
+    return np.array([[int(item['color'][i:i + 2], 16) for i in (1, 3, 5)] for item in palette], dtype=float)
+
+
+@pytest.mark.parametrize('color_space', ['rgb', 'lab'])
+def test_palette_recovers_known_colors(color_space):
+    palette = extract_palette(synthetic_room(), n_colors=5, color_space=color_space)
+
+    assert len(palette) == 5
+    assert sum(item['percentage'] for item in palette) == pytest.approx(1.0)
+    # Largest first, each color close to the region it came from and with about its share
+    for item, rgb, (color, share) in zip(palette, palette_rgb(palette), KNOWN_COLORS):
+        assert np.linalg.norm(rgb - color) < 12, (item, color)
+        assert item['percentage'] == pytest.approx(share, abs=0.02)
+
+
+def test_palette_is_deterministic():
+    pixels = synthetic_room(noise=20.0)
+    assert extract_palette(pixels) == extract_palette(pixels.copy())
+    assert extract_palette(pixels, color_space='lab') == extract_palette(pixels.copy(), color_space='lab')
+
+
+def test_palette_of_flat_image_is_one_color():
+    pixels = np.full((40, 60, 3), (10, 120, 200), dtype=np.uint8)
+    palette = extract_palette(pixels)
+    assert len(palette) == 1
+    assert palette[0]['percentage'] == pytest.approx(1.0)
+    assert np.linalg.norm(palette_rgb(palette)[0] - (10, 120, 200)) < 8
+
+
+def test_palette_of_no_pixels_is_empty():
+    assert extract_palette(np.zeros((0, 3), dtype=np.uint8)) == []
+
+
+def test_palette_rejects_unknown_color_space():
+    with pytest.raises(ValueError):
+        extract_palette(synthetic_room(), color_space='hsv')
+
+
+def test_lab_lookup_matches_exact_conversion():
+    colors = np.random.default_rng(0).integers(0, 256, (5000, 3))
+    delta_e = np.linalg.norm(rgb_to_lab(colors) - srgb_to_lab(colors), axis=1)
+    # rgb_to_lab rounds to the nearest LUT grid point, documented as within 3 delta-E
+    assert delta_e.max() < 3.0
+    assert delta_e.mean() < 1.5
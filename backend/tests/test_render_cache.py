@@ -0,0 +1,35 @@
+import pytest
+
+from render_cache import DiskRenderStore, RenderCache, S3RenderStore
+
+
+def test_contains_checks_disk_store_without_reading(tmp_path):
+    store = DiskRenderStore(str(tmp_path))
+    RenderCache(store=store).put('abc', 'webp', b'render')
+
+    cache = RenderCache(store=store)
+    assert cache.contains('abc', 'webp')
+    assert not cache.contains('abc', 'jpeg')
+    assert cache.stats()['memory_entries'] == 0
+
+
+def test_contains_checks_s3_store_with_head():
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    with moto.mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='renders')
+        store = S3RenderStore(s3, 'renders')
+        store.put('abc', 'webp', b'render')
+
+        def no_download(**kwargs):
+            raise AssertionError('contains() downloaded the render')
+        s3.get_object = no_download
+        cache = RenderCache(store=store)
+        assert cache.contains('abc', 'webp')
+        assert not cache.contains('abc', 'jpeg')
+
+        # Expired renders are misses for contains() as well as get()
+        store.max_age_seconds = -1
+        assert not cache.contains('abc', 'webp')
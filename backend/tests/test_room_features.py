@@ -0,0 +1,130 @@
+import colorsys
+
+import numpy as np
+import pytest
+
+from image_analysis import (
+    ANYTIME_DETAIL_CATEGORIES, analyze_room_array, analyze_room_array_anytime, classify_room, room_features
+)
+
+ndimage = pytest.importorskip('scipy.ndimage')
+
+
+def reference_features(img_array):
+    """The analyzers' scores as originally computed: float64 grayscale, scipy Sobel and colorsys HSV."""
+    gray = np.mean(img_array, axis=2)
+    height, width = gray.shape
+    hsv = np.array([colorsys.rgb_to_hsv(r / 255, g / 255, b / 255) for r, g, b in img_array.reshape(-1, 3)])
+    texture_score = 0.0
+    if height > 1 and width > 1:
+        texture_score = np.mean(np.sqrt(ndimage.sobel(gray, axis=1) ** 2 + ndimage.sobel(gray, axis=0) ** 2))
+    return {
+        'mean_rgb': np.mean(img_array, axis=(0, 1)),
+        'saturation': np.mean(hsv[:, 1]),
+        'brightness': np.mean(gray) / 255.0,
+        'contrast': np.std(gray) / 255.0,
+        'texture_score': texture_score,
+        'horizontal_edges': np.sum(np.abs(np.diff(gray, axis=0))),
+        'vertical_edges': np.sum(np.abs(np.diff(gray, axis=1))),
+    }
+
+
+def reference_classification(img_array):
+    """The categorical room analysis as the original analyzers produced it."""
+    ref = reference_features(img_array)
+    height, width = img_array.shape[:2]
+    red, green, blue = ref['mean_rgb']
+    edge_ratio = ref['horizontal_edges'] / (ref['vertical_edges'] + 1)
+    if ref['brightness'] > 0.7 and edge_ratio > 1.2:
+        style = 'modern'
+    elif ref['brightness'] < 0.4:
+        style = 'traditional'
+    elif edge_ratio < 0.8:
+        style = 'rustic'
+    else:
+        style = 'contemporary'
+    if width / height > 1.5:
+        room_type = 'living_room'
+    elif red > green and red > blue:
+        room_type = 'bedroom'
+    else:
+        room_type = 'general'
+    return {
+        'brightness': 'bright' if ref['brightness'] > 0.7 else 'medium' if ref['brightness'] > 0.4 else 'dark',
+        'saturation': 'vibrant' if ref['saturation'] > 0.3 else 'moderate' if ref['saturation'] > 0.15 else 'muted',
+        'temperature': 'warm' if red > blue else 'cool',
+        'contrast': 'high' if ref['contrast'] > 0.15 else 'medium' if ref['contrast'] > 0.08 else 'low',
+        'texture_complexity': ('complex' if ref['texture_score'] > 30
+                               else 'moderate' if ref['texture_score'] > 15 else 'simple'),
+        'architectural_style': style,
+        'room_type': room_type,
+    }
+
+
+def synthetic_arrays():
+    """Small RGB arrays covering dark/bright, flat/busy, striped, wide/tall and degenerate cases."""
+    rng = np.random.default_rng(17)
+    arrays = []
+    for height, width in [(48, 64), (64, 48), (30, 80), (40, 40), (1, 50), (50, 1), (1, 1)]:
+        y, x = np.mgrid[0:height, 0:width]
+        for base, noise in [((230, 225, 215), 3), ((200, 120, 90), 8), ((60, 80, 120), 20), ((90, 90, 80), 45)]:
+            img = np.array(base, dtype=np.float64) * (0.85 + 0.15 * np.sin(x / 9.0))[..., None]
+            # Horizontal bands (shelves, panelling) make row differences dominate
+            img -= (np.sin(y / 2.0) > 0)[..., None] * rng.integers(0, 40)
+            img += rng.normal(0, noise, img.shape)
+            arrays.append(np.clip(img, 0, 255).astype(np.uint8))
+    # High contrast (half dark, half bright) and a moderately saturated flat wall
+    split = np.full((24, 32, 3), 20, dtype=np.uint8)
+    split[:, 16:] = 235
+    arrays.append(split)
+    arrays.append(np.full((24, 32, 3), (200, 180, 165), dtype=np.uint8))
+    arrays.append(np.zeros((20, 30, 3), dtype=np.uint8))
+    arrays.append(np.full((20, 30, 3), 255, dtype=np.uint8))
+    return arrays
+
+
+@pytest.mark.parametrize('img_array', synthetic_arrays(), ids=lambda a: f'{a.shape[1]}x{a.shape[0]}')
+def test_room_features_match_reference(img_array):
+    features = room_features(img_array)
+    ref = reference_features(img_array)
+
+    assert (features.width, features.height) == (img_array.shape[1], img_array.shape[0])
+    np.testing.assert_allclose(features.mean_rgb, ref['mean_rgb'], rtol=1e-9)
+    for name in ('saturation', 'brightness', 'contrast', 'texture_score'):
+        assert getattr(features, name) == pytest.approx(ref[name], rel=1e-4, abs=1e-5), name
+    for name in ('horizontal_edges', 'vertical_edges'):
+        assert getattr(features, name) == pytest.approx(ref[name], rel=1e-4, abs=1e-2), name
+
+
+@pytest.mark.parametrize('img_array', synthetic_arrays(), ids=lambda a: f'{a.shape[1]}x{a.shape[0]}')
+def test_room_classification_matches_reference(img_array):
+    analysis = classify_room(room_features(img_array))
+    expected = reference_classification(img_array)
+
+    assert analysis['color_palette']['saturation'] == expected.pop('saturation')
+    assert analysis['color_palette']['temperature'] == expected.pop('temperature')
+    for name, value in expected.items():
+        assert analysis[name] == value, name
+
+
+def test_anytime_analysis_without_deadline_matches_full_analysis():
+    img_array = np.repeat(np.repeat(synthetic_arrays()[0], 16, axis=0), 16, axis=1)  # 1024x768
+    result = analyze_room_array_anytime(img_array)
+    expected = analyze_room_array(img_array)
+
+    assert result['analysis_timing']['complete']
+    assert result['analysis_timing']['omitted'] == []
+    assert result['room_analysis'] == expected['room_analysis']
+
+
+def test_anytime_analysis_omits_detail_categories_at_coarse_stages():
+    img_array = np.repeat(np.repeat(synthetic_arrays()[0], 16, axis=0), 16, axis=1)  # 1024x768
+    # A deadline already past: only the first (128px) stage runs
+    result = analyze_room_array_anytime(img_array, deadline=0)
+
+    assert result['analysis_timing']['resolution'] == 128
+    assert result['analysis_timing']['omitted'] == list(ANYTIME_DETAIL_CATEGORIES)
+    for name in ANYTIME_DETAIL_CATEGORIES:
+        assert result['room_analysis'][name] is None
+    assert result['room_analysis']['brightness'] is not None
+    assert result['recommended_art_characteristics']['reasoning']
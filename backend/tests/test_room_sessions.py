@@ -0,0 +1,41 @@
+from io import BytesIO
+
+from PIL import Image
+
+from room_sessions import RoomSessionStore
+
+
+def upload(size=(3000, 2000)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (120, 140, 160)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def test_session_keeps_downscaled_bitmap_and_original():
+    original = upload()
+    store = RoomSessionStore(max_dim=1000)
+    token = store.create(Image.open(BytesIO(original)), 'digest', original)
+
+    session = store.get(token)
+    assert session.image.size == (1000, 667)
+    assert session.open_original().read() == original
+    assert store.stats()['memory_used'] == 1000 * 667 * 3 + len(original)
+
+
+def test_original_survives_the_disk_tier(tmp_path):
+    original = upload()
+    token = RoomSessionStore(max_dim=1000, disk_dir=str(tmp_path)).create(
+        Image.open(BytesIO(original)), 'digest', original)
+
+    # Another worker finds both files
+    session = RoomSessionStore(max_dim=1000, disk_dir=str(tmp_path)).get(token)
+    assert (session.digest, session.image.size) == ('digest', (1000, 667))
+    assert session.original == original
+
+
+def test_session_without_original(tmp_path):
+    token = RoomSessionStore(disk_dir=str(tmp_path)).create(Image.new('RGB', (64, 48)), 'digest')
+
+    session = RoomSessionStore(disk_dir=str(tmp_path)).get(token)
+    assert session.image.size == (64, 48)
+    assert session.original is None and session.open_original() is None
@@ -0,0 +1,33 @@
+import base64
+
+from analysis_pool import AnalysisTimeout
+from conftest import room_jpeg
+
+
+class TimedOutTask:
+    def result(self, timeout=None):
+        raise AnalysisTimeout('dominant_colors_from_pixels did not finish within 20.00s')
+
+
+def test_upload_survives_abandoned_color_extraction(app_aws, client, monkeypatch):
+    submit = app_aws.analysis_pool.submit
+
+    def submit_with_slow_colors(func, *arrays, **kwargs):
+        if func is app_aws.dominant_colors_from_pixels:
+            return TimedOutTask()
+        return submit(func, *arrays, **kwargs)
+
+    monkeypatch.setattr(app_aws.analysis_pool, 'submit', submit_with_slow_colors)
+    photo = 'data:image/jpeg;base64,' + base64.b64encode(room_jpeg(seed=39)).decode()
+    response = client.post('/upload-image', json={'roomImage': photo})
+
+    assert response.status_code == 200
+    assert 'recommendations' in response.get_json()
+
+
+
+def test_upload_rejects_undecodable_image(client):
+    response = client.post('/upload-image', json={'roomImage': base64.b64encode(b'not an image' * 100).decode()})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid image file'
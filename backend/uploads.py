@@ -0,0 +1,69 @@
+"""
+Streaming intake for binary room-photo uploads.
+
+The JSON /upload-image route receives the photo as a base64 data URL, so the
+whole string is parsed and then decoded into a second full copy. The binary
+route instead streams the request body (a raw image or a multipart file
+part) into an UploadSpool: a spooled temporary file that stays in memory up
+to spool_bytes and rolls over to disk beyond that, enforces max_bytes while
+it is being written, and computes the MD5 used as the moderation cache key
+along the way. The spool is then handed to the decoder as a file, without
+ever materialising the upload as one bytes object.
+"""
+import hashlib
+from tempfile import SpooledTemporaryFile
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    description = 'Image exceeds the upload size limit.'
+
+
+class UploadSpool(SpooledTemporaryFile):
+    """Spooled temporary file that enforces a size limit and hashes what is written."""
+
+    def __init__(self, max_bytes, spool_bytes):
+        super().__init__(max_size=spool_bytes)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.digest = hashlib.md5()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f'Image exceeds the {self.max_bytes // (1024 * 1024)}MB upload limit.')
+        self.digest.update(data)
+        return super().write(data)
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+
+def spool_stream(stream, max_bytes, spool_bytes, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Copy a readable stream into a new UploadSpool and rewind it."""
+    spool = UploadSpool(max_bytes, spool_bytes)
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            spool.write(chunk)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+class UploadRequest(Request):
+    """Request class that parses multipart file parts straight into UploadSpools."""
+
+    upload_max_bytes = 20 * 1024 * 1024
+    upload_spool_bytes = 1024 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool(self.upload_max_bytes, self.upload_spool_bytes)